@@ -8,4 +8,10 @@ if not os.environ.get('DJANGO_CONFIGURATION'):
     raise ValueError('The environment variable "DJANGO_CONFIGURATION" must be set.')
 configurations.importer.install()
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up, as they use models
+from danesfield.core.downloads import dataset_archive_application  # noqa: E402
+from danesfield.core.events import task_events_application  # noqa: E402
+
+application = task_events_application(dataset_archive_application(django_application))
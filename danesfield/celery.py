@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
 import configurations.importer
 
 os.environ['DJANGO_SETTINGS_MODULE'] = 'danesfield.settings'
@@ -14,3 +15,21 @@ app = Celery(config_source='django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def _start_metrics_server(**kwargs):
+    from django.conf import settings
+
+    from danesfield.core.utils.instrumentation import start_metrics_server
+
+    if settings.DANESFIELD_WORKER_METRICS_PORT is not None:
+        start_metrics_server(settings.DANESFIELD_WORKER_METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def _mark_metrics_process_dead(pid=None, **kwargs):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
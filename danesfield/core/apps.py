@@ -2,5 +2,9 @@ from django.apps import AppConfig
 
 
 class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
     name = 'danesfield.core'
     verbose_name = 'Danesfield: Core'
+
+    def ready(self):
+        import danesfield.core.signals  # noqa: F401
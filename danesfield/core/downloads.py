@@ -0,0 +1,71 @@
+"""
+Dataset archives, streamed by the ASGI application.
+
+Django's ASGI handler iterates a streaming response on the event loop, so every read of a
+multi-gigabyte archive from storage would block every other request, including the events of
+tasks, for as long as the download runs. So the view only lays out the archive, and responds
+with its headers, and the archive is then streamed here, reading each part of it in a thread.
+"""
+
+import asyncio
+import re
+
+from asgiref.sync import sync_to_async
+
+from danesfield.core.views.dataset import ARCHIVE_STREAM_SCOPE_KEY
+
+DATASET_ARCHIVE_PATH = re.compile(r'^/api/datasets/\d+/archive/$')
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def dataset_archive(django_application, scope: dict, receive, send):
+    """Respond to a request for a Dataset archive with the view, then stream the archive."""
+    deferred = {}
+
+    async def send_headers(message: dict):
+        # Hold back the end of the empty body the view responds with, if the archive is deferred
+        if (
+            message['type'] == 'http.response.body'
+            and not message.get('more_body')
+            and 'stream' in deferred
+        ):
+            return
+        await send(message)
+
+    await django_application({**scope, ARCHIVE_STREAM_SCOPE_KEY: deferred}, receive, send_headers)
+    stream = deferred.get('stream')
+    if stream is None:
+        return
+
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    read = sync_to_async(next, thread_sensitive=False)
+    try:
+        while not disconnected.done():
+            data = await read(stream, None)
+            if data is None:
+                break
+            await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+    finally:
+        disconnected.cancel()
+        await sync_to_async(stream.close, thread_sensitive=False)()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def dataset_archive_application(django_application):
+    """Wrap the Django ASGI application, to stream the archives of Datasets."""
+
+    async def application(scope: dict, receive, send):
+        if (
+            scope['type'] == 'http'
+            and scope['method'] == 'GET'
+            and DATASET_ARCHIVE_PATH.match(scope['path'])
+        ):
+            await dataset_archive(django_application, scope, receive, send)
+            return
+        await django_application(scope, receive, send)
+
+    return application
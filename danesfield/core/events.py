@@ -0,0 +1,162 @@
+"""
+Server-sent events of the log and progress of AlgorithmTasks, while they run.
+
+These are served by the ASGI application, rather than a view, so that following a task only
+needs a coroutine, instead of a thread, for as long as the client is connected.
+"""
+
+import asyncio
+import json
+import re
+from typing import Optional
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rdoasis.algorithms.models import AlgorithmTask
+
+from danesfield.core.utils.logs import read_log, task_finished, task_progress
+
+TASK_EVENTS_PATH = re.compile(r'^/api/tasks/(?P<pk>\d+)/events/$')
+
+# How often, in seconds, new log output and progress are looked for
+POLL_INTERVAL = 1.0
+
+
+def _task_headers(scope: dict) -> list:
+    """
+    Return the headers with which to request the task from the API.
+
+    The task is requested as JSON, whatever the client accepts. EventSource can't set headers, so
+    an OAuth token may instead be given by the token query parameter.
+    """
+    token = parse_qs(scope['query_string'].decode()).get('token', [None])[0]
+    replaced = {b'accept'} if token is None else {b'accept', b'authorization'}
+    headers = [(name, value) for name, value in scope['headers'] if name.lower() not in replaced]
+    headers.append((b'accept', b'application/json'))
+    if token is not None:
+        headers.append((b'authorization', f'Bearer {token}'.encode()))
+    return headers
+
+
+async def _task_status_code(django_application, scope: dict, pk: int) -> int:
+    """
+    Return the status code of requesting the task from the API.
+
+    This applies the same authentication and permissions to the events as to the task itself.
+    """
+    path = f'/api/tasks/{pk}/'
+    task_scope = {
+        **scope,
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'headers': _task_headers(scope),
+    }
+    status_code = 500
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: dict):
+        nonlocal status_code
+        if message['type'] == 'http.response.start':
+            status_code = message['status']
+
+    await django_application(task_scope, receive, send)
+    return status_code
+
+
+def _start_offset(scope: dict) -> int:
+    """Resume from the Last-Event-ID of a reconnecting client, or the offset query parameter."""
+    headers = dict(scope['headers'])
+    offset: Optional[str] = None
+    if b'last-event-id' in headers:
+        offset = headers[b'last-event-id'].decode()
+    else:
+        offset = parse_qs(scope['query_string'].decode()).get('offset', ['0'])[0]
+    try:
+        return max(0, int(offset))
+    except ValueError:
+        return 0
+
+
+async def _send_event(send, event: str, data: dict, id: Optional[int] = None):
+    lines = [f'event: {event}', f'data: {json.dumps(data)}']
+    if id is not None:
+        lines.insert(0, f'id: {id}')
+    await send(
+        {
+            'type': 'http.response.body',
+            'body': ('\n'.join(lines) + '\n\n').encode(),
+            'more_body': True,
+        }
+    )
+
+
+async def task_events(django_application, scope: dict, receive, send, pk: int):
+    """
+    Stream the log and progress of a task, until it has finished.
+
+    "log" events have the new log output, and are identified by the offset following it.
+    "progress" events have the status of the task, and the steps and stages it has completed.
+    An "end" event is sent once the task has finished, and all of its log has been sent.
+    """
+    status_code = await _task_status_code(django_application, scope, pk)
+    if status_code != 200:
+        await send({'type': 'http.response.start', 'status': status_code, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    await send(
+        {
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Don't let a proxy buffer the events
+                (b'x-accel-buffering', b'no'),
+            ],
+        }
+    )
+
+    offset = _start_offset(scope)
+    progress = None
+    while True:
+        task: AlgorithmTask = await sync_to_async(AlgorithmTask.objects.get)(pk=pk)
+        log = await sync_to_async(read_log)(task, offset)
+        if log.content:
+            offset = log.next_offset
+            await _send_event(send, 'log', {'content': log.content}, id=offset)
+
+        current = await sync_to_async(task_progress)(task)
+        if current != progress:
+            progress = current
+            await _send_event(send, 'progress', progress)
+
+        if task_finished(task) and not log.content:
+            await _send_event(send, 'end', {'status': task.status})
+            break
+
+        try:
+            message = await asyncio.wait_for(receive(), POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            continue
+        if message['type'] == 'http.disconnect':
+            return
+
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def task_events_application(django_application):
+    """Wrap the Django ASGI application, to serve the events of tasks."""
+
+    async def application(scope: dict, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            match = TASK_EVENTS_PATH.match(scope['path'])
+            if match is not None:
+                await task_events(django_application, scope, receive, send, int(match['pk']))
+                return
+        await django_application(scope, receive, send)
+
+    return application
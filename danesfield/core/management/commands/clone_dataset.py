@@ -1,16 +1,55 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fnmatch import fnmatchcase
 from pathlib import Path
+from typing import Tuple
 
 import djclick as click
 from rdoasis.algorithms.models import Dataset
 from rgd.models import ChecksumFile
+from rgd.utility import compute_hash
+
+from danesfield.core.utils.files import stream_checksum_file
+
+
+def _clone_file(file: ChecksumFile, file_path: Path, skip_existing: bool) -> bool:
+    """Stream a file to the given path, returning False if an identical copy already exists."""
+    if skip_existing and file_path.is_file() and file.checksum:
+        with open(file_path, 'rb') as fd:
+            if compute_hash(fd) == file.checksum:
+                return False
+
+    stream_checksum_file(file, file_path)
+    return True
 
 
 @click.command()
 @click.argument('dataset_pk', required=True, type=int)
 @click.option('-p', '--path', type=str, help='Directory to save files to.')
-def clone_dataset(dataset_pk: int, path: str | None):
+@click.option(
+    '-i',
+    '--include',
+    'patterns',
+    multiple=True,
+    help='Only clone files whose names match this glob, e.g. "tiler/*". May be repeated.',
+)
+@click.option(
+    '-w',
+    '--workers',
+    default=4,
+    type=click.IntRange(min=1),
+    help='The number of files to download in parallel.',
+)
+@click.option(
+    '--skip-existing',
+    is_flag=True,
+    default=False,
+    help='Skip files that already exist on disk with a matching checksum.',
+)
+def clone_dataset(
+    dataset_pk: int, path: str | None, patterns: Tuple[str, ...], workers: int, skip_existing: bool
+):
     """Clone a Dataset's files to the given path on disk."""
     path = (
         Path(__file__).parent.parent.parent.parent.parent.resolve()
@@ -19,15 +58,31 @@ def clone_dataset(dataset_pk: int, path: str | None):
     )
     dataset = Dataset.objects.get(pk=dataset_pk)
 
-    click.echo(f'Saving files from {dataset.name} to {path}...')
+    files = [
+        file
+        for file in dataset.files.all()
+        if not patterns or any(fnmatchcase(file.name, pattern) for pattern in patterns)
+    ]
+
+    click.echo(f'Saving {len(files)} files from {dataset.name} to {path}...')
 
-    file: ChecksumFile
-    for file in dataset.files.all():
-        file_path = path / file.name
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        click.echo(f'  Saving {file_path}... ', nl=False)
-        with open(file_path, 'wb') as fd:
-            fd.write(file.file.read())
-        click.echo(click.style('Done', fg='green'))
+    saved = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_clone_file, file, path / file.name, skip_existing): path / file.name
+            for file in files
+        }
+        for future in as_completed(futures):
+            if future.result():
+                saved += 1
+                click.echo(f'  Saved {futures[future]}... ' + click.style('Done', fg='green'))
+            else:
+                click.echo(f'  Skipped {futures[future]}, it is unchanged.')
 
-    click.echo(click.style(f'All {dataset.files.count()} files saved.', fg='cyan', bold=True))
+    click.echo(
+        click.style(
+            f'All {len(files)} files saved ({len(files) - saved} unchanged).',
+            fg='cyan',
+            bold=True,
+        )
+    )
@@ -1,35 +1,89 @@
+from __future__ import annotations
+
 from pathlib import Path
+from typing import Dict, List
 
-from django.core.files import File
 from django.db import transaction
 import djclick as click
 from rdoasis.algorithms.models import Dataset
 from rgd.models import ChecksumFile
 
-from danesfield.core.tasks import _ingest_checksum_files
+from danesfield.core.tasks import _ingest_checksum_files, _remove_orphaned_files, _uningested_files
+from danesfield.core.utils.uploads import UploadStats, upload_output_files
 
 
 @click.command()
 @click.argument('path', required=True, type=click.Path(exists=True))
 @click.option('-n', '--name', required=True, type=str, help='The name of the imported dataset.')
-@transaction.atomic
-def ingest_danesfield_output(path: str, name: str):
+@click.option(
+    '-w',
+    '--workers',
+    default=4,
+    type=click.IntRange(min=1),
+    help='The number of files to upload in parallel.',
+)
+@click.option(
+    '-b',
+    '--batch-size',
+    default=100,
+    type=click.IntRange(min=1),
+    help='The number of uploaded files to save to the database per transaction.',
+)
+@click.option(
+    '--resume',
+    is_flag=True,
+    default=False,
+    help='Add to an existing dataset, skipping files it already contains with the same checksum.',
+)
+def ingest_danesfield_output(path: str, name: str, workers: int, batch_size: int, resume: bool):
     dataset, created = Dataset.objects.get_or_create(name=name)
-    if not created:
-        click.echo(f'Dataset "{name}" already exists, please use a different name.')
-        return
-    else:
+    if created:
         click.echo(f'Creating Dataset "{name}"...')
-    files = []
-    for p in Path(path).rglob('*'):
-        if not p.is_file():
-            continue
-        file = p.relative_to(path)
-        with open(p, 'rb') as fd:
-            files.append(ChecksumFile.objects.create(name=file, file=File(fd)))
-            click.echo(f'  Created ChecksumFile from file "{file}"')
-    dataset.files.set(files)
-    dataset.save()
+    elif resume:
+        click.echo(f'Resuming Dataset "{name}"...')
+    else:
+        click.echo(
+            f'Dataset "{name}" already exists, please use a different name, or pass --resume.'
+        )
+        return
+
+    existing: Dict[str, ChecksumFile] = {file.name: file for file in dataset.files.all()}
+
+    def add_files(files: List[ChecksumFile]):
+        """Add files to the Dataset, replacing and removing any outdated files of the same name."""
+        outdated = [
+            existing[file.name]
+            for file in files
+            if file.name in existing and existing[file.name].pk != file.pk
+        ]
+        dataset.files.remove(*outdated)
+        dataset.files.add(*files)
+        existing.update((file.name, file) for file in files)
+        _remove_orphaned_files(outdated)
+
+    def save_batch(files: List[ChecksumFile], stats: UploadStats):
+        # Each batch is saved as it is uploaded, so that a rerun with --resume can skip it
+        add_files(files)
+        click.echo(
+            f'  Uploaded {stats.uploaded_files} files '
+            f'({stats.uploaded_files / stats.duration:.1f} files/s, '
+            f'{stats.uploaded_bytes / stats.duration / 1e6:.1f} MB/s)'
+        )
+
+    reused, _, stats = upload_output_files(
+        Path(path),
+        workers,
+        reusable=list(existing.values()),
+        batch_size=batch_size,
+        on_batch=save_batch,
+    )
+    with transaction.atomic():
+        add_files(reused)
+
+    click.echo(
+        f'  Uploaded {stats.uploaded_files} files, '
+        f'and skipped {stats.deduplicated_files} unchanged files.'
+    )
     click.echo('  Ingesting files...')
-    _ingest_checksum_files(dataset)
+    _ingest_checksum_files(dataset, _uningested_files(dataset))
     click.echo('Done.')
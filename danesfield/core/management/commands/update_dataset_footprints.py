@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import djclick as click
+from rdoasis.algorithms.models import Dataset
+
+from danesfield.core.models import DatasetFootprint
+from danesfield.core.utils.footprints import compute_dataset_footprints, refresh_dataset_footprints
+
+
+@click.command()
+@click.option(
+    '--verify',
+    is_flag=True,
+    default=False,
+    help='Compare stored footprints against freshly computed ones instead of updating them.',
+)
+def update_dataset_footprints(verify: bool):
+    """Backfill or verify the precomputed footprint of every Dataset."""
+    if not verify:
+        dataset_pks = list(Dataset.objects.values_list('pk', flat=True))
+        click.echo(f'Updating footprints of {len(dataset_pks)} datasets...')
+        refresh_dataset_footprints(dataset_pks)
+        click.echo(click.style('Done.', fg='green'))
+        return
+
+    stored = dict(DatasetFootprint.objects.values_list('dataset_id', 'footprint'))
+    computed = compute_dataset_footprints()
+    mismatched = []
+    for dataset_pk in Dataset.objects.values_list('pk', flat=True):
+        expected = computed.get(dataset_pk)
+        actual = stored.get(dataset_pk)
+        if expected is None and actual is None:
+            continue
+        if expected is None or actual is None or not expected.equals_exact(actual):
+            mismatched.append(dataset_pk)
+            click.echo(click.style(f'  Dataset {dataset_pk} footprint is stale', fg='yellow'))
+
+    if mismatched:
+        raise click.ClickException(
+            f'{len(mismatched)} stale footprints found. '
+            'Run this command without --verify to update them.'
+        )
+    click.echo(click.style('All footprints are up to date.', fg='green'))
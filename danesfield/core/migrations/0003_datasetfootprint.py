@@ -0,0 +1,54 @@
+# Generated by Django 4.1.2 on 2026-10-18 14:02
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0002_default_algorithms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetFootprint',
+            fields=[
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                (
+                    'dataset',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='footprint',
+                        serialize=False,
+                        to='algorithms.dataset',
+                    ),
+                ),
+                (
+                    'footprint',
+                    django.contrib.gis.db.models.fields.GeometryField(
+                        blank=True, null=True, srid=4326
+                    ),
+                ),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0003_datasetfootprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlgorithmTaskMetrics',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                (
+                    'input_cache_hits',
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text='Number of input files staged from the worker input cache.',
+                    ),
+                ),
+                (
+                    'input_cache_misses',
+                    models.PositiveIntegerField(
+                        default=0, help_text='Number of input files downloaded from storage.'
+                    ),
+                ),
+                (
+                    'input_cache_bytes_saved',
+                    models.PositiveBigIntegerField(
+                        default=0,
+                        help_text=(
+                            'Total size of the input files staged from the worker input cache.'
+                        ),
+                    ),
+                ),
+                (
+                    'algorithm_task',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='metrics',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.2 on 2026-10-18 17:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0004_algorithmtaskmetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlgorithmTaskFingerprint',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                (
+                    'fingerprint',
+                    models.CharField(
+                        db_index=True,
+                        help_text=(
+                            'SHA-256 of the algorithm, its configuration and its input file '
+                            'checksums.'
+                        ),
+                        max_length=64,
+                    ),
+                ),
+                (
+                    'algorithm_task',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='fingerprint',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
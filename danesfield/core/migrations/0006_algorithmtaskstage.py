@@ -0,0 +1,64 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('rgd', '__first__'),
+        ('core', '0005_algorithmtaskfingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlgorithmTaskStage',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                ('name', models.CharField(max_length=255)),
+                (
+                    'duration',
+                    models.FloatField(help_text='How long the stage took, in seconds.', null=True),
+                ),
+                ('resumed', models.BooleanField(default=False)),
+                (
+                    'algorithm_task',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='stages',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+                (
+                    'files',
+                    models.ManyToManyField(blank=True, related_name='+', to='rgd.checksumfile'),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='algorithmtaskstage',
+            constraint=models.UniqueConstraint(
+                fields=('algorithm_task', 'name'), name='unique_algorithm_task_stage'
+            ),
+        ),
+    ]
@@ -0,0 +1,134 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+STATUS_CHOICES = [
+    ('created', 'Created but not queued'),
+    ('queued', 'Queued for processing'),
+    ('running', 'Processing'),
+    ('failed', 'Failed'),
+    ('success', 'Succeeded'),
+    ('skipped', 'Skipped'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0006_algorithmtaskstage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pipeline',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                (
+                    'status',
+                    models.CharField(choices=STATUS_CHOICES, default='created', max_length=20),
+                ),
+                ('force', models.BooleanField(default=False)),
+                (
+                    'input_dataset',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='algorithms.dataset',
+                    ),
+                ),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PipelineStage',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                ('name', models.CharField(max_length=255)),
+                ('index', models.PositiveSmallIntegerField()),
+                ('queue', models.CharField(max_length=255)),
+                (
+                    'status',
+                    models.CharField(choices=STATUS_CHOICES, default='created', max_length=20),
+                ),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                (
+                    'algorithm_task',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='pipeline_stages',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+                (
+                    'output_dataset',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='+',
+                        to='algorithms.dataset',
+                    ),
+                ),
+                (
+                    'pipeline',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='stages',
+                        to='core.pipeline',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['index'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pipelinestage',
+            constraint=models.UniqueConstraint(
+                fields=('pipeline', 'index'), name='unique_pipeline_stage'
+            ),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.1.2 on 2026-10-18 19:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_pipeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineBatch',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                (
+                    'concurrency',
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text='How many Pipelines may run at once, if limited.',
+                        null=True,
+                    ),
+                ),
+                (
+                    'priority',
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        help_text='The Celery priority of the tasks of every stage.',
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='pipeline',
+            name='batch',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name='pipelines',
+                to='core.pipelinebatch',
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.1.2 on 2026-10-18 21:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0009_pipeline_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineTile',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                ('index', models.PositiveIntegerField()),
+                ('min_x', models.FloatField()),
+                ('min_y', models.FloatField()),
+                ('max_x', models.FloatField()),
+                ('max_y', models.FloatField()),
+                (
+                    'points',
+                    models.PositiveBigIntegerField(help_text='The estimated number of points.'),
+                ),
+                (
+                    'algorithm_task',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='+',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+                (
+                    'input_dataset',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='algorithms.dataset',
+                    ),
+                ),
+                (
+                    'pipeline',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='tiles',
+                        to='core.pipeline',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['index'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pipelinetile',
+            constraint=models.UniqueConstraint(
+                fields=('pipeline', 'index'), name='unique_pipeline_tile'
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.2 on 2026-10-18 22:15
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_pipelinetile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pipeline',
+            name='aoi',
+            field=django.contrib.gis.db.models.fields.PolygonField(
+                blank=True, null=True, srid=4326
+            ),
+        ),
+        migrations.CreateModel(
+            name='PointCloudReduction',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                ('input_points', models.PositiveBigIntegerField()),
+                ('output_points', models.PositiveBigIntegerField()),
+                ('input_bytes', models.PositiveBigIntegerField()),
+                ('output_bytes', models.PositiveBigIntegerField()),
+                (
+                    'stage',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='point_cloud_reduction',
+                        to='core.pipelinestage',
+                    ),
+                ),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
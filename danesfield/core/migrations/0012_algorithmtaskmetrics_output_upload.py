@@ -0,0 +1,49 @@
+# Generated by Django 4.1.2 on 2026-10-18 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_pipeline_aoi_pointcloudreduction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='algorithmtaskmetrics',
+            name='output_bytes_deduplicated',
+            field=models.PositiveBigIntegerField(
+                default=0, help_text='Total size of the output files which were not uploaded.'
+            ),
+        ),
+        migrations.AddField(
+            model_name='algorithmtaskmetrics',
+            name='output_bytes_uploaded',
+            field=models.PositiveBigIntegerField(
+                default=0, help_text='Total size of the output files uploaded to storage.'
+            ),
+        ),
+        migrations.AddField(
+            model_name='algorithmtaskmetrics',
+            name='output_files_deduplicated',
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text='Number of output files identical to an existing file, so not uploaded.',
+            ),
+        ),
+        migrations.AddField(
+            model_name='algorithmtaskmetrics',
+            name='output_files_uploaded',
+            field=models.PositiveIntegerField(
+                default=0, help_text='Number of output files uploaded to storage.'
+            ),
+        ),
+        migrations.AddField(
+            model_name='algorithmtaskmetrics',
+            name='output_upload_duration',
+            field=models.FloatField(
+                blank=True, null=True, help_text='Seconds taken to upload the output files.'
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.1.2 on 2026-10-18 23:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0012_algorithmtaskmetrics_output_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineVideo',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                ('index', models.PositiveIntegerField()),
+                ('name', models.CharField(max_length=1000)),
+                (
+                    'algorithm_task',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='+',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+                (
+                    'input_dataset',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='algorithms.dataset',
+                    ),
+                ),
+                (
+                    'pipeline',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='videos',
+                        to='core.pipeline',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['index'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pipelinevideo',
+            constraint=models.UniqueConstraint(
+                fields=('pipeline', 'index'), name='unique_pipeline_video'
+            ),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.1.2 on 2026-10-18 23:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0013_pipelinevideo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pipeline',
+            name='keyframes',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='KeyframeSelection',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                (
+                    'mode',
+                    models.CharField(
+                        choices=[
+                            ('stride', 'Stride'),
+                            ('motion', 'Motion'),
+                            ('metadata', 'Metadata'),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    'stride',
+                    models.PositiveIntegerField(
+                        default=1, help_text='Select every n-th frame, in stride mode.'
+                    ),
+                ),
+                (
+                    'motion_threshold',
+                    models.FloatField(
+                        default=0.1,
+                        help_text='Fraction of the frame width the view moves between keyframes.',
+                    ),
+                ),
+                (
+                    'min_distance',
+                    models.FloatField(
+                        default=10.0,
+                        help_text='Meters the sensor must move between keyframes, per the KLV.',
+                    ),
+                ),
+                ('input_frames', models.PositiveIntegerField(blank=True, null=True)),
+                ('selected_frames', models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    'algorithm_task',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='keyframe_selection',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.1.2 on 2026-10-19 00:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0014_pipeline_keyframes_keyframeselection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='algorithmtaskmetrics',
+            name='container_peak_memory',
+            field=models.PositiveBigIntegerField(
+                blank=True, help_text='Peak memory used by the container, in bytes.', null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name='algorithmtaskmetrics',
+            name='input_bytes_downloaded',
+            field=models.PositiveBigIntegerField(
+                default=0, help_text='Total size of the input files downloaded from storage.'
+            ),
+        ),
+        migrations.CreateModel(
+            name='AlgorithmTaskSpan',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                ('name', models.CharField(max_length=255)),
+                ('started', models.DateTimeField()),
+                (
+                    'duration',
+                    models.FloatField(help_text='How long the step took, in seconds.'),
+                ),
+                (
+                    'bytes',
+                    models.PositiveBigIntegerField(
+                        blank=True,
+                        help_text='Bytes downloaded or uploaded by the step, if any.',
+                        null=True,
+                    ),
+                ),
+                (
+                    'algorithm_task',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='spans',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['started'],
+            },
+        ),
+    ]
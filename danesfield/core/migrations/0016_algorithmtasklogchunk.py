@@ -0,0 +1,64 @@
+# Generated by Django 4.1.2 on 2026-10-19 01:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '__first__'),
+        ('core', '0015_algorithmtaskspan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlgorithmTaskLogChunk',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'created',
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'modified',
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name='modified'
+                    ),
+                ),
+                ('index', models.PositiveIntegerField()),
+                (
+                    'start',
+                    models.PositiveBigIntegerField(
+                        help_text='The offset in the log of the first character of this chunk.'
+                    ),
+                ),
+                ('content', models.TextField()),
+                (
+                    'algorithm_task',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='log_chunks',
+                        to='algorithms.algorithmtask',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['index'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='algorithmtasklogchunk',
+            constraint=models.UniqueConstraint(
+                fields=('algorithm_task', 'index'), name='unique_algorithm_task_log_chunk'
+            ),
+        ),
+    ]
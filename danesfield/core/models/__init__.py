@@ -0,0 +1,33 @@
+from .footprint import DatasetFootprint
+from .pipeline import (
+    Pipeline,
+    PipelineBatch,
+    PipelineStage,
+    PipelineTile,
+    PipelineVideo,
+    PointCloudReduction,
+)
+from .task import (
+    AlgorithmTaskFingerprint,
+    AlgorithmTaskLogChunk,
+    AlgorithmTaskMetrics,
+    AlgorithmTaskSpan,
+    AlgorithmTaskStage,
+    KeyframeSelection,
+)
+
+__all__ = [
+    'AlgorithmTaskFingerprint',
+    'AlgorithmTaskLogChunk',
+    'AlgorithmTaskMetrics',
+    'AlgorithmTaskSpan',
+    'AlgorithmTaskStage',
+    'DatasetFootprint',
+    'KeyframeSelection',
+    'Pipeline',
+    'PipelineBatch',
+    'PipelineStage',
+    'PipelineTile',
+    'PipelineVideo',
+    'PointCloudReduction',
+]
@@ -0,0 +1,19 @@
+from django.contrib.gis.db import models
+from django_extensions.db.models import TimeStampedModel
+from rdoasis.algorithms.models import Dataset
+from rgd.models.constants import DB_SRID
+
+
+class DatasetFootprint(TimeStampedModel):
+    """The convex hull of every spatial entry contained in a Dataset.
+
+    This is recomputed whenever the files of the Dataset, or the spatial metadata derived from
+    those files, change. See ``danesfield.core.signals``.
+    """
+
+    dataset = models.OneToOneField(
+        Dataset, on_delete=models.CASCADE, primary_key=True, related_name='footprint'
+    )
+
+    # Null if the Dataset doesn't contain any spatial entries
+    footprint = models.GeometryField(srid=DB_SRID, null=True, blank=True)
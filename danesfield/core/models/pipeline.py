@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.contrib.gis.db import models
+from django_extensions.db.models import TimeStampedModel
+from rdoasis.algorithms.models import AlgorithmTask, Dataset
+from rgd.models.constants import DB_SRID
+from rgd.models.mixins import Status
+
+
+class PipelineBatch(TimeStampedModel):
+    """Many Pipelines submitted together, of which only a limited number run at once."""
+
+    concurrency = models.PositiveIntegerField(
+        null=True, blank=True, help_text='How many Pipelines may run at once, if limited.'
+    )
+    priority = models.PositiveSmallIntegerField(
+        null=True, blank=True, help_text='The Celery priority of the tasks of every stage.'
+    )
+
+
+class Pipeline(TimeStampedModel):
+    """An end-to-end run of the stages needed to produce a model from an input Dataset."""
+
+    input_dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, default=Status.CREATED, choices=Status.choices)
+
+    # Run every algorithm, even if the outputs of an identical run could be reused
+    force = models.BooleanField(default=False)
+
+    batch = models.ForeignKey(
+        PipelineBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='pipelines'
+    )
+    # The GPU scheduler shares GPUs fairly between the users who start Pipelines
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+
+    # If given, the point cloud is cropped to this area before running Danesfield
+    aoi = models.PolygonField(srid=DB_SRID, null=True, blank=True)
+
+    # If given, how TeleSculptor selects the frames of each FMV to track features in
+    keyframes = models.JSONField(null=True, blank=True)
+
+
+class PipelineStage(TimeStampedModel):
+    """A stage of a Pipeline, run as its own Celery task on its own queue."""
+
+    class Meta:
+        ordering = ['index']
+        constraints = [
+            models.UniqueConstraint(fields=['pipeline', 'index'], name='unique_pipeline_stage')
+        ]
+
+    pipeline = models.ForeignKey(Pipeline, on_delete=models.CASCADE, related_name='stages')
+    name = models.CharField(max_length=255)
+    index = models.PositiveSmallIntegerField()
+    queue = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, default=Status.CREATED, choices=Status.choices)
+
+    # The AlgorithmTask launched by this stage, if any
+    algorithm_task = models.ForeignKey(
+        AlgorithmTask,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pipeline_stages',
+    )
+    # The Dataset produced by this stage, which is the input of the next stage
+    output_dataset = models.ForeignKey(
+        Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+
+class PipelineTile(TimeStampedModel):
+    """A spatial tile of the input point cloud of a Pipeline, which is processed separately."""
+
+    class Meta:
+        ordering = ['index']
+        constraints = [
+            models.UniqueConstraint(fields=['pipeline', 'index'], name='unique_pipeline_tile')
+        ]
+
+    pipeline = models.ForeignKey(Pipeline, on_delete=models.CASCADE, related_name='tiles')
+    index = models.PositiveIntegerField()
+
+    # The area this tile is responsible for, in the coordinates of the point cloud. The point
+    # cloud of the tile also contains the points within an overlap around this area.
+    min_x = models.FloatField()
+    min_y = models.FloatField()
+    max_x = models.FloatField()
+    max_y = models.FloatField()
+    points = models.PositiveBigIntegerField(help_text='The estimated number of points.')
+
+    input_dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='+')
+    algorithm_task = models.ForeignKey(
+        AlgorithmTask, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+
+class PipelineVideo(TimeStampedModel):
+    """One of many FMVs of the input of a Pipeline, which TeleSculptor processes separately."""
+
+    class Meta:
+        ordering = ['index']
+        constraints = [
+            models.UniqueConstraint(fields=['pipeline', 'index'], name='unique_pipeline_video')
+        ]
+
+    pipeline = models.ForeignKey(Pipeline, on_delete=models.CASCADE, related_name='videos')
+    index = models.PositiveIntegerField()
+    name = models.CharField(max_length=1000)
+
+    input_dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='+')
+    algorithm_task = models.ForeignKey(
+        AlgorithmTask, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+
+class PointCloudReduction(TimeStampedModel):
+    """How much the point cloud of a Pipeline was reduced by pre-processing it."""
+
+    stage = models.OneToOneField(
+        PipelineStage, on_delete=models.CASCADE, related_name='point_cloud_reduction'
+    )
+
+    input_points = models.PositiveBigIntegerField()
+    output_points = models.PositiveBigIntegerField()
+    input_bytes = models.PositiveBigIntegerField()
+    output_bytes = models.PositiveBigIntegerField()
@@ -0,0 +1,163 @@
+from typing import Optional
+
+from django.contrib.gis.db import models
+from django_extensions.db.models import TimeStampedModel
+from rdoasis.algorithms.models import AlgorithmTask
+from rgd.models import ChecksumFile
+
+
+class AlgorithmTaskMetrics(TimeStampedModel):
+    """Performance metrics recorded by the worker while running an AlgorithmTask."""
+
+    algorithm_task = models.OneToOneField(
+        AlgorithmTask, on_delete=models.CASCADE, related_name='metrics'
+    )
+
+    input_cache_hits = models.PositiveIntegerField(
+        default=0, help_text='Number of input files staged from the worker input cache.'
+    )
+    input_cache_misses = models.PositiveIntegerField(
+        default=0, help_text='Number of input files downloaded from storage.'
+    )
+    input_cache_bytes_saved = models.PositiveBigIntegerField(
+        default=0, help_text='Total size of the input files staged from the worker input cache.'
+    )
+
+    output_files_uploaded = models.PositiveIntegerField(
+        default=0, help_text='Number of output files uploaded to storage.'
+    )
+    output_bytes_uploaded = models.PositiveBigIntegerField(
+        default=0, help_text='Total size of the output files uploaded to storage.'
+    )
+    output_files_deduplicated = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of output files identical to an existing file, so not uploaded.',
+    )
+    output_bytes_deduplicated = models.PositiveBigIntegerField(
+        default=0, help_text='Total size of the output files which were not uploaded.'
+    )
+    output_upload_duration = models.FloatField(
+        null=True, blank=True, help_text='Seconds taken to upload the output files.'
+    )
+
+    input_bytes_downloaded = models.PositiveBigIntegerField(
+        default=0, help_text='Total size of the input files downloaded from storage.'
+    )
+    container_peak_memory = models.PositiveBigIntegerField(
+        null=True, blank=True, help_text='Peak memory used by the container, in bytes.'
+    )
+
+    @property
+    def output_upload_throughput(self) -> Optional[float]:
+        """The output bytes uploaded per second."""
+        if not self.output_upload_duration:
+            return None
+        return self.output_bytes_uploaded / self.output_upload_duration
+
+
+class AlgorithmTaskFingerprint(TimeStampedModel):
+    """The fingerprint of everything that determines the outputs of an AlgorithmTask."""
+
+    algorithm_task = models.OneToOneField(
+        AlgorithmTask, on_delete=models.CASCADE, related_name='fingerprint'
+    )
+    fingerprint = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text='SHA-256 of the algorithm, its configuration and its input file checksums.',
+    )
+
+
+class AlgorithmTaskStage(TimeStampedModel):
+    """A completed stage of an AlgorithmTask, and the intermediate results it produced."""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['algorithm_task', 'name'], name='unique_algorithm_task_stage'
+            )
+        ]
+
+    algorithm_task = models.ForeignKey(
+        AlgorithmTask, on_delete=models.CASCADE, related_name='stages'
+    )
+    name = models.CharField(max_length=255)
+    duration = models.FloatField(null=True, help_text='How long the stage took, in seconds.')
+    files = models.ManyToManyField(ChecksumFile, blank=True, related_name='+')
+
+    # True if the results were restored from an earlier AlgorithmTask, rather than computed
+    resumed = models.BooleanField(default=False)
+
+
+class AlgorithmTaskSpan(TimeStampedModel):
+    """
+    A timed step of running an AlgorithmTask on a worker, or of ingesting its outputs.
+
+    Spans may nest, e.g. the "run" span includes the "upload" span.
+    """
+
+    class Meta:
+        ordering = ['started']
+
+    algorithm_task = models.ForeignKey(
+        AlgorithmTask, on_delete=models.CASCADE, related_name='spans'
+    )
+    name = models.CharField(max_length=255)
+    started = models.DateTimeField()
+    duration = models.FloatField(help_text='How long the step took, in seconds.')
+    bytes = models.PositiveBigIntegerField(
+        null=True, blank=True, help_text='Bytes downloaded or uploaded by the step, if any.'
+    )
+
+
+class AlgorithmTaskLogChunk(TimeStampedModel):
+    """
+    Part of the container log of an AlgorithmTask, appended while it runs.
+
+    Storing the log in chunks lets it be appended to, and read from an offset, without reading
+    or writing the whole log.
+    """
+
+    class Meta:
+        ordering = ['index']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['algorithm_task', 'index'], name='unique_algorithm_task_log_chunk'
+            )
+        ]
+
+    algorithm_task = models.ForeignKey(
+        AlgorithmTask, on_delete=models.CASCADE, related_name='log_chunks'
+    )
+    index = models.PositiveIntegerField()
+    start = models.PositiveBigIntegerField(
+        help_text='The offset in the log of the first character of this chunk.'
+    )
+    content = models.TextField()
+
+
+class KeyframeSelection(TimeStampedModel):
+    """The frames of an FMV selected for TeleSculptor to track features in."""
+
+    class Mode(models.TextChoices):
+        STRIDE = 'stride'
+        MOTION = 'motion'
+        METADATA = 'metadata'
+
+    algorithm_task = models.OneToOneField(
+        AlgorithmTask, on_delete=models.CASCADE, related_name='keyframe_selection'
+    )
+    mode = models.CharField(max_length=20, choices=Mode.choices)
+    stride = models.PositiveIntegerField(
+        default=1, help_text='Select every n-th frame, in stride mode.'
+    )
+    motion_threshold = models.FloatField(
+        default=0.1,
+        help_text='Fraction of the frame width the view moves between keyframes.',
+    )
+    min_distance = models.FloatField(
+        default=10.0, help_text='Meters the sensor must move between keyframes, per the KLV.'
+    )
+
+    input_frames = models.PositiveIntegerField(null=True, blank=True)
+    selected_frames = models.PositiveIntegerField(null=True, blank=True)
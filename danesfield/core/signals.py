@@ -0,0 +1,110 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rdoasis.algorithms.models import Dataset
+from rgd.utility import skip_signal
+from rgd_3d.models import Mesh3D, Mesh3DSpatial, Tiles3DMeta
+from rgd_fmv.models import FMVMeta
+from rgd_imagery.models import RasterMeta
+
+from danesfield.core.utils.datasets import (
+    DATASET_ENTITIES,
+    datasets_containing,
+    invalidate_dataset_detail_cache,
+)
+from danesfield.core.utils.footprints import datasets_containing_entry, refresh_dataset_footprints
+
+DATASET_ENTITY_FILE_LOOKUPS = {
+    model: file_lookup for model, file_lookup in DATASET_ENTITIES.values()
+}
+
+
+def _dataset_files_changed(dataset_pks):
+    refresh_dataset_footprints(dataset_pks)
+    invalidate_dataset_detail_cache(dataset_pks)
+
+
+@receiver(m2m_changed, sender=Dataset.files.through)
+def _m2m_changed_dataset_files(sender, instance, action, reverse, pk_set, *args, **kwargs):
+    if not reverse:
+        # `instance` is the Dataset whose files changed
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _dataset_files_changed([instance.pk])
+        return
+
+    # `instance` is a ChecksumFile, and `pk_set` contains the affected Datasets. When clearing,
+    # `pk_set` is None, so the affected Datasets must be looked up before the rows are removed.
+    if action == 'pre_clear':
+        instance._affected_dataset_pks = list(
+            Dataset.objects.filter(files=instance).values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        _dataset_files_changed(getattr(instance, '_affected_dataset_pks', []))
+    elif action in ('post_add', 'post_remove'):
+        _dataset_files_changed(pk_set)
+
+
+@receiver(post_save, sender=Dataset)
+@receiver(post_delete, sender=Dataset)
+def _dataset_changed(sender, instance, *args, **kwargs):
+    invalidate_dataset_detail_cache([instance.pk])
+
+
+@receiver(post_save, sender=RasterMeta)
+@receiver(post_save, sender=Tiles3DMeta)
+@receiver(post_save, sender=Mesh3DSpatial)
+@receiver(post_save, sender=FMVMeta)
+@skip_signal()
+def _post_save_spatial_entry(sender, instance, *args, **kwargs):
+    refresh_dataset_footprints(datasets_containing_entry(instance))
+
+
+@receiver(pre_delete, sender=RasterMeta)
+@receiver(pre_delete, sender=Tiles3DMeta)
+@receiver(pre_delete, sender=Mesh3DSpatial)
+@receiver(pre_delete, sender=FMVMeta)
+@skip_signal()
+def _pre_delete_spatial_entry(sender, instance, *args, **kwargs):
+    # The link from the entry to its Datasets is gone after deletion, so record it now
+    instance._footprint_dataset_pks = datasets_containing_entry(instance)
+
+
+@receiver(post_delete, sender=RasterMeta)
+@receiver(post_delete, sender=Tiles3DMeta)
+@receiver(post_delete, sender=Mesh3DSpatial)
+@receiver(post_delete, sender=FMVMeta)
+@skip_signal()
+def _post_delete_spatial_entry(sender, instance, *args, **kwargs):
+    refresh_dataset_footprints(getattr(instance, '_footprint_dataset_pks', []))
+
+
+@receiver(post_save, sender=RasterMeta)
+@receiver(post_save, sender=Tiles3DMeta)
+@receiver(post_save, sender=Mesh3D)
+@receiver(post_save, sender=FMVMeta)
+@skip_signal()
+def _post_save_dataset_entity(sender, instance, created, *args, **kwargs):
+    # Only the pks of these entities are listed in the Dataset detail
+    if created:
+        invalidate_dataset_detail_cache(
+            datasets_containing(instance, DATASET_ENTITY_FILE_LOOKUPS[sender])
+        )
+
+
+@receiver(pre_delete, sender=RasterMeta)
+@receiver(pre_delete, sender=Tiles3DMeta)
+@receiver(pre_delete, sender=Mesh3D)
+@receiver(pre_delete, sender=FMVMeta)
+@skip_signal()
+def _pre_delete_dataset_entity(sender, instance, *args, **kwargs):
+    instance._detail_dataset_pks = datasets_containing(
+        instance, DATASET_ENTITY_FILE_LOOKUPS[sender]
+    )
+
+
+@receiver(post_delete, sender=RasterMeta)
+@receiver(post_delete, sender=Tiles3DMeta)
+@receiver(post_delete, sender=Mesh3D)
+@receiver(post_delete, sender=FMVMeta)
+@skip_signal()
+def _post_delete_dataset_entity(sender, instance, *args, **kwargs):
+    invalidate_dataset_detail_cache(getattr(instance, '_detail_dataset_pks', []))
@@ -1,27 +1,99 @@
+from bisect import bisect_left
 import configparser
-from distutils.dir_util import copy_tree
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict
+from functools import partial
+import hashlib
 import json
 from mimetypes import guess_type
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 import shutil
 import tempfile
-from typing import List, Union
-import zipfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
 
 import celery
+from celery.utils import uuid
 from celery.utils.log import get_task_logger
-from django.db.models.signals import post_save
-from rdoasis.algorithms.models import AlgorithmTask, Dataset
+from crum import get_current_user
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from django.utils import timezone
+from rdoasis.algorithms.models import Algorithm, AlgorithmTask, Dataset
 from rdoasis.algorithms.tasks.common import ManagedTask
 from rdoasis.algorithms.tasks.docker import _run_algorithm_task_docker
-import requests
 from rgd.models import ChecksumFile, FileSet
-from rgd.models.utils import yield_checksumfiles
+from rgd.models.mixins import Status, TaskEventMixin
+from rgd.utility import compute_hash
 from rgd_3d.models import Mesh3D, Tiles3D
-from rgd_fmv.models import FMV
+from rgd_fmv.models import FMV, FMVMeta
 from rgd_imagery.models import Image, ImageSet, Raster
 
+from danesfield.core.models import (
+    AlgorithmTaskFingerprint,
+    AlgorithmTaskMetrics,
+    AlgorithmTaskSpan,
+    KeyframeSelection,
+    Pipeline,
+    PipelineBatch,
+    PipelineStage,
+    PipelineTile,
+    PipelineVideo,
+    PointCloudReduction,
+)
 from danesfield.core.utils import danesfield_algorithm, telesculptor_algorithm
+from danesfield.core.utils.checkpoints import (
+    CHECKPOINTS_DIR,
+    restore_stages,
+    resumable_task,
+    save_stages,
+)
+from danesfield.core.utils.datasets import invalidate_dataset_detail_cache
+from danesfield.core.utils.files import stream_checksum_file
+from danesfield.core.utils.fingerprints import algorithm_fingerprint, reusable_task
+from danesfield.core.utils.input_cache import InputCache, stage_checksumfiles
+from danesfield.core.utils.instrumentation import (
+    ContainerMemoryMonitor,
+    Span,
+    observe_peak_memory,
+    observe_span,
+    timed,
+)
+from danesfield.core.utils.keyframes import (
+    count_frames,
+    metadata_keyframes,
+    motion_keyframes,
+    stride_keyframes,
+    write_keyframes,
+)
+from danesfield.core.utils.logs import ContainerLogFollower, LogWriter
+from danesfield.core.utils.mesh_tiles import enu_to_ecef, mesh_to_tileset, read_geo_origin
+from danesfield.core.utils.model_store import ModelStore
+from danesfield.core.utils.point_clouds import (
+    POINT_CLOUD_REGEX,
+    is_point_cloud,
+    merge_point_clouds,
+    point_cloud_wkt,
+    preprocess_point_cloud,
+)
+from danesfield.core.utils.rasters import convert_to_cog, is_cog, is_geotiff, raster_wkt
+from danesfield.core.utils.scheduler import (
+    GPUJob,
+    GPUScheduler,
+    containers_on_gpu,
+    estimate_gpu_memory,
+)
+from danesfield.core.utils.tiling import (
+    merge_tilesets,
+    mosaic_rasters,
+    plan_point_cloud_tiles,
+    split_point_cloud,
+    tile_output_name,
+)
+from danesfield.core.utils.uploads import upload_output_files
 
 logger = get_task_logger(__name__)
 
@@ -29,14 +101,112 @@ RGD_IMAGERY_EXTENSIONS = ('.tif', '.png')
 RGD_FMV_EXTENSIONS = ('.mpg', '.mp4')
 RGD_3D_EXTENSIONS = ('.ply', '.obj')
 
+TELESCULPTOR_DIR = Path(__file__).parent.parent.parent.parent / 'telesculptor'
+TELESCULPTOR_FILES = ('telesculptor.sh', 'color-mesh.conf')
+# The mesh TeleSculptor fuses from the depth maps of an FMV, in local coordinates
+TELESCULPTOR_MESH_NAME = 'mesh.vtp'
 
-def _ingest_checksum_files(dataset: Dataset):
+
+def _queue_task_funcs(model: Type[TaskEventMixin], pks: List[int]):
+    """Queue the post-save tasks of many bulk-created objects as a single Celery group."""
+    model.objects.filter(pk__in=pks).update(status=Status.QUEUED)
+    tasks = celery.group(func.si(pk) for func in model.task_funcs for pk in pks)
+    transaction.on_commit(tasks.apply_async)
+
+
+def _ingest_3d_tiles(files: List[ChecksumFile], tileset_json_files: List[ChecksumFile]):
+    """
+    Create a FileSet and Tiles3D for every tileset.json in a list of files.
+
+    A tileset's FileSet contains every file under the directory of its tileset.json. Since a
+    ChecksumFile belongs to at most one FileSet, a tileset nested under another tileset shares
+    the FileSet of the outermost one, which references it.
+    """
+    # Sort the files by name once, so that the files under any directory are a contiguous
+    # range that can be found by bisection, rather than by scanning every file per tileset
+    files = sorted(files, key=lambda file: file.name)
+    names = [file.name for file in files]
+
+    tileset_dirs = {
+        json_file.pk: PurePosixPath(json_file.name).parent for json_file in tileset_json_files
+    }
+
+    # Sorting by path components places every directory directly before its subdirectories
+    root_dirs: List[PurePosixPath] = []
+    for tileset_dir in sorted(set(tileset_dirs.values()), key=lambda path: path.parts):
+        if not root_dirs or root_dirs[-1] not in (tileset_dir, *tileset_dir.parents):
+            root_dirs.append(tileset_dir)
+
+    file_sets = FileSet.objects.bulk_create([FileSet(name=str(root)) for root in root_dirs])
+    tileset_files: List[ChecksumFile] = []
+    for root, file_set in zip(root_dirs, file_sets):
+        prefix = '' if root == PurePosixPath('.') else f'{root}/'
+        i = bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix):
+            files[i].file_set = file_set
+            tileset_files.append(files[i])
+            i += 1
+    ChecksumFile.objects.bulk_update(tileset_files, ['file_set'], batch_size=1000)
+
+    tiles_3d = Tiles3D.objects.bulk_create(
+        [
+            Tiles3D(name=str(tileset_dirs[json_file.pk]), json_file=json_file)
+            for json_file in tileset_json_files
+        ]
+    )
+    _queue_task_funcs(Tiles3D, [tiles.pk for tiles in tiles_3d])
+
+
+def _uningested_files(dataset: Dataset) -> QuerySet:
+    """Return the files of a Dataset that haven't been ingested into any RGD model yet."""
+    return dataset.files.exclude(
+        Q(pk__in=Image.objects.values('file'))
+        | Q(pk__in=Mesh3D.objects.values('file'))
+        | Q(pk__in=FMV.objects.values('file'))
+        | Q(pk__in=Tiles3D.objects.values('json_file'))
+    )
+
+
+def _remove_orphaned_files(files: List[ChecksumFile]):
+    """
+    Delete those of a list of files which are no longer in any Dataset, with their ingested models.
+
+    Images go along with the ImageSet and Raster created for each of them. A tileset which loses
+    any of its files is removed as a whole, and the rest of its files are left to be ingested again.
+    """
+    orphans = ChecksumFile.objects.filter(pk__in=[file.pk for file in files]).exclude(
+        pk__in=Dataset.files.through.objects.values('checksumfile')
+    )
+    Raster.objects.filter(image_set__images__file__in=orphans).delete()
+    ImageSet.objects.filter(images__file__in=orphans).delete()
+
+    # Evaluated up front, as the files are taken out of their FileSets before it is deleted
+    file_set_pks = set(orphans.exclude(file_set=None).values_list('file_set', flat=True))
+    Tiles3D.objects.filter(json_file__file_set__in=file_set_pks).delete()
+    ChecksumFile.objects.filter(file_set__in=file_set_pks).update(file_set=None)
+    FileSet.objects.filter(pk__in=file_set_pks).delete()
+
+    # Images, meshes and FMVs are deleted along with their files
+    orphans.delete()
+
+
+def _ingest_checksum_files(
+    dataset: Dataset, files: Optional[QuerySet] = None, start_pipelines: bool = True
+):
+    """
+    Ingest the files of a Dataset into the relevant RGD models.
+
+    If ``files`` is given, only those files of the Dataset are ingested. If the Dataset contains
+    an FMV, a Pipeline is started to produce a model from it, unless ``start_pipelines`` is False.
+    """
     images: List[Image] = []
     meshes: List[Mesh3D] = []
     fmvs: List[FMV] = []
+    tileset_json_files: List[ChecksumFile] = []
 
+    dataset_files: List[ChecksumFile] = list(dataset.files.all())
     checksum_file: ChecksumFile
-    for checksum_file in dataset.files.all():
+    for checksum_file in dataset_files if files is None else files:
         extension: str = Path(checksum_file.name).suffix
 
         if not extension:
@@ -52,79 +222,237 @@ def _ingest_checksum_files(dataset: Dataset):
         elif file_type.startswith('video') or extension in RGD_FMV_EXTENSIONS:
             fmvs.append(FMV(file=checksum_file))
 
-        # 3D tiles is a special case - save all associated files into the
-        # database all at once
+        # 3D tiles is a special case - all associated files are grouped together below
         elif checksum_file.name.endswith('tileset.json'):
-            # Get the base directory of the 3D tiles dataset
-            tiles_3d_base_dir = Path(checksum_file.name).parent
-
-            # Create a fileset for this 3D tiles dataset
-            tiles_3d_fileset = FileSet.objects.create(name=tiles_3d_base_dir)
-
-            tiles_3d_fileset.checksumfile_set.set(
-                dataset.files.filter(name__startswith=tiles_3d_base_dir)
-            )
-            Tiles3D.objects.create(name=tiles_3d_base_dir, json_file=checksum_file)
+            tileset_json_files.append(checksum_file)
 
+    # Create everything in bulk, and queue all of the downstream processing at once, rather than
+    # relying on a post_save signal (and its Celery task) per created object
     if images:
         images = Image.objects.bulk_create(images)
-        for image in images:
-            # bulk_create doesn't send this signal, so we must do it manually
-            post_save.send(Image, instance=image, created=True)
-            image_set = ImageSet.objects.create(name=image.file.name)
-            image_set.images.set([image])
-            Raster.objects.create(name=image.file.name, image_set=image_set)
+        image_sets = ImageSet.objects.bulk_create(
+            [ImageSet(name=image.file.name) for image in images]
+        )
+        ImageSet.images.through.objects.bulk_create(
+            [
+                ImageSet.images.through(imageset=image_set, image=image)
+                for image_set, image in zip(image_sets, images)
+            ]
+        )
+        rasters = Raster.objects.bulk_create(
+            [Raster(name=image_set.name, image_set=image_set) for image_set in image_sets]
+        )
+        _queue_task_funcs(Image, [image.pk for image in images])
+        _queue_task_funcs(Raster, [raster.pk for raster in rasters])
+
+    if tileset_json_files:
+        _ingest_3d_tiles(dataset_files, tileset_json_files)
 
     if meshes:
-        Mesh3D.objects.bulk_create(meshes)
-        for mesh in meshes:
-            # bulk_create doesn't send this signal, so we must do it manually
-            post_save.send(Mesh3D, instance=mesh, created=True)
+        meshes = Mesh3D.objects.bulk_create(meshes)
+        _queue_task_funcs(Mesh3D, [mesh.pk for mesh in meshes])
 
     if fmvs:
-        FMV.objects.bulk_create(fmvs)
-        for fmv in fmvs:
-            # bulk_create doesn't send this signal, so we must do it manually
-            post_save.send(FMV, instance=fmv, created=True)
-        run_telesculptor(dataset.pk)
+        fmvs = FMV.objects.bulk_create(fmvs)
+        _queue_task_funcs(FMV, [fmv.pk for fmv in fmvs])
+        if start_pipelines:
+            start_pipeline(dataset)
+
+    # bulk_create doesn't send post_save, so the cached detail of this Dataset is cleared here
+    invalidate_dataset_detail_cache([dataset.pk])
+
+
+def _danesfield_config(dataset: Dataset) -> dict:
+    """Return the parts of the Danesfield config.ini which don't depend on the worker's paths."""
+    return {
+        'aoi': {'name': dataset.name.replace(' ', '_')},
+        'params': {'gsd': 0.25},
+        'roof': {'model_prefix': 'dayton_geon'},
+        'models': {'version': settings.DANESFIELD_MODELS_VERSION},
+    }
+
+
+def _telesculptor_config(keyframes: Optional[dict] = None) -> dict:
+    """Return the checksums of the scripts that configure the TeleSculptor pipeline."""
+    config = {
+        name: hashlib.sha256((TELESCULPTOR_DIR / name).read_bytes()).hexdigest()
+        for name in TELESCULPTOR_FILES
+    }
+    if keyframes:
+        config['keyframes'] = keyframes
+    return config
+
+
+def _record_span(algorithm_task: AlgorithmTask, span: Span):
+    """Persist a timed step of an AlgorithmTask, and export it to Prometheus."""
+    AlgorithmTaskSpan.objects.create(
+        algorithm_task=algorithm_task,
+        name=span.name,
+        started=span.started,
+        duration=span.duration,
+        bytes=span.bytes,
+    )
+    observe_span(algorithm_task.algorithm.name, span)
+
+
+class CachedInputsTask(ManagedTask):
+    """
+    A ManagedTask which stages its input files through the worker's local input cache.
+
+    Its output files are uploaded in parallel, reusing any identical existing files.
+
+    If the algorithm needs a GPU, it is only run once the worker's GPU scheduler admits it.
+
+    Each step is timed, and recorded as a span of the AlgorithmTask.
+    """
+
+    @contextmanager
+    def _span(self, name: str) -> Iterator[Span]:
+        """Time a step of this task, recording it even if the step fails."""
+        try:
+            with timed(name) as span:
+                yield span
+        finally:
+            _record_span(self.algorithm_task, span)
+
+    def _stage_inputs(self):
+        with self._span('stage-inputs') as span:
+            stats = stage_checksumfiles(
+                self.algorithm_task.input_dataset.files.all(),
+                self.input_dir,
+                InputCache.from_settings(),
+            )
+            span.bytes = stats.bytes_downloaded
+        AlgorithmTaskMetrics.objects.update_or_create(
+            algorithm_task=self.algorithm_task,
+            defaults={
+                'input_cache_hits': stats.hits,
+                'input_cache_misses': stats.misses,
+                'input_cache_bytes_saved': stats.bytes_saved,
+                'input_bytes_downloaded': stats.bytes_downloaded,
+            },
+        )
+        logger.info(
+            f'Staged inputs of AlgorithmTask ({self.algorithm_task.pk}): '
+            f'{stats.hits} cached, {stats.misses} downloaded, {stats.bytes_saved} bytes saved.'
+        )
+
+    def _upload_result_files(self):
+        """Upload the output files in parallel, reusing any identical existing files."""
+        with self._span('upload') as span:
+            pipeline = self._pipeline()
+            reused, created, stats = upload_output_files(
+                Path(self.output_dir),
+                settings.DANESFIELD_UPLOAD_WORKERS,
+                pipeline.created_by if pipeline is not None else None,
+            )
+            span.bytes = stats.uploaded_bytes
+        _queue_task_funcs(ChecksumFile, [file.pk for file in created])
+
+        algorithm_task = self.algorithm_task
+        if algorithm_task.output_dataset is None:
+            algorithm_task.output_dataset = Dataset.objects.create(
+                name=f'{algorithm_task.algorithm.name} Output ({algorithm_task.pk})'
+            )
+            algorithm_task.save(update_fields=['output_dataset'])
+        algorithm_task.output_dataset.files.add(*reused, *created)
+
+        AlgorithmTaskMetrics.objects.update_or_create(
+            algorithm_task=algorithm_task,
+            defaults={
+                'output_files_uploaded': stats.uploaded_files,
+                'output_bytes_uploaded': stats.uploaded_bytes,
+                'output_files_deduplicated': stats.deduplicated_files,
+                'output_bytes_deduplicated': stats.deduplicated_bytes,
+                'output_upload_duration': stats.duration,
+            },
+        )
+        logger.info(
+            f'Uploaded outputs of AlgorithmTask ({algorithm_task.pk}): '
+            f'{stats.uploaded_files} files ({stats.uploaded_bytes} bytes) in '
+            f'{stats.duration:.1f}s at {stats.throughput / 1024**2:.1f} MiB/s, '
+            f'{stats.deduplicated_files} files ({stats.deduplicated_bytes} bytes) reused.'
+        )
+
+    def _pipeline(self) -> Optional[Pipeline]:
+        """Return the Pipeline this task is run by, for one of its stages, tiles or FMVs, if any."""
+        task = self.algorithm_task
+        return (
+            Pipeline.objects.filter(
+                Q(stages__algorithm_task=task)
+                | Q(tiles__algorithm_task=task)
+                | Q(videos__algorithm_task=task)
+            )
+            .select_related('batch', 'created_by')
+            .first()
+        )
+
+    def _gpu_job(self) -> GPUJob:
+        """Describe the GPU resources this task needs, and how it should be prioritized."""
+        input_size = sum(p.stat().st_size for p in Path(self.input_dir).rglob('*') if p.is_file())
+        job = GPUJob(
+            id=str(self.algorithm_task.pk),
+            memory=estimate_gpu_memory(self.algorithm_task.algorithm.name, input_size),
+        )
+
+        pipeline = self._pipeline()
+        if pipeline is not None:
+            job.owner = str(pipeline.created_by_id or '')
+            if pipeline.batch is not None and pipeline.batch.priority is not None:
+                job.priority = pipeline.batch.priority
+
+        return job
+
+    def _record_peak_memory(self, peak: Optional[int]):
+        if peak is None:
+            return
+        AlgorithmTaskMetrics.objects.update_or_create(
+            algorithm_task=self.algorithm_task, defaults={'container_peak_memory': peak}
+        )
+        observe_peak_memory(self.algorithm_task.algorithm.name, peak)
+
+    def __call__(self, **kwargs):
+        # The AlgorithmTask is only known once set up, so a failed setup isn't recorded
+        with timed('setup') as setup:
+            self._setup(**kwargs)
+        _record_span(self.algorithm_task, setup)
 
+        self._stage_inputs()
+        with ExitStack() as stack:
+            if self.algorithm_task.algorithm.gpu:
+                with self._span('gpu-wait'):
+                    device_index = stack.enter_context(
+                        GPUScheduler.from_settings().admitted(self._gpu_job())
+                    )
+                stack.enter_context(containers_on_gpu(device_index))
 
-class DanesfieldTask(ManagedTask):
+            # Store the container log as it is written, so that it can be followed
+            writer = LogWriter(self.algorithm_task)
+            stack.enter_context(ContainerLogFollower(Path(self.input_dir), writer.append))
+            monitor = stack.enter_context(ContainerMemoryMonitor(Path(self.input_dir)))
+            try:
+                with self._span('run'):
+                    return self.run(**kwargs)
+            finally:
+                self._record_peak_memory(monitor.peak)
+
+
+class DanesfieldTask(CachedInputsTask):
     """Subclass ManagedTask to add extra functionality."""
 
     def _ensure_model_files(self):
         """
-        Download any model files needed.
+        Link any model files needed into the input dir, downloading them if needed.
 
         Currently, the only needed model is the Columbia Geon Segmentation Model.
         """
-        # Check if models dir already exists, and if not, download
-        self.models_dir = Path('/tmp/danesfield_models')
-        if not self.models_dir.exists():
-            # Else, download models
-            url = 'https://data.kitware.com/api/v1/resource/download'
-            params = {'resources': json.dumps({'folder': ['5fa1b6c850a41e3d192de93b']})}
-
-            logger.info('Downloading model files. This may take a while...')
-
-            # Download file
-            _, folder_zip_path = tempfile.mkstemp()
-            with requests.get(url, params=params, stream=True) as r:
-                with open(folder_zip_path, 'wb') as f:
-                    shutil.copyfileobj(r.raw, f)
-
-            # Extract folder from zip
-            self.models_dir.mkdir()
-            with zipfile.ZipFile(folder_zip_path) as z:
-                z.extractall(self.models_dir)
-
-        # Copy to input dir
-        copy_tree(src=str(self.models_dir), dst=str(self.input_dir))
+        with self._span('model-files'):
+            ModelStore.from_settings().link_into(self.input_dir)
 
     def _write_config_file(self):
         """Create and write the config file."""
         # Get point cloud file from input dataset
-        point_cloud_path = [path for path in self.input_dataset_paths if path.suffix == '.las'][0]
+        point_cloud_path = [path for path in self.input_dataset_paths if is_point_cloud(path)][0]
 
         # Construct config
         config = configparser.ConfigParser()
@@ -134,11 +462,12 @@ class DanesfieldTask(ManagedTask):
             'rpc_dir': tempfile.mkdtemp(),
         }
 
-        config['aoi'] = {'name': self.algorithm_task.input_dataset.name.replace(' ', '_')}
-        config['params'] = {'gsd': 0.25}
+        params = _danesfield_config(self.algorithm_task.input_dataset)
+        config['aoi'] = params['aoi']
+        config['params'] = params['params']
         config['roof'] = {
             'model_dir': f'{self.input_dir}/Columbia Geon Segmentation Model',
-            'model_prefix': 'dayton_geon',
+            **params['roof'],
         }
 
         # Write config to disk
@@ -146,36 +475,126 @@ class DanesfieldTask(ManagedTask):
         with open(self.config_path, 'w') as configfile:
             config.write(configfile)
 
-    def _upload_result_files(self):
-        super()._upload_result_files()
-        _ingest_checksum_files(self.algorithm_task.output_dataset)
-
     def _setup(self, **kwargs):
         super()._setup(**kwargs)
 
         self._ensure_model_files()
         self._write_config_file()
 
+    def on_success(self, retval, task_id, args, kwargs):
+        super().on_success(retval, task_id, args, kwargs)
+        _algorithm_task_finished(self.algorithm_task, succeeded=True)
 
-class KWIVERTask(ManagedTask):
-    def __call__(self, **kwargs):
-        self._setup(**kwargs)
-        shutil.copy(
-            str(Path(__file__).parent.parent.parent.parent / 'telesculptor' / 'telesculptor.sh'),
-            self.input_dir,
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        super().on_failure(exc, task_id, args, kwargs, einfo)
+        _algorithm_task_finished(self.algorithm_task, succeeded=False)
+
+
+class KWIVERTask(CachedInputsTask):
+    def _setup(self, **kwargs):
+        super()._setup(**kwargs)
+        for name in TELESCULPTOR_FILES:
+            shutil.copy(str(TELESCULPTOR_DIR / name), self.input_dir)
+
+        if settings.DANESFIELD_TELESCULPTOR_RESUME:
+            self._resume_stages()
+
+    @property
+    def _keyframe_selection(self) -> Optional[KeyframeSelection]:
+        return KeyframeSelection.objects.filter(algorithm_task=self.algorithm_task).first()
+
+    def _resume_stages(self):
+        """Restore the results of any stages completed by an earlier, failed, identical run."""
+        selection = self._keyframe_selection
+        keyframes = None
+        if selection is not None:
+            keyframes = {
+                'mode': selection.mode,
+                'stride': selection.stride,
+                'motion_threshold': selection.motion_threshold,
+                'min_distance': selection.min_distance,
+            }
+        fingerprint = algorithm_fingerprint(
+            self.algorithm_task.algorithm,
+            self.algorithm_task.input_dataset,
+            _telesculptor_config(keyframes),
         )
-        shutil.copy(
-            str(Path(__file__).parent.parent.parent.parent / 'telesculptor' / 'color-mesh.conf'),
-            self.input_dir,
+        previous = resumable_task(self.algorithm_task, fingerprint)
+        if previous is None:
+            return
+
+        restored = restore_stages(self.algorithm_task, previous, Path(self.output_dir))
+        logger.info(
+            f'Resuming from AlgorithmTask ({previous.pk}), skipping stages: {", ".join(restored)}'
         )
-        with yield_checksumfiles(self.algorithm_task.input_dataset.files.all(), self.input_dir):
-            return self.run(**kwargs)
+
+    def _stage_inputs(self):
+        super()._stage_inputs()
+        selection = self._keyframe_selection
+        if selection is not None:
+            with self._span('select-keyframes'):
+                self._select_keyframes(selection)
+
+    def _select_keyframes(self, selection: KeyframeSelection):
+        """
+        Write the frames of the FMV which TeleSculptor tracks features in.
+
+        Tracking features is the slowest stage of TeleSculptor, and successive frames of an FMV
+        mostly overlap, so only tracking keyframes saves time while adding few new points. The
+        other stages still read the metadata of every frame from the FMV itself.
+        """
+        file = next(
+            file
+            for file in self.algorithm_task.input_dataset.files.all()
+            if Path(file.name).suffix.lower() in RGD_FMV_EXTENSIONS
+        )
+        path = Path(self.input_dir, file.name)
+
+        frames = None
+        if selection.mode == KeyframeSelection.Mode.MOTION:
+            frames = motion_keyframes(path, selection.motion_threshold)
+        elif selection.mode == KeyframeSelection.Mode.METADATA:
+            meta: Optional[FMVMeta] = FMVMeta.objects.filter(fmv_file__file=file).first()
+            if meta is not None and meta.flight_path and meta.frame_numbers:
+                # KLV frame numbers start at 1, as in KWIVER
+                frames = metadata_keyframes(
+                    [frame - 1 for frame in meta.frame_numbers],
+                    [point.coords for point in meta.flight_path],
+                    selection.min_distance,
+                )
+            else:
+                logger.warning(f'No KLV metadata for {file.name}, selecting keyframes by stride.')
+        if frames is None:
+            frames = stride_keyframes(count_frames(path), selection.stride)
+
+        stats = write_keyframes(path, frames, Path(self.input_dir, 'keyframes'))
+        selection.input_frames = stats.input_frames
+        selection.selected_frames = stats.selected_frames
+        selection.save(update_fields=['input_frames', 'selected_frames', 'modified'])
+        logger.info(
+            f'Selected {stats.selected_frames} of {stats.input_frames} frames of {file.name}.'
+        )
+
+    def __call__(self, **kwargs):
+        try:
+            return super().__call__(**kwargs)
+        finally:
+            # Keep the results of every completed stage, even if a later stage failed
+            save_stages(self.algorithm_task, Path(self.output_dir))
+
+    def _upload_result_files(self):
+        save_stages(self.algorithm_task, Path(self.output_dir))
+        # The stage results themselves are part of the outputs, but their checkpoints aren't
+        shutil.rmtree(Path(self.output_dir) / CHECKPOINTS_DIR, ignore_errors=True)
+        super()._upload_result_files()
 
     def on_success(self, retval, task_id, args, kwargs):
         super().on_success(retval, task_id, args, kwargs)
+        _algorithm_task_finished(self.algorithm_task, succeeded=True)
 
-        # Now, run Danesfield on the point cloud outputted by KWIVER
-        run_danesfield(self.algorithm_task.output_dataset.pk)
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        super().on_failure(exc, task_id, args, kwargs, einfo)
+        _algorithm_task_finished(self.algorithm_task, succeeded=False)
 
 
 @celery.shared_task(base=DanesfieldTask, bind=True, queue='danesfield')
@@ -188,11 +607,828 @@ def run_kwiver_task(self: KWIVERTask, *args, **kwargs):
     _run_algorithm_task_docker(self, *args, **kwargs)
 
 
-def run_danesfield(input_dataset_pk: Union[str, int]) -> AlgorithmTask:
+class _DispatchOnCommit:
+    """Wrap a Celery task, so that it is only sent once the current transaction commits."""
+
+    def __init__(self, task: celery.Task):
+        self._task = task
+
+    def __getattr__(self, name: str):
+        return getattr(self._task, name)
+
+    def apply_async(self, args=None, kwargs=None, task_id: Optional[str] = None, **options):
+        # The result is returned before the task is sent, so its id is chosen here
+        task_id = task_id or uuid()
+        transaction.on_commit(
+            partial(self._task.apply_async, args, kwargs, task_id=task_id, **options)
+        )
+        return self._task.AsyncResult(task_id)
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+
+def _run_or_reuse(
+    algorithm: Algorithm,
+    dataset: Dataset,
+    config: dict,
+    celery_task: celery.Task,
+    force: bool,
+    prepare: Optional[Callable[[AlgorithmTask], None]] = None,
+) -> AlgorithmTask:
+    """
+    Run an Algorithm on a Dataset, unless an identical run has already succeeded.
+
+    If ``force`` is True, the Algorithm is always run. ``prepare`` is called with a new
+    AlgorithmTask, to create anything its worker reads, before the task is dispatched.
+    """
+    fingerprint = algorithm_fingerprint(algorithm, dataset, config)
+    if not force:
+        task = reusable_task(algorithm, fingerprint)
+        if task is not None:
+            logger.info(
+                f'Reusing the outputs of AlgorithmTask ({task.pk}) for Dataset ({dataset.pk}).'
+            )
+            return task
+
+    with transaction.atomic():
+        task = algorithm.run(dataset.pk, celery_task=_DispatchOnCommit(celery_task))
+        if fingerprint is not None:
+            AlgorithmTaskFingerprint.objects.create(algorithm_task=task, fingerprint=fingerprint)
+        if prepare is not None:
+            prepare(task)
+    return task
+
+
+def run_danesfield(input_dataset_pk: Union[str, int], force: bool = False) -> AlgorithmTask:
     danesfield = danesfield_algorithm()
-    return danesfield.run(input_dataset_pk, celery_task=run_danesfield_task)
+    dataset = Dataset.objects.get(pk=input_dataset_pk)
+    return _run_or_reuse(
+        danesfield, dataset, _danesfield_config(dataset), run_danesfield_task, force
+    )
 
 
-def run_telesculptor(input_dataset_pk: Union[str, int]) -> AlgorithmTask:
+def run_telesculptor(
+    input_dataset_pk: Union[str, int], force: bool = False, keyframes: Optional[dict] = None
+) -> AlgorithmTask:
+    """
+    Run TeleSculptor on a Dataset containing an FMV.
+
+    If ``keyframes`` is given, only the frames it selects are tracked. It has a ``mode``, of
+    "stride", "motion" or "metadata", and the ``stride``, ``motion_threshold`` or
+    ``min_distance`` the mode uses.
+    """
     telesculptor = telesculptor_algorithm()
-    return telesculptor.run(input_dataset_pk, celery_task=run_kwiver_task)
+    dataset = Dataset.objects.get(pk=input_dataset_pk)
+
+    def prepare(task: AlgorithmTask):
+        if keyframes:
+            KeyframeSelection.objects.create(algorithm_task=task, **keyframes)
+
+    return _run_or_reuse(
+        telesculptor, dataset, _telesculptor_config(keyframes), run_kwiver_task, force, prepare
+    )
+
+
+def _stage_input_dataset(stage: PipelineStage) -> Dataset:
+    """Return the Dataset produced by the previous stage, or the input of the Pipeline."""
+    previous = stage.pipeline.stages.filter(index__lt=stage.index).last()
+    return previous.output_dataset if previous is not None else stage.pipeline.input_dataset
+
+
+def _ingest_input_stage(stage: PipelineStage):
+    dataset = stage.pipeline.input_dataset
+    _ingest_checksum_files(dataset, _uningested_files(dataset), start_pipelines=False)
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=dataset)
+
+
+def _split_videos_stage(stage: PipelineStage):
+    """Give each of many FMVs its own Dataset, so that TeleSculptor processes them separately."""
+    dataset = _stage_input_dataset(stage)
+    videos = [
+        file
+        for file in dataset.files.order_by('name')
+        if Path(file.name).suffix.lower() in RGD_FMV_EXTENSIONS
+    ]
+    if len(videos) > 1:
+        for index, video in enumerate(videos):
+            video_dataset = Dataset.objects.create(name=f'{dataset.name} ({video.name})')
+            video_dataset.files.add(video)
+            PipelineVideo.objects.create(
+                pipeline=stage.pipeline, index=index, name=video.name, input_dataset=video_dataset
+            )
+        logger.info(f'Split Dataset ({dataset.pk}) into {len(videos)} FMVs.')
+
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=dataset)
+
+
+def _telesculptor_stage(stage: PipelineStage):
+    run = run_telesculptor
+    if stage.pipeline.keyframes:
+        run = partial(run_telesculptor, keyframes=stage.pipeline.keyframes)
+
+    videos: List[PipelineVideo] = list(stage.pipeline.videos.all())
+    if not videos:
+        _run_algorithm_stage(stage, run)
+        return
+
+    # Run every FMV as an independent AlgorithmTask, which may run on any worker
+    for video in videos:
+        video.algorithm_task = run(video.input_dataset_id, force=stage.pipeline.force)
+    PipelineVideo.objects.bulk_update(videos, ['algorithm_task'])
+    _fan_out_task_finished(stage, PipelineVideo)
+
+
+def _merge_point_clouds_stage(stage: PipelineStage):
+    """Merge the point clouds TeleSculptor produced from each FMV into one."""
+    videos: List[PipelineVideo] = list(
+        stage.pipeline.videos.filter(
+            algorithm_task__status=AlgorithmTask.Status.SUCCEEDED
+        ).select_related('algorithm_task__output_dataset')
+    )
+    if not videos:
+        _finish_stage(stage, Status.SUCCEEDED, output_dataset=_stage_input_dataset(stage))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for video in videos:
+            point_cloud = video.algorithm_task.output_dataset.files.filter(
+                name__regex=POINT_CLOUD_REGEX
+            ).first()
+            paths.append(Path(tmp_dir) / f'{video.index}_{PurePosixPath(point_cloud.name).name}')
+            stream_checksum_file(point_cloud, paths[-1])
+
+        merged_path = Path(tmp_dir) / 'merged' / PurePosixPath(point_cloud.name).name
+        merged_path.parent.mkdir()
+        points = merge_point_clouds(paths, merged_path)
+
+        output_dataset = Dataset.objects.create(
+            name=f'{stage.pipeline.input_dataset.name} (merged point cloud)'
+        )
+        with open(merged_path, 'rb') as fd:
+            checksum = compute_hash(fd)
+            fd.seek(0)
+            output_dataset.files.add(
+                ChecksumFile.objects.create(
+                    name=point_cloud.name, checksum=checksum, file=File(fd, merged_path.name)
+                )
+            )
+
+    logger.info(f'Merged the point clouds of {len(videos)} FMVs, with {points} points in total.')
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=output_dataset)
+
+
+def _preprocess_stage(stage: PipelineStage):
+    """Decimate the point cloud to the resolution Danesfield needs, and crop it to the AOI."""
+    dataset = _stage_input_dataset(stage)
+    point_cloud = dataset.files.filter(name__regex=POINT_CLOUD_REGEX).first()
+    gsd = _danesfield_config(dataset)['params']['gsd']
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / PurePosixPath(point_cloud.name).name
+        stream_checksum_file(point_cloud, path)
+
+        aoi = None
+        if stage.pipeline.aoi is not None:
+            wkt = point_cloud_wkt(path)
+            if wkt is None:
+                logger.warning(
+                    f'The point cloud of Dataset ({dataset.pk}) has no coordinate system, '
+                    'so it is not cropped to the AOI.'
+                )
+            else:
+                aoi = list(stage.pipeline.aoi.transform(wkt, clone=True).coords)
+
+        output_path = path.with_name(f'{path.stem}_{gsd}m.laz')
+        stats = preprocess_point_cloud(path, output_path, gsd, aoi)
+
+        output_dataset = Dataset.objects.create(name=f'{dataset.name} (pre-processed)')
+        with open(output_path, 'rb') as fd:
+            checksum = compute_hash(fd)
+            fd.seek(0)
+            output_dataset.files.add(
+                ChecksumFile.objects.create(
+                    name=str(PurePosixPath(point_cloud.name).with_name(output_path.name)),
+                    checksum=checksum,
+                    file=File(fd, output_path.name),
+                )
+            )
+
+    PointCloudReduction.objects.create(stage=stage, **asdict(stats))
+    logger.info(
+        f'Pre-processed the point cloud of Dataset ({dataset.pk}) from {stats.input_points} points '
+        f'({stats.input_bytes} bytes) to {stats.output_points} points ({stats.output_bytes} bytes).'
+    )
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=output_dataset)
+
+
+def _tile_stage(stage: PipelineStage):
+    """Split the point cloud into tiles of balanced density, each with its own Dataset."""
+    dataset = _stage_input_dataset(stage)
+    point_cloud = dataset.files.filter(name__regex=POINT_CLOUD_REGEX).first()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / PurePosixPath(point_cloud.name).name
+        stream_checksum_file(point_cloud, path)
+
+        tiles = plan_point_cloud_tiles(path, settings.DANESFIELD_TILE_POINTS)
+        if len(tiles) > 1:
+            tile_paths = split_point_cloud(
+                path, Path(tmp_dir) / 'tiles', tiles, settings.DANESFIELD_TILE_OVERLAP
+            )
+            for index, (tile, tile_path) in enumerate(zip(tiles, tile_paths)):
+                tile_dataset = Dataset.objects.create(name=f'{dataset.name} (tile {index})')
+                with open(tile_path, 'rb') as fd:
+                    checksum = compute_hash(fd)
+                    fd.seek(0)
+                    tile_dataset.files.add(
+                        ChecksumFile.objects.create(
+                            name=point_cloud.name, checksum=checksum, file=File(fd, path.name)
+                        )
+                    )
+                PipelineTile.objects.create(
+                    pipeline=stage.pipeline,
+                    index=index,
+                    min_x=tile.bounds[0],
+                    min_y=tile.bounds[1],
+                    max_x=tile.bounds[2],
+                    max_y=tile.bounds[3],
+                    points=tile.points,
+                    input_dataset=tile_dataset,
+                )
+
+    logger.info(f'Split the point cloud of Dataset ({dataset.pk}) into {len(tiles)} tiles.')
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=dataset)
+
+
+def _danesfield_stage(stage: PipelineStage):
+    tiles: List[PipelineTile] = list(stage.pipeline.tiles.all())
+    if not tiles:
+        _run_algorithm_stage(stage, run_danesfield)
+        return
+
+    # Run every tile as an independent AlgorithmTask, which may run on any worker
+    for tile in tiles:
+        tile.algorithm_task = run_danesfield(tile.input_dataset_id, force=stage.pipeline.force)
+    PipelineTile.objects.bulk_update(tiles, ['algorithm_task'])
+    _fan_out_task_finished(stage, PipelineTile)
+
+
+def _fan_out_task_finished(stage: PipelineStage, model: Type[Union[PipelineTile, PipelineVideo]]):
+    """
+    Finish a stage which runs an AlgorithmTask per tile or FMV, once they have all finished.
+
+    Every tile is needed for a complete model, so a tiled stage fails as soon as any tile fails.
+    A stage of many FMVs only fails if every FMV failed, as the others still make a model.
+    """
+    with transaction.atomic():
+        # Parts may finish concurrently, but the stage must only be finished once
+        if not PipelineStage.objects.select_for_update().filter(pk=stage.pk, status=Status.RUNNING):
+            return
+
+        statuses = list(
+            model.objects.filter(pipeline=stage.pipeline_id).values_list(
+                'algorithm_task__status', flat=True
+            )
+        )
+        finished = [
+            status
+            for status in statuses
+            if status in (AlgorithmTask.Status.SUCCEEDED, AlgorithmTask.Status.FAILED)
+        ]
+        if model is PipelineTile and AlgorithmTask.Status.FAILED in finished:
+            _finish_stage(stage, Status.FAILED)
+        elif len(finished) == len(statuses):
+            # The outputs of the parts are merged by the next stage
+            succeeded = AlgorithmTask.Status.SUCCEEDED in finished
+            _finish_stage(stage, Status.SUCCEEDED if succeeded else Status.FAILED)
+
+
+def _merge_tiles_stage(stage: PipelineStage):
+    """Merge the outputs of every tile into a single Dataset."""
+    tiles: List[PipelineTile] = list(
+        stage.pipeline.tiles.select_related('algorithm_task__output_dataset')
+    )
+    if not tiles:
+        _finish_stage(stage, Status.SUCCEEDED, output_dataset=_stage_input_dataset(stage))
+        return
+
+    output_dataset = Dataset.objects.create(name=f'{stage.pipeline.input_dataset.name} (merged)')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _merge_tile_outputs(
+            [tile.algorithm_task.output_dataset for tile in tiles], output_dataset, Path(tmp_dir)
+        )
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=output_dataset)
+
+
+def _merge_tile_outputs(datasets: List[Dataset], output_dataset: Dataset, tmp_dir: Path):
+    """
+    Merge the outputs of Danesfield for many tiles into one Dataset.
+
+    Rasters of the same name are mosaicked, and 3D tilesets are referenced by a single root
+    tileset. Every other file is kept per tile, renamed without copying its contents.
+    """
+    rasters: Dict[str, List[ChecksumFile]] = {}
+    tilesets: Dict[str, dict] = {}
+    merged: List[ChecksumFile] = []
+    for index, dataset in enumerate(datasets):
+        files: List[ChecksumFile] = list(dataset.files.all())
+        tileset_files = [file for file in files if file.name.endswith('tileset.json')]
+        # Only the outermost tileset of each tile is referenced, which references the others
+        tileset_dirs = sorted(
+            {PurePosixPath(file.name).parent for file in tileset_files},
+            key=lambda path: len(path.parts),
+        )[:1]
+
+        for file in files:
+            if file.name.endswith(('.tif', '.tiff')):
+                rasters.setdefault(file.name, []).append(file)
+                continue
+
+            name = tile_output_name(index, file.name, tileset_dirs)
+            if tileset_dirs and PurePosixPath(file.name) == tileset_dirs[0] / 'tileset.json':
+                with file.file.open('rb') as fd:
+                    tilesets[str(PurePosixPath(name).relative_to('tiler'))] = json.load(fd)
+
+            # Renamed, referencing the same stored object rather than uploading it again
+            renamed = ChecksumFile(name=name, checksum=file.checksum)
+            renamed.file.name = file.file.name
+            merged.append(renamed)
+
+    for name, files in rasters.items():
+        paths = []
+        for i, file in enumerate(files):
+            paths.append(tmp_dir / f'{i}_{PurePosixPath(name).name}')
+            stream_checksum_file(file, paths[-1])
+        mosaic_path = tmp_dir / PurePosixPath(name).name
+        mosaic_rasters(paths, mosaic_path)
+        with open(mosaic_path, 'rb') as fd:
+            mosaic = ChecksumFile(name=name, checksum=compute_hash(fd))
+            fd.seek(0)
+            mosaic.file.save(mosaic_path.name, File(fd), save=False)
+        merged.append(mosaic)
+        for path in [*paths, mosaic_path]:
+            path.unlink()
+
+    if tilesets:
+        root = ChecksumFile(name='tiler/tileset.json')
+        root.file.save(
+            'tileset.json', ContentFile(json.dumps(merge_tilesets(tilesets))), save=False
+        )
+        root.checksum = compute_hash(root.file.open('rb'))
+        merged.append(root)
+
+    output_dataset.files.add(*ChecksumFile.objects.bulk_create(merged))
+
+
+def _cog_stage(stage: PipelineStage):
+    """Convert the GeoTIFFs output by earlier stages into Cloud Optimized GeoTIFFs."""
+    dataset = _stage_input_dataset(stage)
+    files: List[ChecksumFile] = list(dataset.files.all())
+    if not any(is_geotiff(file.name) for file in files):
+        _finish_stage(stage, Status.SUCCEEDED, output_dataset=dataset)
+        return
+
+    # The input may be the reused output of another run, so isn't modified
+    output_files: List[ChecksumFile] = []
+    converted: List[ChecksumFile] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for file in files:
+            if not is_geotiff(file.name):
+                output_files.append(file)
+                continue
+
+            path = Path(tmp_dir) / PurePosixPath(file.name).name
+            stream_checksum_file(file, path)
+            if is_cog(path):
+                output_files.append(file)
+            else:
+                cog_path = path.with_name(f'cog_{path.name}')
+                convert_to_cog(path, cog_path)
+                with open(cog_path, 'rb') as fd:
+                    cog = ChecksumFile(name=file.name, checksum=compute_hash(fd))
+                    fd.seek(0)
+                    cog.file.save(path.name, File(fd), save=False)
+                converted.append(cog)
+                cog_path.unlink()
+
+                if settings.DANESFIELD_KEEP_ORIGINAL_RASTERS:
+                    # Renamed, so that only the converted raster is ingested
+                    original = ChecksumFile(name=f'{file.name}.original', checksum=file.checksum)
+                    original.file.name = file.file.name
+                    converted.append(original)
+            path.unlink()
+
+    output_dataset = Dataset.objects.create(name=f'{dataset.name} (cloud optimized)')
+    output_dataset.files.add(*output_files, *ChecksumFile.objects.bulk_create(converted))
+    logger.info(f'Converted the rasters of Dataset ({dataset.pk}) to Cloud Optimized GeoTIFFs.')
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=output_dataset)
+
+
+def _large_meshes(files: List[ChecksumFile], suffixes: Tuple[str, ...]) -> List[ChecksumFile]:
+    return [
+        file
+        for file in files
+        if file.name.endswith(suffixes)
+        and file.file
+        and file.file.size >= settings.DANESFIELD_MESH_TILES_MIN_SIZE
+    ]
+
+
+def _mesh_tileset_files(
+    mesh: ChecksumFile,
+    tileset_dir: PurePosixPath,
+    tmp_dir: Path,
+    transform: Optional[List[float]] = None,
+    wkt: Optional[str] = None,
+) -> List[ChecksumFile]:
+    """Convert a mesh into a 3D tileset under a directory, returning its unsaved files."""
+    path = tmp_dir / PurePosixPath(mesh.name).name
+    stream_checksum_file(mesh, path)
+    output_dir = tmp_dir / 'tiles'
+    mesh_to_tileset(
+        path,
+        output_dir,
+        settings.DANESFIELD_MESH_TILES_LEVELS,
+        settings.DANESFIELD_MESH_TILES_MAX_FACES,
+        transform,
+        wkt,
+    )
+
+    tileset_files: List[ChecksumFile] = []
+    for tile_path in sorted(output_dir.rglob('*')):
+        if not tile_path.is_file():
+            continue
+        with open(tile_path, 'rb') as fd:
+            tile_file = ChecksumFile(
+                name=str(tileset_dir / tile_path.relative_to(output_dir).as_posix()),
+                checksum=compute_hash(fd),
+            )
+            fd.seek(0)
+            tile_file.file.save(tile_path.name, File(fd), save=False)
+        tileset_files.append(tile_file)
+    shutil.rmtree(output_dir)
+    path.unlink()
+    return tileset_files
+
+
+def _tileset_dir(name: str) -> PurePosixPath:
+    path = PurePosixPath(name).with_suffix('')
+    return path.with_name(f'{path.name}_tiles')
+
+
+def _files_wkt(files: List[ChecksumFile], tmp_dir: Path) -> Optional[str]:
+    """Return the coordinate system of the smallest GeoTIFF of some files, if any."""
+    rasters = [file for file in files if is_geotiff(file.name) and file.file]
+    if not rasters:
+        return None
+    raster = min(rasters, key=lambda file: file.file.size)
+    path = tmp_dir / PurePosixPath(raster.name).name
+    stream_checksum_file(raster, path)
+    wkt = raster_wkt(path)
+    path.unlink()
+    return wkt
+
+
+def _telesculptor_outputs(pipeline: Pipeline) -> List[Tuple[PurePosixPath, Dataset]]:
+    """Return the output Dataset of TeleSculptor for each FMV of a Pipeline, and a name for it."""
+    videos: List[PipelineVideo] = list(
+        pipeline.videos.filter(algorithm_task__status=AlgorithmTask.Status.SUCCEEDED)
+        .select_related('algorithm_task__output_dataset')
+        .order_by('index')
+    )
+    if videos:
+        return [
+            (PurePosixPath('telesculptor', str(video.index)), video.algorithm_task.output_dataset)
+            for video in videos
+        ]
+
+    stage = pipeline.stages.filter(name='telesculptor', status=Status.SUCCEEDED).first()
+    if stage is not None and stage.output_dataset is not None:
+        return [(PurePosixPath('telesculptor'), stage.output_dataset)]
+    return []
+
+
+def _mesh_tiles_stage(stage: PipelineStage):
+    """
+    Convert large meshes into 3D tilesets with levels of detail, alongside the meshes.
+
+    The meshes output by earlier stages are in the coordinate system of the rasters output with
+    them, which places their tilesets on the globe. Meshes without such a raster are skipped.
+    The mesh TeleSculptor fuses from each FMV is tiled too, placed by the geo_origin.txt output
+    with it, though the mesh itself isn't ingested.
+    """
+    dataset = _stage_input_dataset(stage)
+    files: List[ChecksumFile] = list(dataset.files.all())
+    tileset_files: List[ChecksumFile] = []
+    tiled = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        meshes = _large_meshes(files, RGD_3D_EXTENSIONS)
+        wkt = _files_wkt(files, tmp_dir) if meshes else None
+        if meshes and wkt is None:
+            logger.warning(
+                f'Dataset ({dataset.pk}) has no georeferenced raster, so its meshes are not tiled.'
+            )
+        elif meshes:
+            for mesh in meshes:
+                tileset_files += _mesh_tileset_files(
+                    mesh, _tileset_dir(mesh.name), tmp_dir, wkt=wkt
+                )
+            tiled += len(meshes)
+
+        # TeleSculptor outputs meshes in local coordinates about this origin
+        for prefix, output_dataset in _telesculptor_outputs(stage.pipeline):
+            output_files: List[ChecksumFile] = list(output_dataset.files.all())
+            meshes = _large_meshes(output_files, (TELESCULPTOR_MESH_NAME,))
+            geo_origin = next(
+                (file for file in output_files if file.name.endswith('geo_origin.txt')), None
+            )
+            if not meshes or geo_origin is None:
+                continue
+
+            stream_checksum_file(geo_origin, tmp_dir / 'geo_origin.txt')
+            transform = enu_to_ecef(*read_geo_origin(tmp_dir / 'geo_origin.txt'))
+            for mesh in meshes:
+                tileset_files += _mesh_tileset_files(
+                    mesh, prefix / _tileset_dir(mesh.name), tmp_dir, transform=transform
+                )
+            tiled += len(meshes)
+
+    if not tileset_files:
+        _finish_stage(stage, Status.SUCCEEDED, output_dataset=dataset)
+        return
+
+    output_dataset = Dataset.objects.create(name=f'{dataset.name} (3D tiles)')
+    output_dataset.files.add(*files, *ChecksumFile.objects.bulk_create(tileset_files))
+    logger.info(f'Converted {tiled} meshes of Pipeline ({stage.pipeline_id}) into 3D tilesets.')
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=output_dataset)
+
+
+def _ingest_output_stage(stage: PipelineStage):
+    dataset = _stage_input_dataset(stage)
+    with timed('ingest') as span:
+        # The outputs of an earlier, identical run, or deduplicated files, are already ingested
+        _ingest_checksum_files(dataset, _uningested_files(dataset), start_pipelines=False)
+
+    # Record the ingestion as a step of the last AlgorithmTask of the Pipeline, if any
+    previous = stage.pipeline.stages.filter(
+        index__lt=stage.index, algorithm_task__isnull=False
+    ).last()
+    if previous is not None:
+        _record_span(previous.algorithm_task, span)
+    _finish_stage(stage, Status.SUCCEEDED, output_dataset=dataset)
+
+
+# The function run by each stage. Stages which launch an AlgorithmTask finish once it does.
+PIPELINE_STAGE_FUNCS = {
+    'ingest-input': _ingest_input_stage,
+    'split-videos': _split_videos_stage,
+    'telesculptor': _telesculptor_stage,
+    'merge-point-clouds': _merge_point_clouds_stage,
+    'preprocess': _preprocess_stage,
+    'tile': _tile_stage,
+    'danesfield': _danesfield_stage,
+    'merge-tiles': _merge_tiles_stage,
+    'cog': _cog_stage,
+    'mesh-tiles': _mesh_tiles_stage,
+    'ingest-output': _ingest_output_stage,
+}
+
+
+def _run_algorithm_stage(stage: PipelineStage, run: Callable[..., AlgorithmTask]):
+    task = run(_stage_input_dataset(stage).pk, force=stage.pipeline.force)
+    stage.algorithm_task = task
+    stage.save(update_fields=['algorithm_task', 'modified'])
+
+    # The outputs of an earlier, identical run may have been reused, or the task may have finished
+    # before it was recorded on the stage, so wasn't found by _algorithm_task_finished
+    _algorithm_stage_finished(stage)
+
+
+def _algorithm_stage_finished(stage: PipelineStage, succeeded: Optional[bool] = None):
+    """
+    Finish a stage which runs a single AlgorithmTask, if it has finished.
+
+    Unless ``succeeded`` is given, the stage finishes according to the status of the task.
+    """
+    with transaction.atomic():
+        # Both the stage and the task may try to finish the stage, but it must only be finished once
+        if not PipelineStage.objects.select_for_update().filter(pk=stage.pk, status=Status.RUNNING):
+            return
+
+        algorithm_task = AlgorithmTask.objects.get(pk=stage.algorithm_task_id)
+        if succeeded is None:
+            if algorithm_task.status not in (
+                AlgorithmTask.Status.SUCCEEDED,
+                AlgorithmTask.Status.FAILED,
+            ):
+                return
+            succeeded = algorithm_task.status == AlgorithmTask.Status.SUCCEEDED
+
+        _finish_stage(
+            stage,
+            Status.SUCCEEDED if succeeded else Status.FAILED,
+            output_dataset=algorithm_task.output_dataset if succeeded else None,
+        )
+
+
+def _stage_signature(stage: PipelineStage, priority: Optional[int]) -> celery.Signature:
+    signature = run_pipeline_stage.si(stage.pk).set(queue=stage.queue)
+    if priority is not None:
+        signature = signature.set(priority=priority)
+    return signature
+
+
+def _queue_stage(stage: PipelineStage):
+    PipelineStage.objects.filter(pk=stage.pk).update(status=Status.QUEUED)
+    batch = stage.pipeline.batch
+    signature = _stage_signature(stage, batch.priority if batch is not None else None)
+    transaction.on_commit(signature.apply_async)
+
+
+def _finish_stage(stage: PipelineStage, status: str, output_dataset: Optional[Dataset] = None):
+    """Record the outcome of a stage, and queue the next one, or finish the Pipeline."""
+    stage.status = status
+    stage.output_dataset = output_dataset
+    stage.finished = timezone.now()
+    stage.save(update_fields=['status', 'output_dataset', 'finished', 'modified'])
+
+    pipeline = stage.pipeline
+    remaining = pipeline.stages.filter(index__gt=stage.index)
+    if status != Status.SUCCEEDED:
+        remaining.update(status=Status.SKIPPED)
+        pipeline.status = Status.FAILED
+    elif remaining.exists():
+        _queue_stage(remaining.first())
+        return
+    else:
+        pipeline.status = Status.SUCCEEDED
+    pipeline.save(update_fields=['status', 'modified'])
+
+    if pipeline.batch is not None:
+        _start_next_in_batch(pipeline.batch)
+
+
+def _algorithm_task_finished(algorithm_task: AlgorithmTask, succeeded: bool):
+    """Finish the Pipeline stages waiting on an AlgorithmTask."""
+    # A failed container doesn't necessarily raise an exception in the Celery task
+    algorithm_task.refresh_from_db(fields=['status'])
+    succeeded = succeeded and algorithm_task.status != AlgorithmTask.Status.FAILED
+
+    # Stages of many tiles or FMVs finish once every one of them has
+    for stage in PipelineStage.objects.filter(
+        pipeline__tiles__algorithm_task=algorithm_task, name='danesfield', status=Status.RUNNING
+    ).select_related('pipeline__batch'):
+        _fan_out_task_finished(stage, PipelineTile)
+    for stage in PipelineStage.objects.filter(
+        pipeline__videos__algorithm_task=algorithm_task, name='telesculptor', status=Status.RUNNING
+    ).select_related('pipeline__batch'):
+        _fan_out_task_finished(stage, PipelineVideo)
+
+    for stage in PipelineStage.objects.filter(
+        algorithm_task=algorithm_task, status=Status.RUNNING
+    ).select_related('pipeline__batch'):
+        _algorithm_stage_finished(stage, succeeded)
+
+
+@celery.shared_task
+def run_pipeline_stage(stage_pk: int):
+    stage: PipelineStage = PipelineStage.objects.select_related('pipeline__batch').get(pk=stage_pk)
+    stage.status = Status.RUNNING
+    stage.started = timezone.now()
+    stage.save(update_fields=['status', 'started', 'modified'])
+    Pipeline.objects.filter(pk=stage.pipeline_id).update(status=Status.RUNNING)
+
+    try:
+        PIPELINE_STAGE_FUNCS[stage.name](stage)
+    except Exception:
+        _finish_stage(stage, Status.FAILED)
+        raise
+
+
+def _create_pipelines(
+    datasets: QuerySet,
+    force: bool,
+    batch: Optional[PipelineBatch] = None,
+    aoi: Optional[Polygon] = None,
+    keyframes: Optional[dict] = None,
+) -> List[Pipeline]:
+    """
+    Create a Pipeline, and its stages, producing a model from each of many Datasets.
+
+    If a Dataset contains a point cloud, Danesfield is run on it. Otherwise, the Dataset is
+    assumed to contain an FMV, which TeleSculptor converts into a point cloud first.
+    """
+    # Classify every Dataset in a single query
+    datasets = datasets.annotate(
+        has_point_cloud=Exists(
+            Dataset.files.through.objects.filter(
+                dataset=OuterRef('pk'), checksumfile__name__regex=POINT_CLOUD_REGEX
+            )
+        )
+    ).order_by('pk')
+    datasets = list(datasets)
+
+    user = get_current_user()
+    created_by = user if user is not None and user.is_authenticated else None
+    pipelines = Pipeline.objects.bulk_create(
+        [
+            Pipeline(
+                input_dataset=dataset,
+                force=force,
+                batch=batch,
+                created_by=created_by,
+                aoi=aoi,
+                keyframes=keyframes,
+            )
+            for dataset in datasets
+        ]
+    )
+    stages = []
+    for pipeline, dataset in zip(pipelines, datasets):
+        names = ['ingest-input', 'danesfield', 'ingest-output']
+        if settings.DANESFIELD_TILE_POINTS:
+            names[1:2] = ['tile', 'danesfield', 'merge-tiles']
+        if settings.DANESFIELD_PREPROCESS_POINT_CLOUDS or aoi is not None:
+            names.insert(1, 'preprocess')
+        if settings.DANESFIELD_COG_RASTERS:
+            names.insert(-1, 'cog')
+        if settings.DANESFIELD_MESH_TILES_MIN_SIZE is not None:
+            names.insert(-1, 'mesh-tiles')
+        if not dataset.has_point_cloud:
+            names[1:1] = ['split-videos', 'telesculptor', 'merge-point-clouds']
+        stages += [
+            PipelineStage(
+                pipeline=pipeline,
+                name=name,
+                index=index,
+                queue=settings.DANESFIELD_PIPELINE_QUEUES[name],
+            )
+            for index, name in enumerate(names)
+        ]
+    PipelineStage.objects.bulk_create(stages)
+
+    return pipelines
+
+
+def _queue_pipelines(pipelines: List[Pipeline], priority: Optional[int] = None):
+    """Queue the first stage of many Pipelines, as a single Celery group."""
+    Pipeline.objects.filter(pk__in=[p.pk for p in pipelines]).update(status=Status.QUEUED)
+    first_stages = PipelineStage.objects.filter(pipeline__in=pipelines, index=0)
+    first_stages.update(status=Status.QUEUED)
+
+    tasks = celery.group(_stage_signature(stage, priority) for stage in first_stages)
+    transaction.on_commit(tasks.apply_async)
+
+
+@transaction.atomic
+def _start_next_in_batch(batch: PipelineBatch):
+    """Start the next waiting Pipeline of a batch, if any."""
+    # Skip rows locked by another worker, which is already starting that Pipeline
+    pipeline = (
+        Pipeline.objects.select_for_update(skip_locked=True)
+        .filter(batch=batch, status=Status.CREATED)
+        .order_by('pk')
+        .first()
+    )
+    if pipeline is not None:
+        _queue_pipelines([pipeline], batch.priority)
+
+
+def start_pipeline(
+    dataset: Dataset,
+    force: bool = False,
+    aoi: Optional[Polygon] = None,
+    keyframes: Optional[dict] = None,
+) -> Pipeline:
+    """
+    Start a Pipeline producing a model from a Dataset.
+
+    Each stage is run as a separate Celery task, on the queue configured for it. If ``aoi`` is
+    given, the point cloud is cropped to it first. If ``keyframes`` is given, TeleSculptor only
+    tracks the frames of an FMV it selects, as described by ``run_telesculptor``.
+    """
+    pipeline = _create_pipelines(
+        Dataset.objects.filter(pk=dataset.pk), force, aoi=aoi, keyframes=keyframes
+    )[0]
+    _queue_pipelines([pipeline])
+    return pipeline
+
+
+def start_pipeline_batch(
+    datasets: QuerySet,
+    force: bool = False,
+    concurrency: Optional[int] = None,
+    priority: Optional[int] = None,
+    keyframes: Optional[dict] = None,
+) -> PipelineBatch:
+    """
+    Start a Pipeline for each of many Datasets.
+
+    If ``concurrency`` is given, only that many Pipelines of the batch are run at once, and the
+    rest are started as earlier ones finish.
+    """
+    batch = PipelineBatch.objects.create(concurrency=concurrency, priority=priority)
+    pipelines = _create_pipelines(datasets, force, batch, keyframes=keyframes)
+    _queue_pipelines(pipelines[:concurrency], priority)
+    return batch
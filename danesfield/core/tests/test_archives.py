@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime
+import io
+from pathlib import Path
+import tracemalloc
+import zipfile
+import zlib
+
+from danesfield.core.utils.archives import ArchiveEntry, ZipArchive
+
+
+def _synthetic_archive(directory: Path, count: int, size: int) -> ZipArchive:
+    """Write ``count`` files of ``size`` bytes, and lay out an archive of them."""
+    directory.mkdir()
+    entries = []
+    for i in range(count):
+        path = directory / f'{i:05d}.bin'
+        path.write_bytes(bytes([i % 256]) * size)
+        entries.append(
+            ArchiveEntry(
+                name=f'tiles/{path.name}',
+                size=size,
+                modified=datetime(2022, 6, 1, 12, 30),
+                key=str(path),
+            )
+        )
+    return ZipArchive(entries, lambda entry: open(entry.key, 'rb'))
+
+
+def _peak_memory(archive: ZipArchive) -> int:
+    tracemalloc.start()
+    try:
+        streamed = sum(len(data) for data in archive.stream())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert streamed == archive.size
+    return peak
+
+
+def test_zip_archive(tmp_path: Path):
+    archive = _synthetic_archive(tmp_path / 'files', 20, 1000)
+    data = b''.join(archive.stream())
+    assert len(data) == archive.size
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert len(zf.namelist()) == 20
+        assert zf.read('tiles/00003.bin') == b'\x03' * 1000
+
+
+def test_zip_archive_ranges(tmp_path: Path):
+    archive = _synthetic_archive(tmp_path / 'files', 5, 100_000)
+    data = b''.join(archive.stream())
+
+    for start, end in [(0, 10), (5, 70_000), (100_050, 300_000), (archive.size - 30, None)]:
+        # Resumed downloads don't have the CRC-32s of files before the range
+        resumed = ZipArchive(archive.entries, archive.open_entry)
+        assert b''.join(resumed.stream(start, end)) == data[start:end]
+
+
+def test_zip_archive_memory(tmp_path: Path):
+    """The memory used to stream an archive doesn't grow with the size of its files."""
+    count = 2000
+    small = _synthetic_archive(tmp_path / 'small', count, 100)
+    large = _synthetic_archive(tmp_path / 'large', count, 20_000)
+
+    small_peak = _peak_memory(small)
+    large_peak = _peak_memory(large)
+
+    assert large.size > 100 * small_peak
+    assert large_peak < small_peak + 4 * 64 * 1024
+
+
+def test_zip_archive_on_crc(tmp_path: Path):
+    archive = _synthetic_archive(tmp_path / 'files', 3, 1000)
+    computed = []
+    archive = ZipArchive(
+        archive.entries,
+        archive.open_entry,
+        on_crc=lambda entry, crc: computed.append((entry.name, crc)),
+    )
+
+    # Interrupted in the second file
+    stream = archive.stream()
+    streamed = 0
+    while streamed < archive.entries[1].offset + 500:
+        streamed += len(next(stream))
+    stream.close()
+
+    assert computed == [('tiles/00000.bin', zlib.crc32(b'\x00' * 1000))]
@@ -0,0 +1,301 @@
+"""
+Benchmarks against synthetic data.
+
+These are deselected by default; run them with ``tox -e test -- -m benchmark -s``.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+import random
+import time
+
+from django.contrib.gis.geos import MultiPoint, Point, Polygon
+import pytest
+from rdoasis.algorithms.models import Dataset
+from rgd.models import ChecksumFile, FileSet
+from rgd.models.file import FileSourceType
+from rgd_3d.models import Mesh3D, Mesh3DSpatial, Tiles3D, Tiles3DMeta
+from rgd_fmv.models import FMVMeta
+from rgd_imagery.models import RasterMeta
+
+from danesfield.core.tasks import _ingest_3d_tiles
+from danesfield.core.utils.footprints import compute_dataset_footprints
+from danesfield.core.utils.keyframes import (
+    count_frames,
+    motion_keyframes,
+    stride_keyframes,
+    write_keyframes,
+)
+from danesfield.core.utils.rasters import convert_to_cog, is_cog
+
+
+def _report(name: str, seconds: float):
+    print(f'{name}: {seconds:.3f}s')
+
+
+def _synthetic_mesh_datasets(num_datasets: int, meshes_per_dataset: int) -> list[Dataset]:
+    """Create Datasets of meshes with random footprints, bypassing ingestion."""
+    datasets = Dataset.objects.bulk_create(
+        [Dataset(name=f'Synthetic {i}') for i in range(num_datasets)]
+    )
+    files = ChecksumFile.objects.bulk_create(
+        [
+            ChecksumFile(
+                name=f'{i}.ply', type=FileSourceType.URL, url=f'https://example.com/{i}.ply'
+            )
+            for i in range(num_datasets * meshes_per_dataset)
+        ]
+    )
+    meshes = Mesh3D.objects.bulk_create([Mesh3D(file=file) for file in files])
+
+    for mesh in meshes:
+        x, y = random.uniform(-180, 179), random.uniform(-90, 89)
+        footprint = Polygon.from_bbox((x, y, x + random.random(), y + random.random()))
+        spatial = Mesh3DSpatial(source=mesh, footprint=footprint, outline=footprint)
+        # Populate the footprints all at once below, rather than on every save
+        spatial.skip_signal = True
+        spatial.save()
+
+    Dataset.files.through.objects.bulk_create(
+        [
+            Dataset.files.through(dataset=dataset, checksumfile=file)
+            for i, dataset in enumerate(datasets)
+            for file in files[i * meshes_per_dataset : (i + 1) * meshes_per_dataset]
+        ]
+    )
+
+    return datasets
+
+
+def _legacy_footprints() -> dict:
+    """Compute footprints the way the footprints endpoint originally did."""
+    resp = {}
+    for dataset in Dataset.objects.all():
+        footprints = (
+            [
+                json.loads(item['footprint'].json)
+                for item in RasterMeta.objects.filter(
+                    parent_raster__image_set__images__file__in=dataset.files.all()
+                ).values('footprint')
+            ]
+            + [
+                json.loads(item['footprint'].json)
+                for item in Tiles3DMeta.objects.filter(
+                    source__json_file__in=dataset.files.all()
+                ).values('footprint')
+            ]
+            + [
+                json.loads(item['footprint'].json)
+                for item in Mesh3DSpatial.objects.filter(
+                    source__file__in=dataset.files.all()
+                ).values('footprint')
+            ]
+            + [
+                json.loads(item['footprint'].json)
+                for item in FMVMeta.objects.filter(fmv_file__file__in=dataset.files.all()).values(
+                    'footprint'
+                )
+            ]
+        )
+        points = [
+            Point(coord[0], coord[1])
+            for footprint in footprints
+            for coords in footprint['coordinates']
+            for coord in coords
+        ]
+        resp[dataset.pk] = json.loads(MultiPoint(points).convex_hull.json)
+
+    return resp
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_benchmark_footprints():
+    _synthetic_mesh_datasets(num_datasets=2000, meshes_per_dataset=10)
+
+    start = time.perf_counter()
+    legacy = _legacy_footprints()
+    _report('Per-dataset footprints', time.perf_counter() - start)
+
+    start = time.perf_counter()
+    aggregated = {
+        dataset_pk: json.loads(hull.json)
+        for dataset_pk, hull in compute_dataset_footprints().items()
+    }
+    _report('Aggregated footprints', time.perf_counter() - start)
+
+    assert aggregated == legacy
+
+
+def _synthetic_tileset_dataset(num_buildings: int, tiles_per_building: int) -> Dataset:
+    """Create a Dataset containing a root tileset, with a nested tileset per building."""
+    names = ['tiler/tileset.json'] + [
+        name
+        for i in range(num_buildings)
+        for name in [f'tiler/building_{i}/tileset.json']
+        + [f'tiler/building_{i}/{j}.b3dm' for j in range(tiles_per_building)]
+    ]
+    dataset = Dataset.objects.create(name='Synthetic tileset')
+    files = ChecksumFile.objects.bulk_create(
+        [
+            ChecksumFile(name=name, type=FileSourceType.URL, url=f'https://example.com/{name}')
+            for name in names
+        ]
+    )
+    Dataset.files.through.objects.bulk_create(
+        [Dataset.files.through(dataset=dataset, checksumfile=file) for file in files]
+    )
+    return dataset
+
+
+def _legacy_ingest_3d_tiles(dataset: Dataset):
+    """Ingest 3D tiles the way _ingest_checksum_files originally did."""
+    for checksum_file in dataset.files.all():
+        if checksum_file.name.endswith('tileset.json'):
+            tiles_3d_base_dir = Path(checksum_file.name).parent
+            tiles_3d_fileset = FileSet.objects.create(name=tiles_3d_base_dir)
+            tiles_3d_fileset.checksumfile_set.set(
+                dataset.files.filter(name__startswith=tiles_3d_base_dir)
+            )
+            Tiles3D.objects.create(name=tiles_3d_base_dir, json_file=checksum_file)
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_benchmark_3d_tiles_ingestion():
+    dataset = _synthetic_tileset_dataset(num_buildings=200, tiles_per_building=49)
+    assert dataset.files.count() == 10001
+
+    start = time.perf_counter()
+    _legacy_ingest_3d_tiles(dataset)
+    _report('Per-tileset prefix queries', time.perf_counter() - start)
+
+    Tiles3D.objects.all().delete()
+
+    start = time.perf_counter()
+    files = list(dataset.files.all())
+    _ingest_3d_tiles(files, [file for file in files if file.name.endswith('tileset.json')])
+    _report('Sorted prefix index', time.perf_counter() - start)
+
+    assert Tiles3D.objects.count() == 201
+    assert not dataset.files.filter(file_set=None).exists()
+
+
+def _synthetic_striped_geotiff(path: Path, size: int):
+    """Write a GeoTIFF laid out in strips without overviews, as Danesfield outputs them."""
+    import numpy as np
+    from osgeo import gdal, osr
+
+    driver = gdal.GetDriverByName('GTiff')
+    dataset = driver.Create(str(path), size, size, 1, gdal.GDT_Float32, ['COMPRESS=DEFLATE'])
+    dataset.SetGeoTransform((-84.1, 0.1 / size, 0, 39.8, 0, -0.1 / size))
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    dataset.SetProjection(srs.ExportToWkt())
+    rows = np.linspace(0, 100, size, dtype=np.float32)
+    band = dataset.GetRasterBand(1)
+    for y in range(0, size, 1024):
+        band.WriteArray(np.tile(rows, (min(1024, size - y), 1)) + y, 0, y)
+    dataset = None
+
+
+def _read_zoomed_out_tiles(path: Path, levels: int) -> int:
+    """Read every tile of the most zoomed out levels, as the tile endpoints would serve them."""
+    import large_image_source_gdal
+
+    source = large_image_source_gdal.open(str(path))
+    metadata = source.getMetadata()
+    tiles = 0
+    for z in range(levels):
+        scale = 2 ** (metadata['levels'] - 1 - z)
+        for y in range(math.ceil(metadata['sizeY'] / scale / metadata['tileHeight'])):
+            for x in range(math.ceil(metadata['sizeX'] / scale / metadata['tileWidth'])):
+                source.getTile(x, y, z)
+                tiles += 1
+    return tiles
+
+
+@pytest.mark.benchmark
+def test_benchmark_cog_tiles(tmp_path: Path):
+    _synthetic_striped_geotiff(tmp_path / 'dsm.tif', size=16384)
+    assert not is_cog(tmp_path / 'dsm.tif')
+
+    start = time.perf_counter()
+    striped_tiles = _read_zoomed_out_tiles(tmp_path / 'dsm.tif', levels=4)
+    _report('Zoomed out tiles of striped GeoTIFF', time.perf_counter() - start)
+
+    start = time.perf_counter()
+    convert_to_cog(tmp_path / 'dsm.tif', tmp_path / 'dsm_cog.tif')
+    _report('Conversion to COG', time.perf_counter() - start)
+    assert is_cog(tmp_path / 'dsm_cog.tif')
+
+    start = time.perf_counter()
+    cog_tiles = _read_zoomed_out_tiles(tmp_path / 'dsm_cog.tif', levels=4)
+    _report('Zoomed out tiles of COG', time.perf_counter() - start)
+
+    assert cog_tiles == striped_tiles
+
+
+def _synthetic_aerial_video(path: Path, frames: int):
+    """Write a video panning across a textured scene, hovering for the first third of it."""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    scene = cv2.resize(rng.integers(0, 256, (180, 1200, 3), dtype=np.uint8), (4800, 720))
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 30, (1280, 720))
+    for i in range(frames):
+        x = max(0, i - frames // 3) * (4800 - 1280) // (frames - frames // 3)
+        writer.write(scene[:, x : x + 1280])
+    writer.release()
+
+
+def _orb_matches(directory: Path) -> int:
+    """
+    Count the ORB features matched between successive keyframes.
+
+    This is only a proxy for the points TeleSculptor would track through the keyframes, which
+    needs its Docker image, but like them it drops when keyframes are too far apart to overlap.
+    """
+    import cv2
+
+    orb = cv2.ORB_create(nfeatures=2000)
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+    matches = 0
+    previous = None
+    for name in (directory / 'frames.txt').read_text().split():
+        image = cv2.imread(str(directory / name), cv2.IMREAD_GRAYSCALE)
+        _, descriptors = orb.detectAndCompute(image, None)
+        if previous is not None and descriptors is not None:
+            matches += len(matcher.match(previous, descriptors))
+        previous = descriptors
+    return matches
+
+
+@pytest.mark.benchmark
+def test_benchmark_keyframes(tmp_path: Path):
+    _synthetic_aerial_video(tmp_path / 'video.avi', frames=600)
+    frame_count = count_frames(tmp_path / 'video.avi')
+
+    selections = {
+        f'Stride {stride}': lambda stride=stride: stride_keyframes(frame_count, stride)
+        for stride in (1, 2, 5, 10, 20)
+    }
+    selections['Motion'] = lambda: motion_keyframes(tmp_path / 'video.avi', threshold=0.1)
+
+    for name, select in selections.items():
+        start = time.perf_counter()
+        frames = select()
+        write_keyframes(tmp_path / 'video.avi', frames, tmp_path / name)
+        selected = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matches = _orb_matches(tmp_path / name)
+        _report(
+            f'{name}: {len(frames)} frames selected in {selected:.3f}s, '
+            f'{matches} ORB matches between them',
+            time.perf_counter() - start,
+        )
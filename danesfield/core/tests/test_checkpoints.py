@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from rdoasis.algorithms.models import AlgorithmTask
+
+from danesfield.core.utils import telesculptor_algorithm
+from danesfield.core.utils.checkpoints import (
+    CHECKPOINTS_DIR,
+    completed_stages,
+    restore_stages,
+    save_stages,
+)
+
+
+def _complete_stage(output_dir: Path, name: str, duration: float, files: dict):
+    for file_name, content in files.items():
+        (output_dir / file_name).parent.mkdir(parents=True, exist_ok=True)
+        (output_dir / file_name).write_text(content)
+    (output_dir / CHECKPOINTS_DIR).mkdir(parents=True, exist_ok=True)
+    (output_dir / CHECKPOINTS_DIR / f'{name}.files').write_text(''.join(f'{f}\n' for f in files))
+    (output_dir / CHECKPOINTS_DIR / f'{name}.done').write_text(f'{duration}\n')
+
+
+@pytest.mark.django_db
+def test_telesculptor_checkpoints(dataset_factory, tmp_path: Path):
+    failed_dir = tmp_path / 'failed'
+    _complete_stage(failed_dir, 'track-features', 12.5, {'results/tracks.txt': 'tracks'})
+    _complete_stage(
+        failed_dir,
+        'init-cameras-landmarks',
+        30.0,
+        {'results/landmarks.ply': 'landmarks', 'results/krtd/0.krtd': 'camera'},
+    )
+    # Incomplete stages are ignored
+    (failed_dir / CHECKPOINTS_DIR / 'estimate-depth.started').touch()
+    assert [stage[0] for stage in completed_stages(failed_dir)] == [
+        'track-features',
+        'init-cameras-landmarks',
+    ]
+
+    failed = AlgorithmTask.objects.create(
+        algorithm=telesculptor_algorithm(),
+        status=AlgorithmTask.Status.FAILED,
+        input_dataset=dataset_factory(),
+        output_dataset=dataset_factory(),
+    )
+    save_stages(failed, failed_dir)
+    save_stages(failed, failed_dir)
+    assert failed.stages.count() == 2
+    assert failed.stages.get(name='init-cameras-landmarks').files.count() == 2
+
+    resumed = AlgorithmTask.objects.create(
+        algorithm=telesculptor_algorithm(),
+        input_dataset=failed.input_dataset,
+        output_dataset=dataset_factory(),
+    )
+    resumed_dir = tmp_path / 'resumed'
+    assert restore_stages(resumed, failed, resumed_dir) == [
+        'track-features',
+        'init-cameras-landmarks',
+    ]
+    assert (resumed_dir / 'results' / 'krtd' / '0.krtd').read_text() == 'camera'
+    assert [(name, duration) for name, duration, _ in completed_stages(resumed_dir)] == [
+        ('track-features', 12.5),
+        ('init-cameras-landmarks', 30.0),
+    ]
+    assert resumed.stages.filter(resumed=True).count() == 2
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.core.management import call_command
+import pytest
+from rdoasis.algorithms.models import Dataset
+from rgd.models import ChecksumFile
+from rgd_3d.models import Mesh3D, Tiles3D
+from rgd_imagery.models import Image, ImageSet
+
+from danesfield.core.utils.archives import get_cached_archive_files
+
+
+@pytest.mark.django_db
+def test_ingest_danesfield_output_resume(tmp_path: Path):
+    for name in ['a.txt', 'b.txt', 'nested/c.txt']:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+
+    call_command('ingest_danesfield_output', str(tmp_path), '--name', 'Output', '--workers', 2)
+
+    dataset = Dataset.objects.get(name='Output')
+    original = {file.name: file for file in dataset.files.all()}
+    assert set(original) == {'a.txt', 'b.txt', 'nested/c.txt'}
+
+    (tmp_path / 'b.txt').write_text('changed')
+    call_command(
+        'ingest_danesfield_output', str(tmp_path), '--name', 'Output', '--resume', '--batch-size', 1
+    )
+
+    resumed = {file.name: file for file in dataset.files.all()}
+    assert set(resumed) == set(original)
+    assert resumed['a.txt'].pk == original['a.txt'].pk
+    assert resumed['nested/c.txt'].pk == original['nested/c.txt'].pk
+    assert resumed['b.txt'].pk != original['b.txt'].pk
+    assert resumed['b.txt'].file.read() == b'changed'
+    # The outdated file is deleted, and the uploaded files are ready to be downloaded as archives
+    assert not ChecksumFile.objects.filter(pk=original['b.txt'].pk).exists()
+    assert set(get_cached_archive_files(file.checksum for file in resumed.values())) == {
+        file.checksum for file in resumed.values()
+    }
+
+
+@pytest.mark.django_db
+def test_ingest_danesfield_output_resume_replaced(tmp_path: Path):
+    (tmp_path / 'tiler' / '0').mkdir(parents=True)
+    (tmp_path / 'tiler' / 'tileset.json').write_text('{}')
+    (tmp_path / 'tiler' / '0' / '0.b3dm').write_text('b3dm')
+    (tmp_path / 'dsm.tif').write_text('tif')
+    (tmp_path / 'mesh.obj').write_text('obj')
+
+    call_command('ingest_danesfield_output', str(tmp_path), '--name', 'Output')
+    dataset = Dataset.objects.get(name='Output')
+    original = {file.name: file for file in dataset.files.all()}
+    tiles = Tiles3D.objects.get(json_file__in=dataset.files.all())
+
+    for name in ['dsm.tif', 'mesh.obj', 'tiler/0/0.b3dm']:
+        (tmp_path / name).write_text('changed')
+    call_command('ingest_danesfield_output', str(tmp_path), '--name', 'Output', '--resume')
+
+    # The replaced files are ingested in place of the outdated ones
+    resumed = {file.name: file for file in dataset.files.all()}
+    assert Image.objects.get(file__in=dataset.files.all()).file == resumed['dsm.tif']
+    assert Mesh3D.objects.get(file__in=dataset.files.all()).file == resumed['mesh.obj']
+    assert not Image.objects.filter(file=original['dsm.tif'].pk).exists()
+    assert ImageSet.objects.filter(name='dsm.tif').count() == 1
+    assert not Mesh3D.objects.filter(file=original['mesh.obj'].pk).exists()
+
+    # So is the tileset which lost one of its files, along with the rest of its files
+    assert not Tiles3D.objects.filter(pk=tiles.pk).exists()
+    resumed_tiles = Tiles3D.objects.get(json_file=resumed['tiler/tileset.json'])
+    assert resumed_tiles.json_file.pk == original['tiler/tileset.json'].pk
+    assert set(resumed_tiles.json_file.file_set.checksumfile_set.all()) == {
+        resumed['tiler/tileset.json'],
+        resumed['tiler/0/0.b3dm'],
+    }
+
+
+@pytest.mark.django_db
+def test_clone_dataset(dataset: Dataset, checksum_file_factory, tmp_path: Path):
+    files = [checksum_file_factory(name=name) for name in ['tiler/a.b3dm', 'tiler/b.b3dm', 'c.tif']]
+    for file in files:
+        file.update_checksum()
+    dataset.files.set(files)
+
+    call_command('clone_dataset', dataset.pk, '--path', str(tmp_path), '--include', 'tiler/*')
+
+    assert (tmp_path / 'tiler' / 'a.b3dm').read_bytes() == b'Test data!'
+    assert (tmp_path / 'tiler' / 'b.b3dm').read_bytes() == b'Test data!'
+    assert not (tmp_path / 'c.tif').exists()
+
+    # Unchanged files are skipped, while changed files are downloaded again
+    (tmp_path / 'tiler' / 'b.b3dm').write_bytes(b'Changed')
+    mtime = (tmp_path / 'tiler' / 'a.b3dm').stat().st_mtime_ns
+    call_command('clone_dataset', dataset.pk, '--path', str(tmp_path), '--skip-existing')
+
+    assert (tmp_path / 'tiler' / 'a.b3dm').stat().st_mtime_ns == mtime
+    assert (tmp_path / 'tiler' / 'b.b3dm').read_bytes() == b'Test data!'
+    assert (tmp_path / 'c.tif').read_bytes() == b'Test data!'
@@ -1,13 +1,40 @@
+import asyncio
+from datetime import timedelta
+import io
 import json
+import zipfile
 
+from asgiref.sync import async_to_sync
+from click import ClickException
 from django.contrib.gis.geos import MultiPoint, Point
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.fields.files import FieldFile
+from django.http import StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
 import pytest
 from rdoasis.algorithms.models import Dataset
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.test import APIClient
 from rgd_3d.models import Tiles3D
 from rgd_imagery.models import Raster
 
+from danesfield.asgi import application
+from danesfield.core.models import DatasetFootprint
+from danesfield.core.tasks import _ingest_checksum_files
+from danesfield.core.utils.archives import ZipArchive, get_cached_archive_files
+from danesfield.core.views.dataset import DatasetViewSet
+from danesfield.core.views.serializers import DatasetFootprintsQueryParamsSerializer
+
+
+def _get_footprints(client: APIClient) -> dict:
+    resp = client.get('/api/datasets/footprints/')
+    assert resp.status_code == 200
+    return resp.json()
+
 
 @pytest.mark.django_db
 def test_footprints(
@@ -28,10 +55,299 @@ def test_footprints(
         for coord in coords
     ]
 
-    resp: JsonResponse = admin_api_client.get('/api/datasets/footprints/')
+    resp = admin_api_client.get('/api/datasets/footprints/')
 
     assert resp.status_code == 200
 
     footprints: dict = resp.json()
 
     assert footprints[str(dataset.pk)] == json.loads(MultiPoint(points).convex_hull.json)
+
+
+@pytest.mark.django_db
+def test_footprints_updated_on_file_removal(
+    dataset: Dataset, raster: Raster, tiles3d: Tiles3D, admin_api_client: APIClient
+):
+    raster_file = raster.image_set.images.first().file
+    dataset.files.add(raster_file, tiles3d.json_file)
+    dataset.files.remove(raster_file)
+
+    footprints: dict = _get_footprints(admin_api_client)
+
+    assert footprints[str(dataset.pk)] == json.loads(tiles3d.tiles3dmeta.footprint.convex_hull.json)
+
+    dataset.files.clear()
+
+    footprints = _get_footprints(admin_api_client)
+
+    # Datasets without any spatial entries are still listed, with an empty footprint
+    assert footprints[str(dataset.pk)] == {'type': 'GeometryCollection', 'geometries': []}
+
+
+@pytest.mark.django_db
+def test_footprints_updated_on_spatial_entry_deletion(dataset: Dataset, raster: Raster):
+    dataset.files.add(raster.image_set.images.first().file)
+    assert DatasetFootprint.objects.get(dataset=dataset).footprint is not None
+
+    raster.rastermeta.delete()
+
+    assert DatasetFootprint.objects.get(dataset=dataset).footprint is None
+
+
+@pytest.mark.django_db
+def test_update_dataset_footprints_command(dataset: Dataset, raster: Raster):
+    dataset.files.add(raster.image_set.images.first().file)
+    DatasetFootprint.objects.all().delete()
+
+    with pytest.raises(ClickException):
+        call_command('update_dataset_footprints', '--verify')
+
+    call_command('update_dataset_footprints')
+    call_command('update_dataset_footprints', '--verify')
+
+    assert DatasetFootprint.objects.get(dataset=dataset).footprint is not None
+
+
+@pytest.mark.django_db
+def test_footprints_filters(
+    dataset_factory, raster: Raster, tiles3d: Tiles3D, admin_api_client: APIClient
+):
+    raster_dataset: Dataset = dataset_factory()
+    raster_dataset.files.add(raster.image_set.images.first().file)
+    tiles3d_dataset: Dataset = dataset_factory()
+    tiles3d_dataset.files.add(tiles3d.json_file)
+
+    # Only the raster footprint intersects its own bounding box
+    min_lon, min_lat, max_lon, max_lat = raster.rastermeta.footprint.extent
+    resp = admin_api_client.get(
+        '/api/datasets/footprints/',
+        {'bbox': f'{min_lon},{min_lat},{max_lon},{max_lat}', 'simplify': 0.01},
+    )
+    footprints: dict = resp.json()
+    assert list(footprints) == [str(raster_dataset.pk)]
+
+    # Paginate through both footprints
+    resp = admin_api_client.get('/api/datasets/footprints/', {'limit': 1})
+    assert list(resp.json()) == [str(raster_dataset.pk)]
+    assert 'offset=1' in resp['Link']
+
+    resp = admin_api_client.get('/api/datasets/footprints/', {'limit': 1, 'offset': 1})
+    assert list(resp.json()) == [str(tiles3d_dataset.pk)]
+    assert not resp.has_header('Link')
+
+
+@pytest.mark.django_db
+def test_footprints_default_limit(dataset_factory, admin_api_client: APIClient, monkeypatch):
+    for dataset in dataset_factory.create_batch(3):
+        DatasetFootprint.objects.update_or_create(
+            dataset=dataset, defaults={'footprint': Point(0, 0).buffer(1)}
+        )
+    limit = DatasetFootprintsQueryParamsSerializer._declared_fields['limit']
+    assert limit.default == 1000
+    monkeypatch.setattr(limit, 'default', 2)
+
+    # Without a limit, only the default number of footprints is returned
+    resp = admin_api_client.get('/api/datasets/footprints/')
+    assert resp.status_code == 200
+    assert len(resp.json()) == 2
+    assert 'offset=2' in resp['Link']
+
+
+@pytest.mark.django_db
+def test_footprints_invalid_bbox(admin_api_client: APIClient):
+    resp = admin_api_client.get('/api/datasets/footprints/', {'bbox': '1,2,3'})
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_retrieve(dataset: Dataset, raster: Raster, tiles3d: Tiles3D, admin_api_client: APIClient):
+    dataset.files.add(raster.image_set.images.first().file, tiles3d.json_file)
+
+    resp = admin_api_client.get(f'/api/datasets/{dataset.pk}/')
+
+    assert resp.status_code == 200
+    assert resp.data['rasters'] == [raster.rastermeta.pk]
+    assert resp.data['tiles3d'] == [tiles3d.tiles3dmeta.pk]
+    assert resp.data['meshes'] == []
+    assert resp.data['fmvs'] == []
+
+
+@pytest.mark.django_db
+def test_retrieve_query_count(
+    dataset_factory, output_dataset: Dataset, admin_api_client: APIClient, settings
+):
+    settings.DANESFIELD_DATASET_DETAIL_CACHE_TIMEOUT = 0
+    _ingest_checksum_files(output_dataset)
+    empty_dataset: Dataset = dataset_factory()
+
+    # The number of queries must not depend on the contents of the Dataset
+    with CaptureQueriesContext(connection) as empty_queries:
+        admin_api_client.get(f'/api/datasets/{empty_dataset.pk}/')
+    with CaptureQueriesContext(connection) as output_queries:
+        resp = admin_api_client.get(f'/api/datasets/{output_dataset.pk}/')
+
+    assert len(resp.data['meshes']) == 1
+    assert len(output_queries) == len(empty_queries)
+
+
+@pytest.mark.django_db
+def test_retrieve_cached(
+    dataset: Dataset, raster: Raster, admin_api_client: APIClient, django_assert_num_queries
+):
+    admin_api_client.get(f'/api/datasets/{dataset.pk}/')
+
+    # Only the Dataset itself is looked up, to check permissions
+    with django_assert_num_queries(1):
+        resp = admin_api_client.get(f'/api/datasets/{dataset.pk}/')
+    assert resp.data['rasters'] == []
+
+    # Changing the files of the Dataset invalidates the cached response
+    dataset.files.add(raster.image_set.images.first().file)
+
+    resp = admin_api_client.get(f'/api/datasets/{dataset.pk}/')
+    assert resp.data['rasters'] == [raster.rastermeta.pk]
+
+
+@pytest.mark.django_db
+def test_retrieve_cached_permissions(dataset: Dataset, admin_api_client: APIClient, monkeypatch):
+    admin_api_client.get(f'/api/datasets/{dataset.pk}/')
+
+    def deny(self, request, obj):
+        raise PermissionDenied()
+
+    # A cached response is only returned to clients permitted to see the Dataset
+    monkeypatch.setattr(DatasetViewSet, 'check_object_permissions', deny)
+    resp = admin_api_client.get(f'/api/datasets/{dataset.pk}/')
+    assert resp.status_code == 403
+
+    resp = admin_api_client.get(f'/api/datasets/{dataset.pk + 1}/')
+    assert resp.status_code == 404
+
+
+@pytest.mark.django_db
+def test_dataset_archive(dataset: Dataset, checksum_file_factory, admin_api_client: APIClient):
+    dataset.files.set(
+        [
+            checksum_file_factory(name='tiler/0.b3dm'),
+            checksum_file_factory(name='tiler/tileset.json'),
+            checksum_file_factory(name='dsm.tif'),
+        ]
+    )
+
+    resp: StreamingHttpResponse = admin_api_client.get(f'/api/datasets/{dataset.pk}/archive/')
+    assert resp.status_code == 200
+    data = b''.join(resp.streaming_content)
+    assert int(resp['Content-Length']) == len(data)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ['dsm.tif', 'tiler/0.b3dm', 'tiler/tileset.json']
+        assert zf.read('dsm.tif') == b'Test data!'
+
+    resp = admin_api_client.get(
+        f'/api/datasets/{dataset.pk}/archive/', {'glob': 'tiler/*'}, HTTP_RANGE='bytes=10-'
+    )
+    filtered = b''.join(
+        admin_api_client.get(
+            f'/api/datasets/{dataset.pk}/archive/', {'glob': 'tiler/*'}
+        ).streaming_content
+    )
+    assert resp.status_code == 206
+    assert resp['Content-Range'] == f'bytes 10-{len(filtered) - 1}/{len(filtered)}'
+    assert b''.join(resp.streaming_content) == filtered[10:]
+
+    resp = admin_api_client.get(
+        f'/api/datasets/{dataset.pk}/archive/', HTTP_RANGE=f'bytes={len(data)}-'
+    )
+    assert resp.status_code == 416
+
+
+@pytest.mark.django_db
+def test_dataset_archive_cache(
+    dataset: Dataset, checksum_file_factory, admin_api_client: APIClient, monkeypatch
+):
+    cache.clear()
+    files = [checksum_file_factory(name='dsm.tif'), checksum_file_factory(name='dtm.tif')]
+    for file in files:
+        file.update_checksum()
+        file.save()
+    dataset.files.set(files)
+
+    # Interrupted in the second file
+    resp: StreamingHttpResponse = admin_api_client.get(
+        f'/api/datasets/{dataset.pk}/archive/', HTTP_RANGE='bytes=0-80'
+    )
+    assert resp.status_code == 206
+    b''.join(resp.streaming_content)
+    cached = get_cached_archive_files([files[0].checksum])
+    assert cached[files[0].checksum]['size'] == 10
+    assert cached[files[0].checksum]['crc'] is not None
+
+    # The sizes aren't looked up again
+    def size(self):
+        raise AssertionError('The size was looked up.')
+
+    monkeypatch.setattr(FieldFile, 'size', property(size))
+    resp = admin_api_client.get(f'/api/datasets/{dataset.pk}/archive/')
+    data = b''.join(resp.streaming_content)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dataset_archive_asgi(dataset_factory, checksum_file_factory, user_factory, monkeypatch):
+    dataset: Dataset = dataset_factory(name='Jacksonville "final"')
+    dataset.files.set([checksum_file_factory(name='dsm.tif'), checksum_file_factory(name='a.las')])
+    AccessToken.objects.create(
+        user=user_factory(is_superuser=True),
+        token='secret',
+        scope='read write',
+        expires=timezone.now() + timedelta(hours=1),
+    )
+
+    # Record whether each part of the archive is read on the event loop
+    on_event_loop = []
+    stream = ZipArchive.stream
+
+    def recorded_stream(self, *args):
+        for data in stream(self, *args):
+            try:
+                asyncio.get_running_loop()
+                on_event_loop.append(True)
+            except RuntimeError:
+                on_event_loop.append(False)
+            yield data
+
+    monkeypatch.setattr(ZipArchive, 'stream', recorded_stream)
+
+    messages = []
+    requested = []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected
+        await asyncio.sleep(60)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': f'/api/datasets/{dataset.pk}/archive/',
+        'query_string': b'',
+        'headers': [(b'authorization', b'Bearer secret')],
+    }
+    async_to_sync(application)(scope, receive, send)
+
+    assert messages[0]['status'] == 200
+    headers = dict(messages[0]['headers'])
+    assert headers[b'content-disposition'] == b'attachment; filename="Jacksonville \\"final\\".zip"'
+    data = b''.join(message.get('body', b'') for message in messages[1:])
+    assert int(headers[b'content-length']) == len(data)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ['a.las', 'dsm.tif']
+    assert on_event_loop and not any(on_event_loop)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from danesfield.core.utils.input_cache import InputCache, stage_checksumfiles
+
+
+@pytest.mark.django_db
+def test_input_cache_hit(checksum_file_factory, tmp_path: Path, monkeypatch):
+    files = [checksum_file_factory(name=name) for name in ['a.las', 'nested/b.tif']]
+    for file in files:
+        file.update_checksum()
+    cache = InputCache(tmp_path / 'cache', max_size=1024**2)
+    evictions = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda: evictions.append(evict()))
+
+    stats = stage_checksumfiles(files, tmp_path / 'first', cache)
+    assert (stats.hits, stats.misses, stats.bytes_saved) == (0, 2, 0)
+    # The cache is only trimmed once per set of files
+    assert len(evictions) == 1
+    # Entries are locked by a lock file of a fixed name, shared by every worker
+    for file in files:
+        assert (tmp_path / 'cache' / file.checksum[:2] / f'{file.checksum}.lock').exists()
+    assert stats.bytes_downloaded == sum(file.file.size for file in files)
+
+    stats = stage_checksumfiles(files, tmp_path / 'second', cache)
+    assert (stats.hits, stats.misses) == (2, 0)
+    assert stats.bytes_saved == sum(file.file.size for file in files)
+    assert stats.bytes_downloaded == 0
+    for file in files:
+        assert (tmp_path / 'second' / file.name).read_bytes() == b'Test data!'
+
+
+@pytest.mark.django_db
+def test_input_cache_eviction(checksum_file_factory, tmp_path: Path):
+    files = [
+        checksum_file_factory(name=f'{i}.las', file__data=str(i).encode() * 10) for i in range(3)
+    ]
+    for file in files:
+        file.update_checksum()
+    # Only two files fit in the cache at once
+    cache = InputCache(tmp_path / 'cache', max_size=20)
+
+    stage_checksumfiles(files, tmp_path / 'first', cache)
+    assert {entry.name for entry in (tmp_path / 'cache').glob('*/*') if not entry.suffix} == {
+        file.checksum for file in files[1:]
+    }
+
+    # The least recently used file was evicted, so must be downloaded again
+    stats = stage_checksumfiles(files[:1], tmp_path / 'second', cache)
+    assert (stats.hits, stats.misses) == (0, 1)
+    assert (tmp_path / 'second' / '0.las').read_bytes() == b'0' * 10
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from danesfield.core.utils.keyframes import (
+    metadata_keyframes,
+    motion_keyframes,
+    stride_keyframes,
+    write_keyframes,
+)
+
+
+def _write_video(path: Path, shifts: list[int]) -> None:
+    """Write a video of a textured scene, moving right by each of ``shifts`` pixels per frame."""
+    rng = np.random.default_rng(0)
+    scene = cv2.resize(rng.integers(0, 256, (90, 400, 3), dtype=np.uint8), (1600, 360))
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 30, (640, 360))
+    x = 0
+    for shift in shifts:
+        x += shift
+        writer.write(scene[:, x : x + 640])
+    writer.release()
+
+
+def test_stride_keyframes():
+    assert stride_keyframes(10, 3) == [0, 3, 6, 9]
+    assert stride_keyframes(11, 3) == [0, 3, 6, 9, 10]
+
+
+def test_motion_keyframes(tmp_path: Path):
+    # The camera hovers for 30 frames, then pans by 8 pixels per frame for 60 frames
+    _write_video(tmp_path / 'video.avi', [0] * 30 + [8] * 60)
+
+    frames = motion_keyframes(tmp_path / 'video.avi', threshold=0.1)
+
+    # A keyframe every 64 pixels, i.e. 8 frames, of panning, and none while hovering
+    assert frames[0] == 0
+    assert frames[-1] == 89
+    assert all(frame >= 30 for frame in frames[1:])
+    assert 7 <= len(frames) <= 10
+
+
+def test_metadata_keyframes():
+    # Positions about 5.5 meters apart
+    positions = [(-84.1, 39.7 + i * 0.00005) for i in range(10)]
+    assert metadata_keyframes(list(range(10)), positions, min_distance=10) == [0, 2, 4, 6, 8, 9]
+
+
+def test_write_keyframes(tmp_path: Path):
+    _write_video(tmp_path / 'video.avi', [4] * 20)
+
+    stats = write_keyframes(tmp_path / 'video.avi', [0, 10, 19], tmp_path / 'keyframes')
+
+    assert stats.input_frames == 20
+    assert stats.selected_frames == 3
+    images = (tmp_path / 'keyframes' / 'frames.txt').read_text().split()
+    assert images == ['frame000001.png', 'frame000011.png', 'frame000020.png']
+    assert (tmp_path / 'keyframes' / 'keyframes.txt').read_text().split() == ['1', '11', '20']
+    assert cv2.imread(str(tmp_path / 'keyframes' / images[1])).shape == (360, 640, 3)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+import pytest
+from rdoasis.algorithms.models import AlgorithmTask, Dataset
+from rest_framework.permissions import IsAuthenticated
+
+from danesfield.asgi import application
+from danesfield.core.events import task_events_application
+from danesfield.core.utils import danesfield_algorithm
+from danesfield.core.utils.logs import LogWriter, read_log
+from danesfield.core.views import AlgorithmTaskViewSet
+
+
+@pytest.fixture
+def algorithm_task(dataset: Dataset) -> AlgorithmTask:
+    return AlgorithmTask.objects.create(algorithm=danesfield_algorithm(), input_dataset=dataset)
+
+
+@pytest.mark.django_db
+def test_read_log(algorithm_task: AlgorithmTask):
+    writer = LogWriter(algorithm_task)
+    for text in ['first line\n', 'second line\n', 'third line\n']:
+        writer.append(text)
+
+    assert read_log(algorithm_task, 0).content == 'first line\nsecond line\nthird line\n'
+    log = read_log(algorithm_task, 6, limit=12)
+    assert log.content == 'line\nsecond '
+    assert log.next_offset == 18
+    assert read_log(algorithm_task, log.next_offset).content == 'line\nthird line\n'
+    assert read_log(algorithm_task, 100).content == ''
+
+    # Appending continues from the existing chunks
+    LogWriter(algorithm_task).append('fourth line\n')
+    assert read_log(algorithm_task, 34).content == 'fourth line\n'
+
+
+@pytest.mark.django_db
+def test_read_output_log(algorithm_task: AlgorithmTask):
+    # Tasks without log chunks fall back to their whole log
+    algorithm_task.output_log = 'first line\nsecond line\n'
+    algorithm_task.save()
+
+    assert read_log(algorithm_task, 11, limit=6).content == 'second'
+
+
+@pytest.mark.django_db
+def test_algorithm_task_logs(algorithm_task: AlgorithmTask, admin_api_client):
+    LogWriter(algorithm_task).append('first line\nsecond line\n')
+
+    resp = admin_api_client.get(f'/api/tasks/{algorithm_task.pk}/logs/', {'offset': 11})
+    assert resp.status_code == 200
+    assert resp.data['content'] == 'second line\n'
+    assert resp.data['next_offset'] == 23
+    assert not resp.data['finished']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_task_events(algorithm_task: AlgorithmTask):
+    LogWriter(algorithm_task).append('first line\nsecond line\n')
+    algorithm_task.status = AlgorithmTask.Status.SUCCEEDED
+    algorithm_task.save()
+
+    async def django_application(scope, receive, send):
+        # Every client may read the task
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': f'/api/tasks/{algorithm_task.pk}/events/',
+        'query_string': b'offset=11',
+        'headers': [],
+    }
+    async_to_sync(task_events_application(django_application))(scope, receive, send)
+
+    assert messages[0]['status'] == 200
+    body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+    events = [event.split('\n') for event in body.strip().split('\n\n')]
+    assert events[0] == ['id: 23', 'event: log', 'data: {"content": "second line\\n"}']
+    assert events[1][0] == 'event: progress'
+    assert events[-1][0] == 'event: end'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_task_events_authentication(algorithm_task: AlgorithmTask, user, monkeypatch):
+    LogWriter(algorithm_task).append('first line\n')
+    algorithm_task.status = AlgorithmTask.Status.SUCCEEDED
+    algorithm_task.save()
+    monkeypatch.setattr(AlgorithmTaskViewSet, 'permission_classes', [IsAuthenticated])
+    AccessToken.objects.create(
+        user=user, token='secret', scope='read write', expires=timezone.now() + timedelta(hours=1)
+    )
+
+    def events(query_string: bytes):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': f'/api/tasks/{algorithm_task.pk}/events/',
+            'query_string': query_string,
+            # As sent by EventSource
+            'headers': [(b'accept', b'text/event-stream')],
+        }
+        async_to_sync(application)(scope, receive, send)
+        return messages
+
+    assert events(b'')[0]['status'] in (401, 403)
+    assert events(b'token=wrong')[0]['status'] in (401, 403)
+
+    messages = events(b'token=secret')
+    assert messages[0]['status'] == 200
+    body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+    assert 'data: {"content": "first line\\n"}' in body
+    assert 'event: end' in body
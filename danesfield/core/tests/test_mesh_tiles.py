@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import struct
+
+import numpy as np
+from osgeo import osr
+import pytest
+import pyvista
+
+from danesfield.core.utils.mesh_tiles import enu_to_ecef, mesh_to_tileset, projected_to_ecef
+
+
+def test_enu_to_ecef():
+    transform = enu_to_ecef(0, 0, 0)
+    # East, north and up at the origin are the y, z and x axes of ECEF
+    assert transform[0:3] == pytest.approx([0, 1, 0])
+    assert transform[4:7] == pytest.approx([0, 0, 1])
+    assert transform[8:11] == pytest.approx([1, 0, 0])
+    assert transform[12:15] == pytest.approx([6378137, 0, 0])
+
+
+def test_projected_to_ecef():
+    utm = osr.SpatialReference()
+    utm.ImportFromEPSG(32617)
+    ecef = osr.SpatialReference()
+    ecef.ImportFromEPSG(4978)
+    to_ecef = osr.CoordinateTransformation(utm, ecef)
+
+    # Far from the central meridian, where grid north and true north differ the most
+    x, y = 740000.0, 4400000.0
+    transform = np.array(projected_to_ecef(utm.ExportToWkt(), x, y)).reshape(4, 4).T
+    for dx, dy, z in [(0, 0, 0), (1000, 0, 0), (0, -1500, 50)]:
+        expected = to_ecef.TransformPoint(x + dx, y + dy, z)
+        # Within the curvature of the Earth over the distance
+        assert np.linalg.norm((transform @ [x + dx, y + dy, z, 1])[:3] - expected) < 0.2
+
+
+def test_mesh_to_tileset(tmp_path: Path):
+    mesh = pyvista.Plane(i_size=100, j_size=100, i_resolution=100, j_resolution=100)
+    mesh = mesh.triangulate()
+    mesh.point_data['RGB'] = np.full((mesh.n_points, 3), 128, dtype=np.uint8)
+    mesh.save(str(tmp_path / 'mesh.ply'), texture='RGB')
+
+    tileset_path = mesh_to_tileset(
+        tmp_path / 'mesh.ply',
+        tmp_path / 'tiles',
+        levels=3,
+        max_faces_per_tile=1000,
+        transform=enu_to_ecef(39.7, -84.1, 200),
+    )
+
+    tileset = json.loads(tileset_path.read_text())
+    root = tileset['root']
+    assert root['refine'] == 'REPLACE'
+    assert root['content']['uri'] == '0/0_0.b3dm'
+    assert len(root['children']) == 4
+    leaves = [leaf for child in root['children'] for leaf in child['children']]
+    assert len(leaves) == 16
+    assert all(leaf['geometricError'] == 0 for leaf in leaves)
+    assert root['geometricError'] > root['children'][0]['geometricError'] > 0
+
+    # Coarser levels are decimated, the finest level keeps every face
+    def faces(uri: str) -> int:
+        content = (tmp_path / 'tiles' / uri).read_bytes()
+        magic, _, length, feature_table_length = struct.unpack('<4sIII', content[:16])
+        assert magic == b'b3dm'
+        assert length == len(content)
+        glb = content[28 + feature_table_length :]
+        json_length = struct.unpack('<I', glb[12:16])[0]
+        gltf = json.loads(glb[20 : 20 + json_length])
+        assert 'COLOR_0' in gltf['meshes'][0]['primitives'][0]['attributes']
+        return gltf['accessors'][1]['count'] // 3
+
+    assert faces(root['content']['uri']) <= 1000
+    assert sum(faces(leaf['content']['uri']) for leaf in leaves) == 20000
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+import select
+import subprocess
+import sys
+import zipfile
+
+from filelock import FileLock
+import pytest
+
+from danesfield.core.utils.model_store import ModelStore
+
+
+@pytest.fixture
+def model_store(tmp_path: Path) -> ModelStore:
+    archive = tmp_path / 'models.zip'
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.writestr('Columbia Geon Segmentation Model/dayton_geon.pth', b'weights')
+        z.writestr('Columbia Geon Segmentation Model/config.json', b'{}')
+    return ModelStore(tmp_path / 'store', archive.as_uri(), 'v1')
+
+
+def test_model_store_link(model_store: ModelStore, tmp_path: Path):
+    model_store.link_into(tmp_path / 'input')
+
+    linked = tmp_path / 'input' / 'Columbia Geon Segmentation Model' / 'dayton_geon.pth'
+    installed = model_store.path / 'Columbia Geon Segmentation Model' / 'dayton_geon.pth'
+    assert linked.read_bytes() == b'weights'
+    assert linked.stat().st_ino == installed.stat().st_ino
+    assert not linked.stat().st_mode & 0o222
+    assert model_store.verify()
+
+    # Only the installed version and its lock remain, without any temporary archives
+    assert sorted(p.name for p in model_store.root.iterdir()) == ['v1', 'v1.lock']
+
+
+# Link the models from another process
+_LINK_MODELS = """
+from pathlib import Path
+import sys
+from danesfield.core.utils.model_store import ModelStore
+
+store = ModelStore(Path(sys.argv[1]), sys.argv[2], 'v1')
+print('ready', flush=True)
+store.link_into(Path(sys.argv[3]))
+print('linked', flush=True)
+"""
+
+
+def test_model_store_lock(model_store: ModelStore, tmp_path: Path):
+    """Separately started workers install and link the models under the same lock."""
+    model_store.root.mkdir()
+    with FileLock(model_store.root / 'v1.lock'):
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                '-c',
+                _LINK_MODELS,
+                str(model_store.root),
+                model_store.url,
+                str(tmp_path / 'input'),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        assert process.stdout.readline() == 'ready\n'
+        assert select.select([process.stdout], [], [], 1)[0] == []
+        assert not model_store.path.exists()
+
+    assert process.stdout.readline() == 'linked\n'
+    assert process.wait() == 0
+    assert model_store.verify()
+
+
+def test_model_store_reinstall(model_store: ModelStore):
+    path = model_store.ensure()
+    (path / 'Columbia Geon Segmentation Model' / 'config.json').unlink()
+    assert not model_store.is_installed()
+
+    model_store.ensure()
+    assert model_store.verify()
+
+
+def test_model_store_checksum(model_store: ModelStore, tmp_path: Path):
+    archive = (tmp_path / 'models.zip').read_bytes()
+    expected = hashlib.sha512(archive).hexdigest()
+
+    # A wrong archive is rejected before it is extracted
+    store = ModelStore(model_store.root, model_store.url, 'v1', hashlib.sha512(b'').hexdigest())
+    with pytest.raises(ValueError):
+        store.ensure()
+    assert not store.path.exists()
+
+    store = ModelStore(model_store.root, model_store.url, 'v1', expected)
+    store.ensure()
+    assert store.verify()
+
+    # Installations from other archives are replaced
+    other = ModelStore(model_store.root, model_store.url, 'v1', expected.upper())
+    assert other.is_installed()
+    assert not ModelStore(model_store.root, model_store.url, 'v1', 'ab' * 64).is_installed()
@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+import pyvista
+from rdoasis.algorithms.models import AlgorithmTask, Dataset
+from rest_framework.test import APIClient
+from rgd.models import FileSet
+from rgd.models.mixins import Status
+from rgd_3d.models import Mesh3D, Tiles3D
+from rgd_imagery.models import Image, ImageSet, Raster
+
+from danesfield.core import tasks
+from danesfield.core.models import Pipeline
+from danesfield.core.utils import danesfield_algorithm
+from danesfield.core.utils.mesh_tiles import enu_to_ecef
+
+
+@pytest.mark.django_db
+def test_pipeline(dataset_factory, checksum_file_factory, admin_api_client: APIClient, monkeypatch):
+    input_dataset: Dataset = dataset_factory()
+    input_dataset.files.set([checksum_file_factory(name='points.las')])
+    output_dataset: Dataset = dataset_factory()
+    output_dataset.files.set([checksum_file_factory(name='mesh.obj')])
+
+    # Don't launch any containers
+    algorithm_task = AlgorithmTask.objects.create(
+        algorithm=danesfield_algorithm(),
+        input_dataset=input_dataset,
+        output_dataset=output_dataset,
+    )
+    monkeypatch.setattr(tasks, 'run_danesfield', lambda pk, force: algorithm_task)
+
+    resp = admin_api_client.post('/api/danesfield/run/', {'input_dataset': input_dataset.pk})
+    assert resp.status_code == 200
+    assert [stage['name'] for stage in resp.json()['stages']] == [
+        'ingest-input',
+        'danesfield',
+        'cog',
+        'mesh-tiles',
+        'ingest-output',
+    ]
+    pipeline = Pipeline.objects.get(pk=resp.json()['id'])
+    ingest_input, danesfield, cog, mesh_tiles, ingest_output = pipeline.stages.all()
+    assert ingest_input.status == Status.QUEUED
+
+    tasks.run_pipeline_stage(ingest_input.pk)
+    tasks.run_pipeline_stage(danesfield.pk)
+
+    resp = admin_api_client.get(f'/api/pipelines/{pipeline.pk}/')
+    assert resp.json()['status'] == Status.RUNNING
+    assert resp.json()['current_stage'] == 'danesfield'
+    assert resp.json()['stages'][1]['algorithm_task'] == algorithm_task.pk
+
+    algorithm_task.status = AlgorithmTask.Status.SUCCEEDED
+    algorithm_task.save()
+    tasks._algorithm_task_finished(algorithm_task, succeeded=True)
+    cog.refresh_from_db()
+    assert cog.status == Status.QUEUED
+
+    # There are no rasters to convert, nor large meshes to tile
+    tasks.run_pipeline_stage(cog.pk)
+    cog.refresh_from_db()
+    assert cog.output_dataset == output_dataset
+    tasks.run_pipeline_stage(mesh_tiles.pk)
+    mesh_tiles.refresh_from_db()
+    assert mesh_tiles.output_dataset == output_dataset
+    ingest_output.refresh_from_db()
+    assert ingest_output.status == Status.QUEUED
+
+    tasks.run_pipeline_stage(ingest_output.pk)
+    ingest_output.refresh_from_db()
+    assert ingest_output.output_dataset == output_dataset
+
+    resp = admin_api_client.get(f'/api/pipelines/{pipeline.pk}/')
+    assert resp.json()['status'] == Status.SUCCEEDED
+    assert resp.json()['current_stage'] is None
+
+
+@pytest.mark.django_db
+def test_pipeline_reused_outputs(dataset_factory, checksum_file_factory, monkeypatch):
+    input_dataset: Dataset = dataset_factory()
+    input_dataset.files.set([checksum_file_factory(name='points.las')])
+    output_dataset: Dataset = dataset_factory()
+    output_dataset.files.set(
+        [checksum_file_factory(name='mesh.obj'), checksum_file_factory(name='dsm.tif')]
+    )
+
+    # Every run reuses the outputs of the same, succeeded, AlgorithmTask
+    algorithm_task = AlgorithmTask.objects.create(
+        algorithm=danesfield_algorithm(),
+        input_dataset=input_dataset,
+        output_dataset=output_dataset,
+        status=AlgorithmTask.Status.SUCCEEDED,
+    )
+    monkeypatch.setattr(tasks, 'run_danesfield', lambda pk, force: algorithm_task)
+
+    def run_pipeline() -> Pipeline:
+        pipeline = tasks.start_pipeline(input_dataset)
+        for stage in pipeline.stages.all():
+            tasks.run_pipeline_stage(stage.pk)
+        pipeline.refresh_from_db()
+        assert pipeline.status == Status.SUCCEEDED
+        return pipeline
+
+    def counts() -> list:
+        return [
+            model.objects.count() for model in (Image, ImageSet, Raster, Mesh3D, Tiles3D, FileSet)
+        ]
+
+    run_pipeline()
+    ingested = counts()
+    assert ingested[:4] == [1, 1, 1, 1]
+
+    # The reused outputs aren't ingested again
+    pipeline = run_pipeline()
+    assert pipeline.stages.get(name='danesfield').algorithm_task == algorithm_task
+    assert counts() == ingested
+
+
+@pytest.mark.django_db
+def test_pipeline_task_finished_early(dataset: Dataset, checksum_file_factory, monkeypatch):
+    dataset.files.set([checksum_file_factory(name='points.las')])
+
+    # The task fails before the stage has recorded it, so finishing it finds no stage
+    algorithm_task = AlgorithmTask.objects.create(
+        algorithm=danesfield_algorithm(), input_dataset=dataset
+    )
+
+    def run_danesfield(pk, force):
+        algorithm_task.status = AlgorithmTask.Status.FAILED
+        algorithm_task.save()
+        tasks._algorithm_task_finished(algorithm_task, succeeded=False)
+        return algorithm_task
+
+    monkeypatch.setattr(tasks, 'run_danesfield', run_danesfield)
+
+    pipeline = tasks.start_pipeline(dataset)
+    ingest_input, danesfield = pipeline.stages.all()[:2]
+    tasks.run_pipeline_stage(ingest_input.pk)
+    tasks.run_pipeline_stage(danesfield.pk)
+
+    danesfield.refresh_from_db()
+    assert danesfield.status == Status.FAILED
+    pipeline.refresh_from_db()
+    assert pipeline.status == Status.FAILED
+
+    # Finishing the task again doesn't finish the stage twice
+    finished = danesfield.finished
+    tasks._algorithm_task_finished(algorithm_task, succeeded=False)
+    danesfield.refresh_from_db()
+    assert danesfield.finished == finished
+
+
+@pytest.mark.django_db
+def test_pipeline_failure(dataset: Dataset, checksum_file_factory, monkeypatch):
+    dataset.files.set([checksum_file_factory(name='video.mpg')])
+
+    def run_telesculptor(pk, force):
+        raise RuntimeError('No GPU available')
+
+    monkeypatch.setattr(tasks, 'run_telesculptor', run_telesculptor)
+
+    pipeline = tasks.start_pipeline(dataset)
+    stages = list(pipeline.stages.all())
+    assert [stage.name for stage in stages] == [
+        'ingest-input',
+        'split-videos',
+        'telesculptor',
+        'merge-point-clouds',
+        'danesfield',
+        'cog',
+        'mesh-tiles',
+        'ingest-output',
+    ]
+
+    tasks.run_pipeline_stage(stages[0].pk)
+    tasks.run_pipeline_stage(stages[1].pk)
+    with pytest.raises(RuntimeError):
+        tasks.run_pipeline_stage(stages[2].pk)
+
+    pipeline.refresh_from_db()
+    assert pipeline.status == Status.FAILED
+    assert [stage.status for stage in pipeline.stages.all()] == [
+        Status.SUCCEEDED,
+        Status.SUCCEEDED,
+        Status.FAILED,
+        Status.SKIPPED,
+        Status.SKIPPED,
+        Status.SKIPPED,
+        Status.SKIPPED,
+        Status.SKIPPED,
+    ]
+
+
+@pytest.mark.django_db
+def test_pipeline_batch(
+    dataset_factory,
+    checksum_file_factory,
+    admin_api_client: APIClient,
+    django_assert_max_num_queries,
+):
+    datasets = [dataset_factory(name=f'AOI {i}') for i in range(5)]
+    for dataset in datasets[:4]:
+        dataset.files.set([checksum_file_factory(name='points.las')])
+    datasets[4].files.set([checksum_file_factory(name='video.mpg')])
+
+    # The number of queries doesn't depend on the number of datasets
+    with django_assert_max_num_queries(15):
+        resp = admin_api_client.post(
+            '/api/danesfield/run_batch/',
+            {'name': 'AOI', 'concurrency': 2, 'priority': 5},
+            format='json',
+        )
+    assert resp.status_code == 200
+    assert resp.json()['priority'] == 5
+
+    pipelines = list(Pipeline.objects.filter(batch=resp.json()['id']).order_by('pk'))
+    assert [pipeline.input_dataset for pipeline in pipelines] == datasets
+    assert [pipeline.stages.count() for pipeline in pipelines] == [5, 5, 5, 5, 8]
+    assert [pipeline.status for pipeline in pipelines] == [Status.QUEUED] * 2 + [Status.CREATED] * 3
+
+    # Another Pipeline of the batch starts once one finishes
+    tasks._finish_stage(pipelines[0].stages.first(), Status.FAILED)
+    assert Pipeline.objects.filter(batch=resp.json()['id'], status=Status.QUEUED).count() == 2
+    pipelines[2].refresh_from_db()
+    assert pipelines[2].status == Status.QUEUED
+
+    resp = admin_api_client.get('/api/pipelines/', {'batch': resp.json()['id']})
+    assert resp.json()['count'] == 5
+
+
+@pytest.mark.django_db
+def test_pipeline_batch_invalid(admin_api_client: APIClient):
+    resp = admin_api_client.post('/api/danesfield/run_batch/', {}, format='json')
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_pipeline_tiled(dataset: Dataset, checksum_file_factory, settings):
+    settings.DANESFIELD_TILE_POINTS = 10_000_000
+    dataset.files.set([checksum_file_factory(name='points.las')])
+
+    pipeline = tasks.start_pipeline(dataset)
+    assert [stage.name for stage in pipeline.stages.all()] == [
+        'ingest-input',
+        'tile',
+        'danesfield',
+        'merge-tiles',
+        'cog',
+        'mesh-tiles',
+        'ingest-output',
+    ]
+
+
+@pytest.mark.django_db
+def test_merge_tile_outputs(dataset_factory, checksum_file_factory, tmp_path):
+    tileset = {
+        'asset': {'version': '1.0'},
+        'geometricError': 100,
+        'root': {'boundingVolume': {'region': [0, 0, 1, 1, 0, 10]}, 'geometricError': 50},
+    }
+    datasets = [dataset_factory() for _ in range(2)]
+    for dataset in datasets:
+        dataset.files.set(
+            [
+                checksum_file_factory(
+                    name='tiler/tileset.json', file__data=json.dumps(tileset).encode()
+                ),
+                checksum_file_factory(name='tiler/0/0.b3dm'),
+                checksum_file_factory(name='buildings.obj'),
+            ]
+        )
+    output_dataset: Dataset = dataset_factory()
+
+    tasks._merge_tile_outputs(datasets, output_dataset, tmp_path)
+
+    merged = {file.name: file for file in output_dataset.files.all()}
+    assert sorted(merged) == [
+        'tiler/0/0/0.b3dm',
+        'tiler/0/tileset.json',
+        'tiler/1/0/0.b3dm',
+        'tiler/1/tileset.json',
+        'tiler/tileset.json',
+        'tiles/0/buildings.obj',
+        'tiles/1/buildings.obj',
+    ]
+    # The files of each tile reference the stored objects of its outputs, rather than copies
+    original = datasets[1].files.get(name='tiler/0/0.b3dm')
+    assert merged['tiler/1/0/0.b3dm'].file.name == original.file.name
+    assert merged['tiler/1/0/0.b3dm'].checksum == original.checksum
+    root = json.loads(merged['tiler/tileset.json'].file.read())
+    assert [child['content']['uri'] for child in root['root']['children']] == [
+        '0/tileset.json',
+        '1/tileset.json',
+    ]
+
+
+@pytest.mark.django_db
+def test_pipeline_telesculptor_mesh_tiles(
+    dataset_factory, checksum_file_factory, settings, tmp_path
+):
+    settings.DANESFIELD_MESH_TILES_MIN_SIZE = 1
+    settings.DANESFIELD_MESH_TILES_LEVELS = 2
+    input_dataset: Dataset = dataset_factory()
+    input_dataset.files.set([checksum_file_factory(name='video.mpg')])
+    pyvista.Plane(i_resolution=10, j_resolution=10).triangulate().save(str(tmp_path / 'mesh.vtp'))
+    telesculptor_output: Dataset = dataset_factory()
+    telesculptor_output.files.set(
+        [
+            checksum_file_factory(
+                name='results/mesh.vtp', file__data=(tmp_path / 'mesh.vtp').read_bytes()
+            ),
+            checksum_file_factory(name='results/geo_origin.txt', file__data=b'39.7 -84.1 200\n'),
+        ]
+    )
+
+    pipeline = tasks.start_pipeline(input_dataset)
+    stages = {stage.name: stage for stage in pipeline.stages.all()}
+    telesculptor = stages['telesculptor']
+    telesculptor.status = Status.SUCCEEDED
+    telesculptor.output_dataset = telesculptor_output
+    telesculptor.save()
+    # The Danesfield outputs have no meshes of their own
+    stages['cog'].output_dataset = input_dataset
+    stages['cog'].save()
+
+    tasks._mesh_tiles_stage(stages['mesh-tiles'])
+
+    output_dataset = pipeline.stages.get(name='mesh-tiles').output_dataset
+    tileset = output_dataset.files.get(name='telesculptor/results/mesh_tiles/tileset.json')
+    root = json.loads(tileset.file.read())['root']
+    # The tileset is placed on the globe about the geo origin
+    assert root['transform'] == pytest.approx(enu_to_ecef(39.7, -84.1, 200))
+    assert output_dataset.files.filter(name='video.mpg').exists()
+
+
+@pytest.mark.django_db
+def test_pipeline_aoi(dataset: Dataset, checksum_file_factory, admin_api_client: APIClient):
+    dataset.files.set([checksum_file_factory(name='points.laz')])
+    aoi = {
+        'type': 'Polygon',
+        'coordinates': [[[-84.1, 39.7], [-84.0, 39.7], [-84.0, 39.8], [-84.1, 39.7]]],
+    }
+
+    resp = admin_api_client.post(
+        '/api/danesfield/run/', {'input_dataset': dataset.pk, 'aoi': aoi}, format='json'
+    )
+    assert resp.status_code == 200
+    assert [stage['name'] for stage in resp.json()['stages']] == [
+        'ingest-input',
+        'preprocess',
+        'danesfield',
+        'cog',
+        'mesh-tiles',
+        'ingest-output',
+    ]
+    assert Pipeline.objects.get(pk=resp.json()['id']).aoi.coords[0][0] == (-84.1, 39.7)
+
+    resp = admin_api_client.post(
+        '/api/danesfield/run/',
+        {'input_dataset': dataset.pk, 'aoi': {'type': 'Point', 'coordinates': [0, 0]}},
+        format='json',
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_pipeline_videos(
+    dataset_factory, checksum_file_factory, admin_api_client: APIClient, monkeypatch
+):
+    input_dataset: Dataset = dataset_factory()
+    input_dataset.files.set(
+        [checksum_file_factory(name=f'video_{i}.mpg') for i in range(3)]
+        + [checksum_file_factory(name='notes.txt')]
+    )
+
+    # Don't launch any containers
+    algorithm_tasks = {}
+
+    def run_telesculptor(pk, force):
+        algorithm_tasks[pk] = AlgorithmTask.objects.create(
+            algorithm=danesfield_algorithm(), input_dataset_id=pk
+        )
+        return algorithm_tasks[pk]
+
+    monkeypatch.setattr(tasks, 'run_telesculptor', run_telesculptor)
+
+    pipeline = tasks.start_pipeline(input_dataset)
+    telesculptor, merge_point_clouds = pipeline.stages.all()[2:4]
+    for stage in pipeline.stages.all()[:3]:
+        tasks.run_pipeline_stage(stage.pk)
+
+    videos = list(pipeline.videos.all())
+    assert [video.name for video in videos] == ['video_0.mpg', 'video_1.mpg', 'video_2.mpg']
+    assert [list(video.input_dataset.files.values_list('name', flat=True)) for video in videos] == [
+        ['video_0.mpg'],
+        ['video_1.mpg'],
+        ['video_2.mpg'],
+    ]
+    assert len(algorithm_tasks) == 3
+
+    # One FMV failing doesn't fail the others
+    for video, status in zip(
+        videos,
+        [
+            AlgorithmTask.Status.SUCCEEDED,
+            AlgorithmTask.Status.FAILED,
+            AlgorithmTask.Status.SUCCEEDED,
+        ],
+    ):
+        task = algorithm_tasks[video.input_dataset_id]
+        task.status = status
+        task.save()
+        telesculptor.refresh_from_db()
+        assert telesculptor.status == Status.RUNNING
+        tasks._algorithm_task_finished(task, succeeded=status == AlgorithmTask.Status.SUCCEEDED)
+
+    telesculptor.refresh_from_db()
+    assert telesculptor.status == Status.SUCCEEDED
+    merge_point_clouds.refresh_from_db()
+    assert merge_point_clouds.status == Status.QUEUED
+
+    resp = admin_api_client.get(f'/api/pipelines/{pipeline.pk}/')
+    assert [video['status'] for video in resp.json()['videos']] == [
+        AlgorithmTask.Status.SUCCEEDED,
+        AlgorithmTask.Status.FAILED,
+        AlgorithmTask.Status.SUCCEEDED,
+    ]
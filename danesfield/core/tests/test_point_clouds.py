@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import laspy
+import numpy as np
+
+from danesfield.core.utils import point_clouds
+from danesfield.core.utils.point_clouds import (
+    merge_point_clouds,
+    points_in_polygon,
+    preprocess_point_cloud,
+)
+
+
+def _write_point_cloud(path: Path, points: int) -> None:
+    header = laspy.LasHeader(point_format=3, version='1.2')
+    header.scales = [0.01, 0.01, 0.01]
+    header.offsets = [0, 0, 0]
+    las = laspy.LasData(header)
+    rng = np.random.default_rng(0)
+    las.x = rng.uniform(0, 100, points)
+    las.y = rng.uniform(0, 100, points)
+    las.z = rng.uniform(0, 10, points)
+    las.write(path)
+
+
+def test_points_in_polygon():
+    square = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+    hole = [(4, 4), (6, 4), (6, 6), (4, 6), (4, 4)]
+    x = np.array([1, 5, 11, 9])
+    y = np.array([1, 5, 5, 9])
+    assert points_in_polygon(x, y, [square, hole]).tolist() == [True, False, False, True]
+
+
+def test_preprocess_point_cloud(tmp_path: Path, monkeypatch):
+    # Process the points in several chunks, to check that voxels are deduplicated across them
+    monkeypatch.setattr(point_clouds, 'CHUNK_POINTS', 10_000)
+    _write_point_cloud(tmp_path / 'input.las', 100_000)
+
+    aoi = [[(0, 0), (50, 0), (50, 50), (0, 50), (0, 0)]]
+    stats = preprocess_point_cloud(tmp_path / 'input.las', tmp_path / 'output.laz', 2, aoi)
+
+    output = laspy.read(tmp_path / 'output.laz')
+    assert stats.input_points == 100_000
+    assert stats.output_points == len(output.points)
+    assert stats.output_bytes < stats.input_bytes
+    assert output.x.max() <= 50 and output.y.max() <= 50
+
+    # At most one point is kept per voxel
+    voxels = np.floor(np.stack([output.x, output.y, output.z], axis=1) / 2)
+    assert len(np.unique(voxels, axis=0)) == len(output.points)
+
+
+def test_merge_point_clouds(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(point_clouds, 'CHUNK_POINTS', 10_000)
+    _write_point_cloud(tmp_path / 'a.las', 25_000)
+    _write_point_cloud(tmp_path / 'b.las', 15_000)
+
+    points = merge_point_clouds([tmp_path / 'a.las', tmp_path / 'b.las'], tmp_path / 'merged.las')
+
+    merged = laspy.read(tmp_path / 'merged.las')
+    assert points == len(merged.points) == 40_000
+    assert merged.header.point_count == 40_000
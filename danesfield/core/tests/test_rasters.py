@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+from osgeo import gdal
+
+from danesfield.core.utils.rasters import convert_to_cog, is_cog
+
+
+def test_convert_to_cog(tmp_path: Path):
+    dataset = gdal.GetDriverByName('GTiff').Create(
+        str(tmp_path / 'dsm.tif'), 2048, 2048, 1, gdal.GDT_Float32
+    )
+    dataset.SetGeoTransform((500000, 0.25, 0, 4400000, 0, -0.25))
+    data = np.random.default_rng(0).uniform(0, 100, (2048, 2048)).astype(np.float32)
+    dataset.GetRasterBand(1).WriteArray(data)
+    dataset = None
+    assert not is_cog(tmp_path / 'dsm.tif')
+
+    convert_to_cog(tmp_path / 'dsm.tif', tmp_path / 'dsm_cog.tif')
+
+    assert is_cog(tmp_path / 'dsm_cog.tif')
+    cog = gdal.Open(str(tmp_path / 'dsm_cog.tif'))
+    band = cog.GetRasterBand(1)
+    assert band.GetBlockSize() == [512, 512]
+    assert band.GetOverviewCount() > 0
+    assert cog.GetGeoTransform() == (500000, 0.25, 0, 4400000, 0, -0.25)
+    assert np.array_equal(band.ReadAsArray(), data)
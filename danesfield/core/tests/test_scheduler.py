@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from pathlib import Path
+import select
+import subprocess
+import sys
+import threading
+
+from docker.models.containers import ContainerCollection
+from docker.types import DeviceRequest
+from filelock import FileLock
+import pytest
+
+from danesfield.core.utils.scheduler import (
+    FakeGPUInventory,
+    GPUInventory,
+    GPUJob,
+    GPUScheduler,
+    containers_on_gpu,
+    inventory_from_settings,
+)
+
+# Admit a job from another process, which holds it until its input is closed
+_ADMIT_JOB = """
+import sys
+from danesfield.core.utils.scheduler import FakeGPUInventory, GPUJob, GPUScheduler
+
+scheduler = GPUScheduler(FakeGPUInventory([8192]), sys.argv[1])
+print('ready', flush=True)
+print(scheduler.try_admit(GPUJob(id=sys.argv[2], memory=6000)), flush=True)
+sys.stdin.read()
+"""
+
+
+def _admit_in_process(state_dir: Path, job_id: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, '-c', _ADMIT_JOB, str(state_dir), job_id],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert process.stdout.readline() == 'ready\n'
+    return process
+
+
+@pytest.fixture
+def scheduler(tmp_path: Path) -> GPUScheduler:
+    return GPUScheduler(FakeGPUInventory([8192, 16384]), tmp_path, poll_interval=0)
+
+
+def test_gpu_scheduler_memory(scheduler: GPUScheduler):
+    small = GPUJob(id='small', memory=6000)
+    large = GPUJob(id='large', memory=12000)
+    waiting = GPUJob(id='waiting', memory=4000)
+
+    # The smallest GPU which fits a job is used, leaving the larger one free for larger jobs
+    assert scheduler.try_admit(small) == 0
+    assert scheduler.try_admit(large) == 1
+    assert scheduler.try_admit(waiting) is None
+
+    scheduler.release(small)
+    assert scheduler.try_admit(waiting) == 0
+
+
+def test_gpu_scheduler_priority(tmp_path: Path):
+    scheduler = GPUScheduler(FakeGPUInventory([8192, 8192]), tmp_path)
+    assert scheduler.try_admit(GPUJob(id='running', memory=8000, owner='alice')) == 0
+    blocker = GPUJob(id='blocker', memory=8000, owner='carol')
+    assert scheduler.try_admit(blocker) == 1
+
+    alice = GPUJob(id='alice', memory=4000, owner='alice')
+    bob = GPUJob(id='bob', memory=4000, owner='bob')
+    assert scheduler.try_admit(alice) is None
+    assert scheduler.try_admit(bob) is None
+
+    # Alice already has a running job, so Bob's job is admitted first
+    scheduler.release(blocker)
+    assert scheduler.try_admit(alice) is None
+    assert scheduler.try_admit(bob) == 1
+    scheduler.release(bob)
+
+    # A higher priority job is admitted before any other
+    urgent = GPUJob(id='urgent', memory=4000, owner='alice', priority=9)
+    assert scheduler.try_admit(urgent) == 1
+    assert scheduler.try_admit(alice) is None
+
+
+def test_gpu_scheduler_admitted(scheduler: GPUScheduler):
+    # Jobs estimated to need more than any GPU has get the largest one to themselves
+    with scheduler.admitted(GPUJob(id='huge', memory=100000)) as device_index:
+        assert device_index == 1
+        assert scheduler.try_admit(GPUJob(id='other', memory=1)) == 0
+        assert scheduler.try_admit(GPUJob(id='another', memory=9000)) is None
+
+    assert scheduler.try_admit(GPUJob(id='another', memory=9000)) == 1
+
+
+def test_gpu_scheduler_processes(tmp_path: Path):
+    scheduler = GPUScheduler(FakeGPUInventory([8192]), tmp_path)
+    processes = []
+    try:
+        # Separately started processes lock the same file
+        with FileLock(scheduler.lock_path):
+            processes.append(_admit_in_process(tmp_path, 'first'))
+            assert select.select([processes[0].stdout], [], [], 1)[0] == []
+        assert processes[0].stdout.readline() == '0\n'
+
+        # Only one of them fits on the GPU
+        processes.append(_admit_in_process(tmp_path, 'second'))
+        assert processes[1].stdout.readline() == 'None\n'
+        assert scheduler.try_admit(GPUJob(id='third', memory=6000)) is None
+    finally:
+        for process in processes:
+            process.communicate('')
+
+    # Their jobs are forgotten once they have exited
+    assert scheduler.try_admit(GPUJob(id='third', memory=6000)) == 0
+
+
+def test_inventory_from_settings(settings):
+    settings.DANESFIELD_GPU_INVENTORY = 'fake:16384,8192'
+    assert [device.memory for device in inventory_from_settings().devices()] == [16384, 8192]
+
+
+def test_gpu_inventory_abstract():
+    with pytest.raises(TypeError):
+        GPUInventory()
+
+
+def test_containers_on_gpu(monkeypatch):
+    created = []
+    monkeypatch.setattr(
+        ContainerCollection,
+        'create',
+        lambda self, image, command=None, **kwargs: created.append(kwargs),
+    )
+    containers = ContainerCollection()
+
+    with containers_on_gpu(1):
+        containers.create('danesfield', device_requests=[DeviceRequest(count=-1)])
+        containers.create('danesfield', environment={'A': '1'})
+        containers.create('danesfield', environment=['A=1'])
+
+    assert [request['DeviceIDs'] for request in created[0]['device_requests']] == [['1']]
+    assert created[1]['environment'] == {'A': '1', 'NVIDIA_VISIBLE_DEVICES': '1'}
+    assert created[2]['environment'] == ['A=1', 'NVIDIA_VISIBLE_DEVICES=1']
+
+    # Containers created afterwards may use any GPU
+    containers.create('danesfield', device_requests=[DeviceRequest(count=-1)])
+    assert created[3]['device_requests'][0]['Count'] == -1
+
+
+def test_containers_on_gpu_threads(monkeypatch):
+    created = {}
+    monkeypatch.setattr(
+        ContainerCollection,
+        'create',
+        lambda self, image, command=None, **kwargs: created.setdefault(image, kwargs),
+    )
+    containers = ContainerCollection()
+    entered = threading.Barrier(2)
+
+    def create(device_index: int):
+        with containers_on_gpu(device_index):
+            entered.wait()
+            containers.create(f'gpu{device_index}', device_requests=[DeviceRequest(count=-1)])
+
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Each thread's container only requested the GPU of that thread
+    assert created['gpu0']['device_requests'][0]['DeviceIDs'] == ['0']
+    assert created['gpu1']['device_requests'][0]['DeviceIDs'] == ['1']
@@ -1,11 +1,26 @@
 from __future__ import annotations
 
 import pytest
-from rdoasis.algorithms.models import Dataset
+from rdoasis.algorithms.models import Algorithm, AlgorithmTask, Dataset
+from rgd.models.mixins import Status
 from rgd_3d.models import Mesh3D, Tiles3D
 from rgd_imagery.models import Raster
 
-from danesfield.core.tasks import _ingest_checksum_files
+from danesfield.core import tasks
+from danesfield.core.models import (
+    AlgorithmTaskFingerprint,
+    AlgorithmTaskMetrics,
+    KeyframeSelection,
+)
+from danesfield.core.tasks import (
+    _danesfield_config,
+    _ingest_checksum_files,
+    _record_span,
+    run_danesfield,
+)
+from danesfield.core.utils import danesfield_algorithm
+from danesfield.core.utils.fingerprints import algorithm_fingerprint
+from danesfield.core.utils.instrumentation import timed
 
 
 @pytest.mark.django_db
@@ -18,3 +33,153 @@ def test_dataset_ingestion(output_dataset: Dataset):
     assert Raster.objects.count() == 1
     assert Mesh3D.objects.count() == 1
     assert Tiles3D.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_dataset_ingestion_batched(
+    dataset: Dataset, checksum_file_factory, django_assert_max_num_queries
+):
+    """Test that ingesting many images takes a constant number of queries."""
+    dataset.files.set([checksum_file_factory(name=f'tile_{i}.tif') for i in range(50)])
+
+    with django_assert_max_num_queries(15):
+        _ingest_checksum_files(dataset)
+
+    assert Raster.objects.count() == 50
+    for raster in Raster.objects.select_related('image_set'):
+        assert raster.image_set.images.count() == 1
+        assert raster.status == Status.QUEUED
+
+
+@pytest.mark.django_db
+def test_nested_3d_tiles_ingestion(dataset: Dataset, checksum_file_factory):
+    names = [
+        'tiler/tileset.json',
+        'tiler/root.b3dm',
+        'tiler/building_0/tileset.json',
+        'tiler/building_0/building.b3dm',
+        'tiler_other/unrelated.b3dm',
+    ]
+    dataset.files.set([checksum_file_factory(name=name) for name in names])
+
+    _ingest_checksum_files(dataset)
+
+    assert Tiles3D.objects.count() == 2
+    files = {file.name: file for file in dataset.files.all()}
+    file_set = files['tiler/tileset.json'].file_set
+    assert file_set is not None
+    assert all(files[name].file_set == file_set for name in names[:4])
+    assert files['tiler_other/unrelated.b3dm'].file_set is None
+
+
+@pytest.mark.django_db
+def test_algorithm_fingerprint(dataset: Dataset, checksum_file_factory):
+    algorithm = danesfield_algorithm()
+    file = checksum_file_factory(name='points.las')
+    dataset.files.set([file])
+
+    # Files without a checksum can't be fingerprinted
+    assert algorithm_fingerprint(algorithm, dataset, {}) is None
+
+    file.update_checksum()
+    file.save()
+    fingerprint = algorithm_fingerprint(algorithm, dataset, {'params': {'gsd': 0.25}})
+    assert fingerprint == algorithm_fingerprint(algorithm, dataset, {'params': {'gsd': 0.25}})
+    assert fingerprint != algorithm_fingerprint(algorithm, dataset, {'params': {'gsd': 0.5}})
+
+
+@pytest.mark.django_db
+def test_run_danesfield_reuse(dataset_factory, checksum_file_factory, monkeypatch):
+    algorithm = danesfield_algorithm()
+    input_dataset: Dataset = dataset_factory()
+    file = checksum_file_factory(name='points.las')
+    file.update_checksum()
+    file.save()
+    input_dataset.files.set([file])
+
+    previous = AlgorithmTask.objects.create(
+        algorithm=algorithm,
+        status=AlgorithmTask.Status.SUCCEEDED,
+        input_dataset=input_dataset,
+        output_dataset=dataset_factory(),
+    )
+    AlgorithmTaskFingerprint.objects.create(
+        algorithm_task=previous,
+        fingerprint=algorithm_fingerprint(
+            algorithm, input_dataset, _danesfield_config(input_dataset)
+        ),
+    )
+    assert run_danesfield(input_dataset.pk) == previous
+
+    # Don't launch any containers when forcing a new run
+    def run(self, input_dataset_pk, celery_task):
+        return AlgorithmTask.objects.create(algorithm=self, input_dataset_id=input_dataset_pk)
+
+    monkeypatch.setattr(Algorithm, 'run', run)
+    task = run_danesfield(input_dataset.pk, force=True)
+    assert task != previous
+    assert task.fingerprint.fingerprint == previous.fingerprint.fingerprint
+
+
+@pytest.mark.django_db
+def test_algorithm_task_timings(dataset: Dataset, admin_api_client):
+    task = AlgorithmTask.objects.create(algorithm=danesfield_algorithm(), input_dataset=dataset)
+    with timed('stage-inputs') as span:
+        span.bytes = 1024
+    _record_span(task, span)
+    with pytest.raises(RuntimeError):
+        with timed('run') as span:
+            raise RuntimeError
+    _record_span(task, span)
+    AlgorithmTaskMetrics.objects.create(
+        algorithm_task=task, input_bytes_downloaded=1024, container_peak_memory=2**30
+    )
+
+    resp = admin_api_client.get(f'/api/tasks/{task.pk}/timings/')
+    assert resp.status_code == 200
+    assert [(s['name'], s['bytes']) for s in resp.data['spans']] == [
+        ('stage-inputs', 1024),
+        ('run', None),
+    ]
+    # Failed steps are still timed
+    assert resp.data['spans'][1]['duration'] >= 0
+    assert resp.data['metrics']['input_bytes_downloaded'] == 1024
+    assert resp.data['metrics']['container_peak_memory'] == 2**30
+
+
+@pytest.mark.django_db
+def test_run_telesculptor_keyframes(
+    dataset: Dataset, checksum_file_factory, monkeypatch, django_capture_on_commit_callbacks
+):
+    dataset.files.set([checksum_file_factory(name='video.mpg')])
+
+    # What the worker finds once the task is sent
+    sent = []
+
+    def apply_async(args=None, kwargs=None, **options):
+        algorithm_task = AlgorithmTask.objects.get(pk=kwargs['algorithm_task_id'])
+        sent.append(
+            (
+                KeyframeSelection.objects.filter(algorithm_task=algorithm_task).exists(),
+                AlgorithmTaskFingerprint.objects.filter(algorithm_task=algorithm_task).exists(),
+            )
+        )
+
+    monkeypatch.setattr(tasks.run_kwiver_task, 'apply_async', apply_async)
+
+    # A launcher which sends the task as soon as it is created
+    def run(self, dataset_id, celery_task):
+        algorithm_task = AlgorithmTask.objects.create(algorithm=self, input_dataset_id=dataset_id)
+        celery_task.delay(algorithm_task_id=algorithm_task.pk)
+        return algorithm_task
+
+    monkeypatch.setattr(Algorithm, 'run', run)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        algorithm_task = tasks.run_telesculptor(
+            dataset.pk, keyframes={'mode': 'stride', 'stride': 5}
+        )
+        assert sent == []
+
+    assert sent == [(True, True)]
+    assert algorithm_task.keyframe_selection.stride == 5
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from pathlib import PurePosixPath
+
+import numpy as np
+
+from danesfield.core.utils.tiling import (
+    merge_bounding_volumes,
+    merge_tilesets,
+    plan_tiles,
+    tile_output_name,
+)
+
+
+def test_plan_tiles_balances_density():
+    rng = np.random.default_rng(0)
+    # A dense cluster in one corner of a sparse area
+    x = np.concatenate([rng.uniform(0, 100, 1000), rng.uniform(0, 10, 9000)])
+    y = np.concatenate([rng.uniform(0, 100, 1000), rng.uniform(0, 10, 9000)])
+
+    tiles = plan_tiles(x, y, (0, 0, 100, 100), total_points=100_000, target_points=15_000)
+
+    assert sum(tile.points for tile in tiles) == 100_000
+    assert all(tile.points <= 15_000 for tile in tiles)
+    # Tiles over the dense cluster cover a much smaller area
+    areas = [
+        (max_x - min_x) * (max_y - min_y)
+        for min_x, min_y, max_x, max_y in (tile.bounds for tile in tiles)
+    ]
+    assert min(areas) * 50 < max(areas)
+
+
+def test_plan_tiles_single():
+    x = np.array([1.0, 2.0, 3.0])
+    tiles = plan_tiles(x, x, (0, 0, 4, 4), total_points=3, target_points=10)
+    assert len(tiles) == 1
+    assert tiles[0].bounds == (0, 0, 4, 4)
+    assert tiles[0].buffered(1) == (-1, -1, 5, 5)
+
+
+def test_merge_bounding_volumes():
+    assert merge_bounding_volumes(
+        [{'region': [0, 0, 1, 1, 0, 10]}, {'region': [-1, 0.5, 0.5, 2, 5, 20]}]
+    ) == {'region': [-1, 0, 1, 2, 0, 20]}
+
+    merged = merge_bounding_volumes(
+        [
+            {'box': [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 1]},
+            {'sphere': [4, 0, 0, 1]},
+        ]
+    )
+    assert merged == {'box': [2, 0, 0, 3, 0, 0, 0, 1, 0, 0, 0, 1]}
+
+
+def test_merge_tilesets():
+    tileset = {
+        'asset': {'version': '1.0'},
+        'geometricError': 100,
+        'root': {'boundingVolume': {'region': [0, 0, 1, 1, 0, 10]}, 'geometricError': 50},
+    }
+    merged = merge_tilesets({'0/tileset.json': tileset, '1/tileset.json': tileset})
+
+    assert merged['root']['refine'] == 'ADD'
+    assert [child['content']['uri'] for child in merged['root']['children']] == [
+        '0/tileset.json',
+        '1/tileset.json',
+    ]
+    assert merged['root']['boundingVolume'] == {'region': [0, 0, 1, 1, 0, 10]}
+
+
+def test_tile_output_name():
+    tileset_dirs = [PurePosixPath('tiler')]
+    assert tile_output_name(2, 'tiler/tileset.json', tileset_dirs) == 'tiler/2/tileset.json'
+    assert tile_output_name(2, 'tiler/0/0.b3dm', tileset_dirs) == 'tiler/2/0/0.b3dm'
+    assert tile_output_name(2, 'dsm.tif', tileset_dirs) == 'tiles/2/dsm.tif'
+    assert tile_output_name(0, 'buildings.obj', []) == 'tiles/0/buildings.obj'
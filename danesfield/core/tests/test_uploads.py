@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from rdoasis.algorithms.models import Dataset
+from rgd.models import ChecksumFile
+from rgd_3d.models import Tiles3D
+
+from danesfield.core.tasks import _ingest_checksum_files
+from danesfield.core.utils.archives import get_cached_archive_files
+from danesfield.core.utils.uploads import upload_output_files
+
+
+@pytest.mark.django_db
+def test_upload_output_files(tmp_path: Path, settings):
+    # Upload everything in parts, to exercise the multipart path of the storage
+    settings.DANESFIELD_MULTIPART_THRESHOLD = 1
+    settings.DANESFIELD_MULTIPART_CHUNK_SIZE = 5 * 1024**2
+
+    (tmp_path / 'tiler' / '0').mkdir(parents=True)
+    (tmp_path / 'tiler' / 'tileset.json').write_text('{}')
+    (tmp_path / 'tiler' / '0' / '0.b3dm').write_bytes(b'b3dm' * 1000)
+    (tmp_path / 'dsm.tif').write_bytes(b'tif' * 1000)
+
+    reused, files, stats = upload_output_files(tmp_path, workers=4)
+    assert reused == []
+    assert sorted(file.name for file in files) == [
+        'dsm.tif',
+        'tiler/0/0.b3dm',
+        'tiler/tileset.json',
+    ]
+    assert stats.uploaded_files == 3
+    assert stats.uploaded_bytes == 7002
+    # Ready to be downloaded as an archive
+    sizes = get_cached_archive_files(file.checksum for file in files)
+    assert sorted(known['size'] for known in sizes.values()) == [2, 3000, 4000]
+    assert stats.deduplicated_files == 0
+    with files[0].file.open('rb') as fd:
+        assert fd.read() == b'tif' * 1000
+
+    # Only the changed file is uploaded again
+    (tmp_path / 'dsm.tif').write_bytes(b'tiff' * 1000)
+    reused, created, stats = upload_output_files(tmp_path, workers=4)
+    new_files = reused + created
+    assert stats.uploaded_files == 1
+    assert stats.deduplicated_files == 2
+    assert stats.deduplicated_bytes == 4002
+    assert {file.pk for file in new_files} & {file.pk for file in files} == {
+        file.pk for file in files if file.name != 'dsm.tif'
+    }
+
+
+@pytest.mark.django_db
+def test_upload_output_files_owner(tmp_path: Path, user_factory):
+    (tmp_path / 'dsm.tif').write_bytes(b'tif' * 1000)
+    owner, other = user_factory(), user_factory()
+
+    _, files, _ = upload_output_files(tmp_path, workers=1, created_by=owner)
+    assert [file.created_by for file in files] == [owner]
+
+    # Files of another user aren't reused
+    reused, created, stats = upload_output_files(tmp_path, workers=1, created_by=other)
+    assert reused == []
+    assert [file.created_by for file in created] == [other]
+    assert stats.deduplicated_files == 0
+
+    reused, created, _ = upload_output_files(tmp_path, workers=1, created_by=owner)
+    assert reused == files
+    assert created == []
+
+
+@pytest.mark.django_db
+def test_upload_output_files_tilesets(tmp_path: Path, user):
+    """Reruns which share tiles with an earlier run don't take them from its tileset."""
+    (tmp_path / 'tiler').mkdir()
+    (tmp_path / 'tiler' / 'tileset.json').write_text('{"version": 1}')
+    (tmp_path / 'tiler' / '0.b3dm').write_bytes(b'b3dm' * 1000)
+    _, files, _ = upload_output_files(tmp_path, workers=1, created_by=user)
+    first = Dataset.objects.create(name='First')
+    first.files.set(files)
+    _ingest_checksum_files(first, start_pipelines=False)
+    first_tiles = Tiles3D.objects.get(json_file__in=files)
+
+    # Only the tileset.json changed
+    (tmp_path / 'tiler' / 'tileset.json').write_text('{"version": 2}')
+    reused, created, _ = upload_output_files(tmp_path, workers=1, created_by=user)
+    assert reused == []
+    assert sorted(file.name for file in created) == ['tiler/0.b3dm', 'tiler/tileset.json']
+    second = Dataset.objects.create(name='Second')
+    second.files.set(created)
+    _ingest_checksum_files(second, start_pipelines=False)
+
+    first_file_set = first_tiles.json_file.file_set
+    assert sorted(
+        ChecksumFile.objects.filter(file_set=first_file_set).values_list('pk', flat=True)
+    ) == sorted(file.pk for file in files)
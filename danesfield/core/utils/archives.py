@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+import struct
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Files are read, and the archive written, in parts of this many bytes
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_COUNT_LIMIT = 0xFFFF
+# Data descriptor, and UTF-8 names
+_FLAGS = 0x0008 | 0x0800
+
+
+def _dos_datetime(modified: datetime) -> Tuple[int, int]:
+    year = min(max(modified.year, 1980), 2107)
+    date = (year - 1980) << 9 | modified.month << 5 | modified.day
+    time = modified.hour << 11 | modified.minute << 5 | modified.second // 2
+    return time, date
+
+
+@dataclass
+class ArchiveEntry:
+    """A file of an archive, and where it is laid out in it."""
+
+    name: str
+    size: int
+    modified: datetime
+    # Identifies the contents, to look up and remember their CRC-32
+    key: str
+    offset: int = 0
+    encoded_name: bytes = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.encoded_name = self.name.encode()
+
+    @property
+    def zip64_size(self) -> bool:
+        return self.size >= _ZIP64_LIMIT
+
+    @property
+    def zip64_offset(self) -> bool:
+        return self.offset >= _ZIP64_LIMIT
+
+    @property
+    def header_size(self) -> int:
+        return 30 + len(self.encoded_name) + (20 if self.zip64_size else 0)
+
+    @property
+    def descriptor_size(self) -> int:
+        return 24 if self.zip64_size else 16
+
+    @property
+    def version(self) -> int:
+        return 45 if self.zip64_size or self.zip64_offset else 20
+
+    def local_header(self) -> bytes:
+        time, date = _dos_datetime(self.modified)
+        size = _ZIP64_LIMIT if self.zip64_size else self.size
+        extra = struct.pack('<HHQQ', 1, 16, self.size, self.size) if self.zip64_size else b''
+        return (
+            struct.pack(
+                '<IHHHHHIIIHH',
+                0x04034B50,
+                self.version,
+                _FLAGS,
+                0,
+                time,
+                date,
+                0,
+                size,
+                size,
+                len(self.encoded_name),
+                len(extra),
+            )
+            + self.encoded_name
+            + extra
+        )
+
+    def descriptor(self, crc: int) -> bytes:
+        if self.zip64_size:
+            return struct.pack('<IIQQ', 0x08074B50, crc, self.size, self.size)
+        return struct.pack('<IIII', 0x08074B50, crc, self.size, self.size)
+
+    def central_header(self, crc: int) -> bytes:
+        time, date = _dos_datetime(self.modified)
+        values = []
+        if self.zip64_size:
+            values += [self.size, self.size]
+        if self.zip64_offset:
+            values.append(self.offset)
+        extra = struct.pack(f'<HH{len(values)}Q', 1, 8 * len(values), *values) if values else b''
+        size = _ZIP64_LIMIT if self.zip64_size else self.size
+        return (
+            struct.pack(
+                '<IHHHHHHIIIHHHHHII',
+                0x02014B50,
+                self.version,
+                self.version,
+                _FLAGS,
+                0,
+                time,
+                date,
+                crc,
+                size,
+                size,
+                len(self.encoded_name),
+                len(extra),
+                0,
+                0,
+                0,
+                0o100644 << 16,
+                min(self.offset, _ZIP64_LIMIT),
+            )
+            + self.encoded_name
+            + extra
+        )
+
+
+class ZipArchive:
+    """
+    A ZIP archive of files stored uncompressed, streamed without buffering it.
+
+    As the files aren't compressed, the size of the archive and the position of each file in it
+    are known before any file is read, so any range of the archive can be streamed, to resume a
+    download. CRC-32s are computed as the files are streamed, and remembered in ``crcs``, as the
+    central directory at the end of the archive needs the CRC-32 of every file. ``on_crc`` is
+    called with each file as soon as its CRC-32 is computed, so that it may be kept even if the
+    download is interrupted.
+    """
+
+    def __init__(
+        self,
+        entries: List[ArchiveEntry],
+        open_entry: Callable[[ArchiveEntry], BinaryIO],
+        crcs: Optional[Dict[str, int]] = None,
+        on_crc: Optional[Callable[[ArchiveEntry, int], None]] = None,
+    ):
+        self.entries = entries
+        self.open_entry = open_entry
+        self.crcs: Dict[str, int] = crcs if crcs is not None else {}
+        self.on_crc = on_crc
+
+        offset = 0
+        for entry in entries:
+            entry.offset = offset
+            offset += entry.header_size + entry.size + entry.descriptor_size
+        self.central_directory_offset = offset
+        self.central_directory_size = sum(
+            46
+            + len(entry.encoded_name)
+            + 8 * (2 * entry.zip64_size + entry.zip64_offset)
+            + (4 if entry.zip64_size or entry.zip64_offset else 0)
+            for entry in entries
+        )
+        self.zip64 = (
+            len(entries) >= _ZIP64_COUNT_LIMIT
+            or self.central_directory_offset >= _ZIP64_LIMIT
+            or self.central_directory_size >= _ZIP64_LIMIT
+        )
+        self.size = (
+            self.central_directory_offset
+            + self.central_directory_size
+            + (56 + 20 if self.zip64 else 0)
+            + 22
+        )
+
+    def _crc(self, entry: ArchiveEntry) -> int:
+        """Return the CRC-32 of a file, reading it if it hasn't been streamed yet."""
+        if entry.key not in self.crcs:
+            crc = 0
+            with self.open_entry(entry) as f:
+                while data := f.read(ARCHIVE_CHUNK_SIZE):
+                    crc = zlib.crc32(data, crc)
+            self._set_crc(entry, crc)
+        return self.crcs[entry.key]
+
+    def _set_crc(self, entry: ArchiveEntry, crc: int):
+        self.crcs[entry.key] = crc
+        if self.on_crc is not None:
+            self.on_crc(entry, crc)
+
+    def _entry_data(self, entry: ArchiveEntry, start: int, end: int) -> Iterator[bytes]:
+        """Stream bytes ``start`` to ``end`` of a file, computing its CRC-32 if possible."""
+        crc = 0
+        position = 0
+        with self.open_entry(entry) as f:
+            while position < end:
+                data = f.read(ARCHIVE_CHUNK_SIZE)
+                if not data:
+                    raise IOError(f'{entry.name} is shorter than its size of {entry.size} bytes.')
+                crc = zlib.crc32(data, crc)
+                if position + len(data) > start:
+                    yield data[max(0, start - position) : end - position]
+                position += len(data)
+        if start == 0 and end == entry.size and entry.key not in self.crcs:
+            self._set_crc(entry, crc)
+
+    def _end_records(self) -> bytes:
+        count = len(self.entries)
+        records = b''
+        if self.zip64:
+            zip64_end_offset = self.central_directory_offset + self.central_directory_size
+            records += struct.pack(
+                '<IQHHIIQQQQ',
+                0x06064B50,
+                44,
+                45,
+                45,
+                0,
+                0,
+                count,
+                count,
+                self.central_directory_size,
+                self.central_directory_offset,
+            )
+            records += struct.pack('<IIQI', 0x07064B50, 0, zip64_end_offset, 1)
+        records += struct.pack(
+            '<IHHHHIIH',
+            0x06054B50,
+            0,
+            0,
+            min(count, _ZIP64_COUNT_LIMIT),
+            min(count, _ZIP64_COUNT_LIMIT),
+            min(self.central_directory_size, _ZIP64_LIMIT),
+            min(self.central_directory_offset, _ZIP64_LIMIT),
+            0,
+        )
+        return records
+
+    def _segments(self) -> Iterator[Tuple[int, Callable[[int, int], Iterator[bytes]]]]:
+        """Yield the size of each part of the archive, and a function streaming a range of it."""
+
+        def constant(data: Callable[[], bytes]):
+            return lambda start, end: iter([data()[start:end]])
+
+        for entry in self.entries:
+            yield entry.header_size, constant(entry.local_header)
+            yield entry.size, lambda start, end, entry=entry: self._entry_data(entry, start, end)
+            yield entry.descriptor_size, constant(
+                lambda entry=entry: entry.descriptor(self._crc(entry))
+            )
+        for entry in self.entries:
+            yield len(entry.central_header(0)), constant(
+                lambda entry=entry: entry.central_header(self._crc(entry))
+            )
+        yield len(self._end_records()), constant(self._end_records)
+
+    def stream(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Stream bytes ``start`` to ``end`` of the archive, exclusive, or to its end."""
+        end = self.size if end is None else end
+        position = 0
+        for size, read in self._segments():
+            if position >= end:
+                break
+            if position + size > start and size:
+                for data in read(max(0, start - position), min(size, end - position)):
+                    if data:
+                        yield data
+            position += size
+
+
+def _archive_file_cache_key(checksum: str) -> str:
+    return f'danesfield:archive-file:{checksum}'
+
+
+def get_cached_archive_files(checksums: Iterable[str]) -> Dict[str, dict]:
+    """Return the cached size, and CRC-32 if it is known, of files by their checksum."""
+    checksums = list(checksums)
+    cached = cache.get_many([_archive_file_cache_key(checksum) for checksum in checksums])
+    return {
+        checksum: cached[_archive_file_cache_key(checksum)]
+        for checksum in checksums
+        if _archive_file_cache_key(checksum) in cached
+    }
+
+
+def cache_archive_files(files: Dict[str, dict]) -> None:
+    """Cache the size, and CRC-32 or None, of files by their checksum."""
+    if files:
+        cache.set_many(
+            {_archive_file_cache_key(checksum): known for checksum, known in files.items()},
+            timeout=settings.DANESFIELD_ARCHIVE_CACHE_TIMEOUT,
+        )
+
+
+def cache_archive_file_sizes(sizes: Dict[str, int]) -> None:
+    """Cache the sizes of files by their checksum, unless they are already cached."""
+    cached = get_cached_archive_files(sizes)
+    cache_archive_files(
+        {
+            checksum: {'size': size, 'crc': None}
+            for checksum, size in sizes.items()
+            if checksum not in cached
+        }
+    )
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from django.core.files import File
+from django.db import transaction
+from rdoasis.algorithms.models import AlgorithmTask
+from rgd.models import ChecksumFile
+from rgd.utility import compute_hash
+
+from danesfield.core.models import AlgorithmTaskStage
+from danesfield.core.utils.files import stream_checksum_file
+
+# The stages of telesculptor/telesculptor.sh, in the order they are run
+TELESCULPTOR_STAGES = (
+    'track-features',
+    'init-cameras-landmarks',
+    'estimate-depth',
+    'fuse-depth',
+    'color-mesh',
+)
+
+# Relative to the output directory, see telesculptor/telesculptor.sh
+CHECKPOINTS_DIR = Path('results', '.checkpoints')
+
+
+def completed_stages(output_dir: Path) -> List[Tuple[str, float, List[str]]]:
+    """
+    Return the name, duration and result files of each stage completed in an output directory.
+
+    Result files are relative to the output directory.
+    """
+    stages = []
+    for name in TELESCULPTOR_STAGES:
+        done = output_dir / CHECKPOINTS_DIR / f'{name}.done'
+        if not done.is_file():
+            break
+        files = (output_dir / CHECKPOINTS_DIR / f'{name}.files').read_text().splitlines()
+        stages.append((name, float(done.read_text()), [file for file in files if file]))
+
+    return stages
+
+
+def _upload_result_file(output_dir: Path, name: str) -> ChecksumFile:
+    path = output_dir / name
+    with open(path, 'rb') as fd:
+        checksum = compute_hash(fd)
+        fd.seek(0)
+        checksum_file = ChecksumFile(name=name, checksum=checksum)
+        checksum_file.file.save(path.name, File(fd), save=False)
+
+    return checksum_file
+
+
+def save_stages(algorithm_task: AlgorithmTask, output_dir: Path) -> None:
+    """Record the stages completed by an AlgorithmTask, uploading their result files."""
+    recorded = set(algorithm_task.stages.values_list('name', flat=True))
+    for name, duration, files in completed_stages(output_dir):
+        if name in recorded:
+            continue
+
+        checksum_files = [_upload_result_file(output_dir, file) for file in files]
+        with transaction.atomic():
+            stage = AlgorithmTaskStage.objects.create(
+                algorithm_task=algorithm_task, name=name, duration=duration
+            )
+            stage.files.set(ChecksumFile.objects.bulk_create(checksum_files))
+
+
+def resumable_task(
+    algorithm_task: AlgorithmTask, fingerprint: Optional[str]
+) -> Optional[AlgorithmTask]:
+    """Return the latest failed run with the same fingerprint which completed any stages."""
+    if fingerprint is None:
+        return None
+
+    return (
+        AlgorithmTask.objects.filter(
+            algorithm=algorithm_task.algorithm,
+            status=AlgorithmTask.Status.FAILED,
+            fingerprint__fingerprint=fingerprint,
+            stages__isnull=False,
+        )
+        .exclude(pk=algorithm_task.pk)
+        .distinct()
+        .order_by('-created')
+        .first()
+    )
+
+
+def restore_stages(
+    algorithm_task: AlgorithmTask, previous: AlgorithmTask, output_dir: Path
+) -> List[str]:
+    """
+    Restore the results of the stages completed by a previous run into an output directory.
+
+    The stages are recorded as completed, so that the pipeline resumes from the first incomplete
+    stage. Returns the names of the restored stages.
+    """
+    stages = {stage.name: stage for stage in previous.stages.prefetch_related('files')}
+    checkpoints_dir = output_dir / CHECKPOINTS_DIR
+    checkpoints_dir.mkdir(parents=True, exist_ok=True)
+
+    restored = []
+    for name in TELESCULPTOR_STAGES:
+        stage = stages.get(name)
+        if stage is None:
+            break
+
+        # These are copied rather than linked from the input cache, as later stages may write them
+        files = list(stage.files.all())
+        for file in files:
+            stream_checksum_file(file, output_dir / file.name)
+        (checkpoints_dir / f'{name}.files').write_text(''.join(f'{file.name}\n' for file in files))
+        (checkpoints_dir / f'{name}.done').write_text(f'{stage.duration}\n')
+
+        AlgorithmTaskStage.objects.create(
+            algorithm_task=algorithm_task, name=name, duration=stage.duration, resumed=True
+        ).files.set(files)
+        restored.append(name)
+
+    return restored
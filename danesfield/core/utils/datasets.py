@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple, Type
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.core.cache import cache
+from django.db.models import IntegerField, Model, OuterRef, QuerySet, Subquery
+from rdoasis.algorithms.models import Dataset
+from rgd_3d.models import Mesh3D, Tiles3DMeta
+from rgd_fmv.models import FMVMeta
+from rgd_imagery.models import RasterMeta
+
+# The entities listed in the Dataset detail response, mapped to their model and
+# the lookup from that model to the ChecksumFile it was ingested from.
+DATASET_ENTITIES: Dict[str, Tuple[Type[Model], str]] = {
+    'rasters': (RasterMeta, 'parent_raster__image_set__images__file'),
+    'meshes': (Mesh3D, 'file'),
+    'tiles3d': (Tiles3DMeta, 'source__json_file'),
+    'fmvs': (FMVMeta, 'fmv_file__file'),
+}
+
+
+class Array(Subquery):
+    """Collect the values of a single-column subquery into an array."""
+
+    template = 'ARRAY(%(subquery)s)'
+    output_field = ArrayField(IntegerField())
+
+
+def annotate_dataset_entities(queryset: QuerySet) -> QuerySet:
+    """Annotate each Dataset with the pks of the entities ingested from its files."""
+    files = Dataset.files.through.objects.filter(dataset=OuterRef(OuterRef('pk'))).values(
+        'checksumfile'
+    )
+    return queryset.annotate(
+        **{
+            name: Array(model.objects.filter(**{f'{file_lookup}__in': files}).values('pk'))
+            for name, (model, file_lookup) in DATASET_ENTITIES.items()
+        }
+    )
+
+
+def datasets_containing(instance: Model, file_lookup: str) -> List[int]:
+    """Return the pks of every Dataset containing the file the given instance came from."""
+    files = type(instance).objects.filter(pk=instance.pk).values(file_lookup)
+    return list(Dataset.objects.filter(files__in=files).values_list('pk', flat=True).distinct())
+
+
+def dataset_detail_cache_key(dataset_pk: int) -> str:
+    return f'danesfield:dataset-detail:{dataset_pk}'
+
+
+def get_cached_dataset_detail(dataset_pk: int) -> dict | None:
+    return cache.get(dataset_detail_cache_key(dataset_pk))
+
+
+def cache_dataset_detail(dataset_pk: int, detail: dict) -> None:
+    cache.set(
+        dataset_detail_cache_key(dataset_pk),
+        detail,
+        timeout=settings.DANESFIELD_DATASET_DETAIL_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_dataset_detail_cache(dataset_pks: Iterable[int]) -> None:
+    cache.delete_many([dataset_detail_cache_key(pk) for pk in dataset_pks])
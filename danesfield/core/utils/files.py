@@ -0,0 +1,32 @@
+import os
+from pathlib import Path
+import shutil
+
+from rgd.models import ChecksumFile
+from rgd.models.file import FileSourceType
+from rgd.utility import safe_urlopen
+
+# Copy files in chunks of this many bytes, rather than reading them into memory
+CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def stream_checksum_file(file: ChecksumFile, path: Path) -> None:
+    """Stream the contents of a ChecksumFile to the given path, in chunks."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if file.type == FileSourceType.URL:
+        with safe_urlopen(file.url) as src, open(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    else:
+        with file.file.open('rb') as src, open(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Hard link a file, falling back to a copy if the paths are on different filesystems."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Optional
+
+from rdoasis.algorithms.models import Algorithm, AlgorithmTask, Dataset
+
+
+def algorithm_fingerprint(algorithm: Algorithm, dataset: Dataset, config: dict) -> Optional[str]:
+    """
+    Return a fingerprint of everything that determines the outputs of running an Algorithm.
+
+    This covers the Algorithm's image and command, the configuration it is run with, and the
+    names and checksums of the input Dataset's files. Returns None if any file has no checksum
+    yet, as its contents are then unknown.
+    """
+    files = list(dataset.files.order_by('name', 'checksum').values_list('name', 'checksum'))
+    if not all(checksum for _, checksum in files):
+        return None
+
+    payload = {
+        'image': algorithm.docker_image.image_id,
+        'entrypoint': algorithm.entrypoint,
+        'command': algorithm.command,
+        'config': config,
+        'files': files,
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def reusable_task(algorithm: Algorithm, fingerprint: Optional[str]) -> Optional[AlgorithmTask]:
+    """Return the latest succeeded AlgorithmTask with the given fingerprint, if any."""
+    if fingerprint is None:
+        return None
+
+    return (
+        AlgorithmTask.objects.filter(
+            algorithm=algorithm,
+            status=AlgorithmTask.Status.SUCCEEDED,
+            fingerprint__fingerprint=fingerprint,
+        )
+        .order_by('-created')
+        .first()
+    )
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Type
+
+from django.contrib.gis.db.models.functions import GeoFunc
+from django.contrib.gis.geos import GEOSGeometry
+from django.db import connection
+from django.db.models import F, QuerySet
+from rdoasis.algorithms.models import Dataset
+from rgd.models import SpatialEntry
+from rgd_3d.models import Mesh3DSpatial, Tiles3DMeta
+from rgd_fmv.models import FMVMeta
+from rgd_imagery.models import RasterMeta
+
+from danesfield.core.models import DatasetFootprint
+from danesfield.core.utils.datasets import datasets_containing
+
+# Every spatial entry that contributes to a Dataset footprint, mapped to the
+# lookup from that entry to the ChecksumFile it was derived from.
+FOOTPRINT_SOURCES: Dict[Type[SpatialEntry], str] = {
+    RasterMeta: 'parent_raster__image_set__images__file',
+    Tiles3DMeta: 'source__json_file',
+    Mesh3DSpatial: 'source__file',
+    FMVMeta: 'fmv_file__file',
+}
+
+
+def _footprint_entries() -> QuerySet:
+    """Return the (checksumfile_id, footprint) pairs of every spatial entry, from all sources."""
+    querysets = [
+        model.objects.annotate(checksumfile_id=F(file_lookup)).values(
+            'footprint', 'checksumfile_id'
+        )
+        for model, file_lookup in FOOTPRINT_SOURCES.items()
+    ]
+    return querysets[0].union(*querysets[1:], all=True)
+
+
+def compute_dataset_footprints(
+    dataset_pks: Optional[Iterable[int]] = None,
+) -> Dict[int, GEOSGeometry]:
+    """
+    Compute the convex hull of every spatial entry in each Dataset, in a single query.
+
+    If ``dataset_pks`` is None, the footprints of all Datasets are computed. Datasets that
+    don't contain any spatial entries are omitted from the result.
+    """
+    entries_sql, params = _footprint_entries().query.sql_with_params()
+
+    through = Dataset.files.through._meta
+    qn = connection.ops.quote_name
+    dataset_col = qn(through.get_field('dataset').column)
+    file_col = qn(through.get_field('checksumfile').column)
+
+    where = ''
+    if dataset_pks is not None:
+        where = f'WHERE files.{dataset_col} = ANY(%s)'
+        params = (*params, list(dataset_pks))
+
+    sql = f"""
+        SELECT files.{dataset_col}, ST_ConvexHull(ST_Collect(entries.footprint))
+        FROM ({entries_sql}) AS entries
+        INNER JOIN {qn(through.db_table)} AS files ON files.{file_col} = entries.checksumfile_id
+        {where}
+        GROUP BY files.{dataset_col}
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {dataset_pk: GEOSGeometry(hull) for dataset_pk, hull in cursor.fetchall()}
+
+
+def refresh_dataset_footprints(dataset_pks: Iterable[int]) -> None:
+    """Recompute and store the footprint of each of the given Datasets."""
+    dataset_pks = list(
+        Dataset.objects.filter(pk__in=list(dataset_pks)).values_list('pk', flat=True)
+    )
+    if not dataset_pks:
+        return
+
+    hulls = compute_dataset_footprints(dataset_pks)
+    DatasetFootprint.objects.bulk_create(
+        [
+            DatasetFootprint(dataset_id=dataset_pk, footprint=hulls.get(dataset_pk))
+            for dataset_pk in dataset_pks
+        ],
+        update_conflicts=True,
+        unique_fields=['dataset'],
+        update_fields=['footprint', 'modified'],
+    )
+
+
+def datasets_containing_entry(entry: SpatialEntry) -> List[int]:
+    """Return the pks of every Dataset containing the file the given spatial entry came from."""
+    return datasets_containing(entry, FOOTPRINT_SOURCES[type(entry)])
+
+
+class SimplifyPreserveTopology(GeoFunc):
+    """Simplify a geometry to the given tolerance, without making it invalid."""
+
+    function = 'ST_SimplifyPreserveTopology'
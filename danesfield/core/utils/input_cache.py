@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+from django.conf import settings
+from filelock import FileLock, Timeout
+from rgd.models import ChecksumFile
+from rgd.utility import compute_hash
+
+from danesfield.core.utils.files import link_or_copy, stream_checksum_file
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InputCacheStats:
+    hits: int = 0
+    misses: int = 0
+    bytes_saved: int = 0
+    bytes_downloaded: int = 0
+
+
+class InputCache:
+    """
+    A worker-local cache of ChecksumFile contents, addressed by checksum.
+
+    Cached files are linked into each task's input directory rather than downloaded again. When
+    the cache grows beyond ``max_size`` bytes, the least recently used files are evicted.
+
+    Each entry is guarded by a lock file beside it, and eviction by a lock file in the root, so
+    that every worker on this machine locks the same files.
+    """
+
+    def __init__(self, root: Path, max_size: int):
+        self.root = Path(root)
+        self.max_size = max_size
+
+    @classmethod
+    def from_settings(cls) -> InputCache:
+        return cls(settings.DANESFIELD_INPUT_CACHE_DIR, settings.DANESFIELD_INPUT_CACHE_SIZE)
+
+    def _entry_path(self, checksum: str) -> Path:
+        return self.root / checksum[:2] / checksum
+
+    @staticmethod
+    def _entry_lock(entry: Path) -> FileLock:
+        return FileLock(entry.with_suffix('.lock'))
+
+    def _fetch(self, file: ChecksumFile, entry: Path) -> bool:
+        """Download a file into the cache, returning False if its contents were unexpected."""
+        partial = entry.with_name(f'{entry.name}.partial')
+        stream_checksum_file(file, partial)
+        with open(partial, 'rb') as fd:
+            if compute_hash(fd) != file.checksum:
+                partial.unlink()
+                return False
+
+        # Cached files are shared by every task they are linked into, so must not be modified
+        partial.chmod(0o444)
+        partial.rename(entry)
+        return True
+
+    def stage(self, file: ChecksumFile, path: Path, stats: InputCacheStats) -> None:
+        """Place the contents of a ChecksumFile at the given path, using the cache if possible."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not file.checksum:
+            # The file can't be addressed until its checksum has been computed
+            stats.misses += 1
+            stream_checksum_file(file, path)
+            stats.bytes_downloaded += path.stat().st_size
+            return
+
+        entry = self._entry_path(file.checksum)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        with self._entry_lock(entry):
+            if entry.exists():
+                stats.hits += 1
+                stats.bytes_saved += entry.stat().st_size
+                # Mark this entry as recently used
+                os.utime(entry)
+            else:
+                stats.misses += 1
+                if not self._fetch(file, entry):
+                    logger.warning(f'Checksum of file ({file.pk}) is stale, not caching it.')
+                    stream_checksum_file(file, path)
+                    stats.bytes_downloaded += path.stat().st_size
+                    return
+                stats.bytes_downloaded += entry.stat().st_size
+
+            link_or_copy(entry, path)
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the cache is within its size limit."""
+        with FileLock(self.root / 'evict.lock'):
+            # Skip partial downloads and lock files, which have a suffix unlike cached entries
+            entries = [(entry, entry.stat()) for entry in self.root.glob('*/*') if not entry.suffix]
+            size = sum(stat.st_size for _, stat in entries)
+
+            for entry, stat in sorted(entries, key=lambda item: item[1].st_mtime):
+                if size <= self.max_size:
+                    break
+                # Skip entries that are currently being staged. Linked copies of an evicted
+                # entry remain valid, so in-use entries don't need any other protection.
+                try:
+                    with self._entry_lock(entry).acquire(timeout=0):
+                        entry.unlink()
+                except Timeout:
+                    continue
+                size -= stat.st_size
+
+
+def stage_checksumfiles(
+    files: Iterable[ChecksumFile], directory: Path, cache: InputCache
+) -> InputCacheStats:
+    """
+    Place a set of ChecksumFiles under a directory, using their ``name`` as relative path.
+
+    The cache is only trimmed to its size limit once every file has been placed.
+    """
+    stats = InputCacheStats()
+    names = set()
+    for file in files:
+        if file.name in names:
+            # Same behavior as `rgd.models.utils.yield_checksumfiles`
+            logger.error(
+                f'Duplicate `name` for ChecksumFile ({file.pk}: {file.name}). Overwriting...'
+            )
+        names.add(file.name)
+        cache.stage(file, Path(directory, file.name), stats)
+
+    cache.evict()
+    return stats
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Iterator, Optional
+
+from django.utils import timezone
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+logger = logging.getLogger(__name__)
+
+SPAN_SECONDS = Histogram(
+    'danesfield_task_span_seconds',
+    'Duration of each step of algorithm tasks.',
+    ['algorithm', 'span'],
+    buckets=(1, 5, 15, 60, 300, 900, 1800, 3600, 2 * 3600, 6 * 3600, 12 * 3600, float('inf')),
+)
+SPAN_BYTES = Counter(
+    'danesfield_task_span_bytes',
+    'Bytes downloaded or uploaded by each step of algorithm tasks.',
+    ['algorithm', 'span'],
+)
+CONTAINER_PEAK_MEMORY = Histogram(
+    'danesfield_task_container_peak_memory_bytes',
+    'Peak memory used by the containers of algorithm tasks.',
+    ['algorithm'],
+    buckets=tuple(2**i * 1024**3 for i in range(-2, 8)) + (float('inf'),),
+)
+
+
+@dataclass
+class Span:
+    """A timed step of an algorithm task, and the bytes it moved, if any."""
+
+    name: str
+    started: datetime
+    duration: float = 0.0
+    bytes: Optional[int] = None
+
+
+@contextmanager
+def timed(name: str) -> Iterator[Span]:
+    """Time the enclosed block, setting the duration of the span even if it fails."""
+    span = Span(name=name, started=timezone.now())
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.duration = time.perf_counter() - start
+
+
+def observe_span(algorithm: str, span: Span) -> None:
+    SPAN_SECONDS.labels(algorithm=algorithm, span=span.name).observe(span.duration)
+    if span.bytes:
+        SPAN_BYTES.labels(algorithm=algorithm, span=span.name).inc(span.bytes)
+
+
+def observe_peak_memory(algorithm: str, peak: int) -> None:
+    CONTAINER_PEAK_MEMORY.labels(algorithm=algorithm).observe(peak)
+
+
+def start_metrics_server(port: int) -> None:
+    """
+    Serve the metrics of this worker to Prometheus.
+
+    Tasks run in child processes of the worker, so if ``PROMETHEUS_MULTIPROC_DIR`` is set, the
+    metrics of every process are collected from there.
+    """
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+    logger.info(f'Serving Prometheus metrics on port {port}.')
+
+
+def task_containers(client, directory: Path) -> list:
+    """Return the running Docker containers which mount a task's directory, or its parent."""
+    # A task's input directory may be mounted, or the directory containing it
+    sources = {str(directory), str(directory.parent)}
+    return [
+        container
+        for container in client.containers.list()
+        if any(mount.get('Source') in sources for mount in container.attrs.get('Mounts', []))
+    ]
+
+
+class ContainerMemoryMonitor:
+    """
+    Track the peak memory of the Docker containers which mount a directory, or its parent.
+
+    The containers are polled in a background thread while the monitor is entered, as they are
+    started, and removed, by code outside of our control.
+    """
+
+    def __init__(self, directory: Path, interval: float = 2.0):
+        self.directory = directory
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def __enter__(self) -> ContainerMemoryMonitor:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _poll(self):
+        import docker
+        from docker.errors import DockerException
+
+        try:
+            client = docker.from_env()
+        except DockerException as e:
+            logger.warning(f'Not monitoring container memory: {e}')
+            return
+
+        while not self._stop.wait(self.interval):
+            try:
+                containers = task_containers(client, self.directory)
+            except DockerException:
+                continue
+            for container in containers:
+                try:
+                    memory = container.stats(stream=False).get('memory_stats', {})
+                except DockerException:
+                    # The container has finished since it was listed
+                    continue
+                # The maximum usage is only reported by cgroup v1
+                usage = memory.get('max_usage') or memory.get('usage')
+                if usage:
+                    self.peak = max(self.peak or 0, usage)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+# The width in pixels frames are reduced to before estimating their motion
+MOTION_WIDTH = 320
+
+_EARTH_RADIUS = 6371008.8
+
+
+@dataclass
+class KeyframeStats:
+    input_frames: int
+    selected_frames: int
+
+
+def _gray(frame, width: int):
+    import cv2
+    import numpy as np
+
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def count_frames(path: Path) -> int:
+    """Count the frames of a video by decoding it, as the frame count of its header may be wrong."""
+    import cv2
+
+    capture = cv2.VideoCapture(str(path))
+    frames = 0
+    while capture.grab():
+        frames += 1
+    capture.release()
+    return frames
+
+
+def stride_keyframes(frame_count: int, stride: int) -> List[int]:
+    """Select every ``stride``-th frame, and the last frame."""
+    frames = list(range(0, frame_count, stride))
+    if frames and frames[-1] != frame_count - 1:
+        frames.append(frame_count - 1)
+    return frames
+
+
+def motion_keyframes(path: Path, threshold: float) -> List[int]:
+    """
+    Select a frame whenever the view has moved by ``threshold`` of the frame width since the last.
+
+    The motion is the translation between two frames, estimated by phase correlation of reduced
+    grayscale frames. Frames while the camera hovers, which add no new views for reconstruction,
+    are skipped.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(str(path))
+    frames: List[int] = []
+    reference = window = None
+    index = 0
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        gray = _gray(frame, MOTION_WIDTH)
+        if reference is None:
+            window = cv2.createHanningWindow(gray.shape[::-1], cv2.CV_32F)
+            reference = gray
+            frames.append(index)
+        else:
+            (dx, dy), _ = cv2.phaseCorrelate(reference, gray, window)
+            if math.hypot(dx, dy) >= threshold * MOTION_WIDTH:
+                reference = gray
+                frames.append(index)
+        index += 1
+    capture.release()
+
+    if frames and frames[-1] != index - 1:
+        frames.append(index - 1)
+    return frames
+
+
+def _distance(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Return the great circle distance in meters between two (longitude, latitude) points."""
+    lon1, lat1, lon2, lat2 = (math.radians(v) for v in (*a, *b))
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * _EARTH_RADIUS * math.asin(math.sqrt(min(h, 1.0)))
+
+
+def metadata_keyframes(
+    frames: Sequence[int], positions: Sequence[Tuple[float, float]], min_distance: float
+) -> List[int]:
+    """
+    Select a frame whenever the sensor has moved ``min_distance`` meters since the last.
+
+    ``positions`` are the (longitude, latitude) of the sensor at each of ``frames``, as given by
+    the KLV metadata of the video.
+    """
+    selected: List[int] = []
+    last = None
+    for frame, position in zip(frames, positions):
+        if last is None or _distance(last, position) >= min_distance:
+            selected.append(frame)
+            last = position
+    if frames and selected[-1] != frames[-1]:
+        selected.append(frames[-1])
+    return selected
+
+
+def write_keyframes(path: Path, frames: Sequence[int], output_dir: Path) -> KeyframeStats:
+    """
+    Write the selected frames of a video as images, with a list of them for KWIVER.
+
+    ``frames.txt`` lists the images, relative to ``output_dir``, and ``keyframes.txt`` the frame
+    number in the video of each image. Frame numbers start at 1, as in KWIVER.
+    """
+    import cv2
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    wanted = set(frames)
+    images: List[str] = []
+    numbers: List[int] = []
+    capture = cv2.VideoCapture(str(path))
+    index = 0
+    while capture.grab():
+        if index in wanted:
+            _, frame = capture.retrieve()
+            image = output_dir / f'frame{index + 1:06d}.png'
+            cv2.imwrite(str(image), frame)
+            images.append(image.name)
+            numbers.append(index + 1)
+        index += 1
+    capture.release()
+
+    (output_dir / 'frames.txt').write_text(''.join(f'{image}\n' for image in images))
+    (output_dir / 'keyframes.txt').write_text(''.join(f'{number}\n' for number in numbers))
+    return KeyframeStats(input_frames=index, selected_frames=len(images))
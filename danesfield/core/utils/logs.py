@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import codecs
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+import threading
+from typing import Callable, List
+
+from django.db import connection
+from django.db.models.functions import Substr
+from rdoasis.algorithms.models import AlgorithmTask
+
+from danesfield.core.models import AlgorithmTaskLogChunk
+from danesfield.core.utils.instrumentation import task_containers
+
+logger = logging.getLogger(__name__)
+
+# The most log characters returned by one read
+MAX_LOG_READ = 1024**2
+
+
+@dataclass
+class LogSlice:
+    offset: int
+    content: str
+
+    @property
+    def next_offset(self) -> int:
+        return self.offset + len(self.content)
+
+
+def read_log(algorithm_task: AlgorithmTask, offset: int, limit: int = MAX_LOG_READ) -> LogSlice:
+    """
+    Read the log of an AlgorithmTask from an offset, in characters.
+
+    The log is read from its chunks, if it has any, so only the chunks after the offset are read.
+    Otherwise, only the requested part of the ``output_log`` is read from the database.
+    """
+    chunks = AlgorithmTaskLogChunk.objects.filter(algorithm_task=algorithm_task)
+    if not chunks.exists():
+        content = (
+            AlgorithmTask.objects.filter(pk=algorithm_task.pk)
+            .annotate(part=Substr('output_log', offset + 1, limit))
+            .values_list('part', flat=True)
+            .first()
+        )
+        return LogSlice(offset=offset, content=content or '')
+
+    # Start from the chunk containing the offset
+    first = chunks.filter(start__lte=offset).order_by('-index').values_list('index', flat=True)
+    parts: List[str] = []
+    size = 0
+    for start, content in chunks.filter(index__gte=first.first() or 0).values_list(
+        'start', 'content'
+    ):
+        part = content[max(0, offset - start) :]
+        parts.append(part[: limit - size])
+        size += len(parts[-1])
+        if size >= limit:
+            break
+    return LogSlice(offset=offset, content=''.join(parts))
+
+
+class LogWriter:
+    """Append to the log chunks of an AlgorithmTask."""
+
+    def __init__(self, algorithm_task: AlgorithmTask):
+        self.algorithm_task = algorithm_task
+        last = (
+            AlgorithmTaskLogChunk.objects.filter(algorithm_task=algorithm_task)
+            .order_by('-index')
+            .first()
+        )
+        self.index = last.index + 1 if last is not None else 0
+        self.start = last.start + len(last.content) if last is not None else 0
+
+    def append(self, text: str) -> None:
+        if not text:
+            return
+        AlgorithmTaskLogChunk.objects.create(
+            algorithm_task=self.algorithm_task, index=self.index, start=self.start, content=text
+        )
+        self.index += 1
+        self.start += len(text)
+
+
+class ContainerLogFollower:
+    """
+    Follow the log of the Docker container which mounts a directory, while it runs.
+
+    New output is passed to ``on_text`` at most every ``interval`` seconds, in a background
+    thread, so the log can be read while the container is still running.
+    """
+
+    def __init__(self, directory: Path, on_text: Callable[[str], None], interval: float = 1.0):
+        self.directory = directory
+        self.on_text = on_text
+        self.interval = interval
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+
+    def __enter__(self) -> ContainerLogFollower:
+        self._reader.start()
+        self._flusher.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        # The log stream ends once the container has stopped
+        self._reader.join(timeout=10)
+        self._flusher.join()
+        self._flush()
+
+    def _flush(self):
+        with self._lock:
+            text = ''.join(self._buffer)
+            self._buffer.clear()
+        try:
+            self.on_text(text)
+        except Exception:
+            logger.exception('Failed to store container log.')
+
+    def _flush_periodically(self):
+        try:
+            while not self._stop.wait(self.interval):
+                self._flush()
+        finally:
+            connection.close()
+
+    def _container(self, client):
+        from docker.errors import DockerException
+
+        while not self._stop.is_set():
+            try:
+                containers = task_containers(client, self.directory)
+            except DockerException:
+                containers = []
+            if containers:
+                return containers[0]
+            self._stop.wait(self.interval)
+        return None
+
+    def _read(self):
+        import docker
+        from docker.errors import DockerException
+
+        try:
+            client = docker.from_env()
+        except DockerException as e:
+            logger.warning(f'Not following container log: {e}')
+            return
+
+        container = self._container(client)
+        if container is None:
+            return
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            for data in container.logs(stream=True, follow=True):
+                text = decoder.decode(data)
+                with self._lock:
+                    self._buffer.append(text)
+        except DockerException:
+            # The container was removed
+            pass
+
+
+def task_progress(algorithm_task: AlgorithmTask) -> dict:
+    """Return the status of an AlgorithmTask, and the steps and stages it has completed."""
+    return {
+        'status': algorithm_task.status,
+        'spans': [
+            {'name': name, 'duration': duration}
+            for name, duration in algorithm_task.spans.values_list('name', 'duration')
+        ],
+        'stages': list(algorithm_task.stages.values_list('name', flat=True)),
+    }
+
+
+def task_finished(algorithm_task: AlgorithmTask) -> bool:
+    return algorithm_task.status in (AlgorithmTask.Status.SUCCEEDED, AlgorithmTask.Status.FAILED)
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# WGS84 ellipsoid
+_SEMI_MAJOR_AXIS = 6378137.0
+_ECCENTRICITY_SQUARED = 6.69437999014e-3
+
+
+def read_geo_origin(path: Path) -> Tuple[float, float, float]:
+    """Read the latitude, longitude and altitude of a geo_origin.txt written by TeleSculptor."""
+    lat, lon, alt = (float(value) for value in path.read_text().split()[:3])
+    return lat, lon, alt
+
+
+def enu_to_ecef(lat: float, lon: float, alt: float) -> List[float]:
+    """
+    Return the transform from local coordinates to Earth-centered Earth-fixed coordinates.
+
+    The local coordinates are east-north-up, in meters, about a geodetic origin. The matrix is
+    4x4, in column-major order, as 3D Tiles expects.
+    """
+    phi, lam = math.radians(lat), math.radians(lon)
+    n = _SEMI_MAJOR_AXIS / math.sqrt(1 - _ECCENTRICITY_SQUARED * math.sin(phi) ** 2)
+    origin = (
+        (n + alt) * math.cos(phi) * math.cos(lam),
+        (n + alt) * math.cos(phi) * math.sin(lam),
+        (n * (1 - _ECCENTRICITY_SQUARED) + alt) * math.sin(phi),
+    )
+    east = (-math.sin(lam), math.cos(lam), 0.0)
+    north = (-math.sin(phi) * math.cos(lam), -math.sin(phi) * math.sin(lam), math.cos(phi))
+    up = (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+    return [*east, 0.0, *north, 0.0, *up, 0.0, *origin, 1.0]
+
+
+def _geodetic(wkt: str, x: float, y: float) -> Tuple[float, float]:
+    """Return the latitude and longitude of a point in the coordinate system ``wkt``."""
+    from osgeo import osr
+
+    source = osr.SpatialReference()
+    source.ImportFromWkt(wkt)
+    target = osr.SpatialReference()
+    target.ImportFromEPSG(4326)
+    target.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    lon, lat, _ = osr.CoordinateTransformation(source, target).TransformPoint(x, y)
+    return lat, lon
+
+
+def projected_to_ecef(wkt: str, x: float, y: float) -> List[float]:
+    """
+    Return the transform from a projected coordinate system to Earth-centered Earth-fixed.
+
+    The transform is the east-north-up frame at (x, y, 0), after rotating grid north to true north
+    and scaling by the scale factor of the projection there. It is exact at (x, y) and close
+    within the few kilometers of a model, which is enough to place the model on the globe.
+    Elevations are kept as heights above the ellipsoid.
+    """
+    # Find grid north, and the scale of the projection, from a point a little to the north
+    step = 100.0
+    lat, lon = _geodetic(wkt, x, y)
+    enu = np.array(enu_to_ecef(lat, lon, 0)).reshape(4, 4).T
+    offset = np.array(enu_to_ecef(*_geodetic(wkt, x, y + step), 0)[12:15]) - enu[:3, 3]
+    east, north = float(offset @ enu[:3, 0]), float(offset @ enu[:3, 1])
+    convergence = math.atan2(east, north)
+    scale = math.hypot(east, north) / step
+
+    cos, sin = scale * math.cos(convergence), scale * math.sin(convergence)
+    to_enu = np.array(
+        [
+            [cos, sin, 0, -cos * x - sin * y],
+            [-sin, cos, 0, sin * x - cos * y],
+            [0, 0, 1, 0],
+            [0, 0, 0, 1],
+        ]
+    )
+    return (enu @ to_enu).T.flatten().tolist()
+
+
+def _pad(data: bytes, alignment: int, fill: bytes = b'\0') -> bytes:
+    return data + fill * (-len(data) % alignment)
+
+
+def _glb(
+    positions: np.ndarray, indices: np.ndarray, colors: Optional[np.ndarray], center: np.ndarray
+) -> bytes:
+    """
+    Encode a triangle mesh as binary glTF.
+
+    Positions are stored relative to ``center``, which is the translation of the mesh's node, so
+    they keep their precision as 32-bit floats. glTF is y-up, while 3D Tiles are z-up.
+    """
+    to_y_up = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]], dtype=float)
+    local = ((positions - center) @ to_y_up.T).astype(np.float32)
+    translation = (to_y_up @ center).tolist()
+
+    buffers = [local.tobytes(), indices.astype(np.uint32).tobytes()]
+    attributes = {'POSITION': 0}
+    accessors = [
+        {
+            'bufferView': 0,
+            'componentType': 5126,
+            'count': len(local),
+            'type': 'VEC3',
+            'min': local.min(axis=0).tolist(),
+            'max': local.max(axis=0).tolist(),
+        },
+        {'bufferView': 1, 'componentType': 5125, 'count': int(indices.size), 'type': 'SCALAR'},
+    ]
+    if colors is not None:
+        buffers.append(colors[:, :3].astype(np.uint8).tobytes())
+        attributes['COLOR_0'] = 2
+        accessors.append(
+            {
+                'bufferView': 2,
+                'componentType': 5121,
+                'normalized': True,
+                'count': len(colors),
+                'type': 'VEC3',
+            }
+        )
+
+    views = []
+    offset = 0
+    for i, data in enumerate(buffers):
+        # Indices are element array buffers, every other attribute is an array buffer
+        target = 34963 if i == 1 else 34962
+        views.append({'buffer': 0, 'byteOffset': offset, 'byteLength': len(data), 'target': target})
+        offset += len(_pad(data, 4))
+    binary = b''.join(_pad(data, 4) for data in buffers)
+
+    gltf = {
+        'asset': {'version': '2.0'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0, 'translation': translation}],
+        'meshes': [
+            {'primitives': [{'attributes': attributes, 'indices': 1, 'mode': 4, 'material': 0}]}
+        ],
+        'materials': [{'pbrMetallicRoughness': {'metallicFactor': 0.0, 'roughnessFactor': 1.0}}],
+        'buffers': [{'byteLength': len(binary)}],
+        'bufferViews': views,
+        'accessors': accessors,
+    }
+    json_chunk = _pad(json.dumps(gltf).encode(), 4, b' ')
+    return b''.join(
+        [
+            struct.pack('<4sII', b'glTF', 2, 12 + 8 + len(json_chunk) + 8 + len(binary)),
+            struct.pack('<I4s', len(json_chunk), b'JSON'),
+            json_chunk,
+            struct.pack('<I4s', len(binary), b'BIN\0'),
+            binary,
+        ]
+    )
+
+
+def _b3dm(glb: bytes) -> bytes:
+    """Wrap binary glTF as Batched 3D Model tile content, with no batch table."""
+    header_length = 28
+    # The glTF must start on an 8-byte boundary
+    feature_table = json.dumps({'BATCH_LENGTH': 0}).encode()
+    feature_table += b' ' * (-(header_length + len(feature_table)) % 8)
+    return (
+        struct.pack(
+            '<4sIIIIII',
+            b'b3dm',
+            1,
+            header_length + len(feature_table) + len(glb),
+            len(feature_table),
+            0,
+            0,
+            0,
+        )
+        + feature_table
+        + glb
+    )
+
+
+def _colors(mesh) -> Optional[np.ndarray]:
+    """Return the per-point RGB colors of a mesh, if it has any."""
+    for name in ('RGB', 'RGBA', 'Colors'):
+        if name in mesh.point_data:
+            return np.asarray(mesh.point_data[name])
+    scalars = mesh.point_data.active_scalars
+    if scalars is not None and scalars.ndim == 2 and scalars.shape[1] in (3, 4):
+        if scalars.dtype == np.uint8:
+            return np.asarray(scalars)
+    return None
+
+
+def _box(bounds: Tuple[float, ...]) -> List[float]:
+    """Return a 3D Tiles bounding box from (min_x, max_x, min_y, max_y, min_z, max_z)."""
+    min_x, max_x, min_y, max_y, min_z, max_z = bounds
+    # Flat or degenerate tiles still need a non-zero extent to be visible
+    half = [max((max_x - min_x) / 2, 0.01), max((max_y - min_y) / 2, 0.01)]
+    half.append(max((max_z - min_z) / 2, 0.01))
+    return [
+        (min_x + max_x) / 2,
+        (min_y + max_y) / 2,
+        (min_z + max_z) / 2,
+        half[0],
+        0,
+        0,
+        0,
+        half[1],
+        0,
+        0,
+        0,
+        half[2],
+    ]
+
+
+def mesh_to_tileset(
+    path: Path,
+    output_dir: Path,
+    levels: int,
+    max_faces_per_tile: int,
+    transform: Optional[List[float]] = None,
+    wkt: Optional[str] = None,
+) -> Path:
+    """
+    Convert a mesh into a 3D Tiles tileset with a quadtree of levels of detail.
+
+    The finest level is the full resolution mesh, split into 4^(levels - 1) tiles. Each coarser
+    level merges four tiles into one, decimated to at most ``max_faces_per_tile`` faces, so a
+    viewer only loads full resolution geometry for the tiles close to it. ``transform`` places
+    the mesh's coordinates on the globe. Otherwise, if the mesh is in the projected coordinate
+    system ``wkt``, the transform is derived from it about the center of the mesh. Returns the
+    path of the tileset.json.
+    """
+    import pyvista
+
+    mesh = pyvista.read(str(path))
+    if not isinstance(mesh, pyvista.PolyData):
+        mesh = mesh.extract_surface()
+    mesh = mesh.triangulate().clean()
+    centers = np.asarray(mesh.cell_centers().points)
+    min_x, max_x, min_y, max_y, _, _ = mesh.bounds
+    diagonal = float(np.linalg.norm(np.subtract(mesh.bounds[1::2], mesh.bounds[::2])))
+    if transform is None and wkt is not None:
+        transform = projected_to_ecef(wkt, (min_x + max_x) / 2, (min_y + max_y) / 2)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    def build(level: int, x: int, y: int) -> Optional[dict]:
+        cells = 2**level
+        width, height = (max_x - min_x) / cells, (max_y - min_y) / cells
+        tile_min_x, tile_min_y = min_x + x * width, min_y + y * height
+        in_tile = (
+            (centers[:, 0] >= tile_min_x)
+            & (centers[:, 1] >= tile_min_y)
+            & ((centers[:, 0] < tile_min_x + width) | (x == cells - 1))
+            & ((centers[:, 1] < tile_min_y + height) | (y == cells - 1))
+        )
+        cell_ids = np.flatnonzero(in_tile)
+        if not len(cell_ids):
+            return None
+
+        tile_mesh = mesh.extract_cells(cell_ids).extract_surface().triangulate()
+        bounds = tile_mesh.bounds
+        leaf = level == levels - 1
+        if not leaf and tile_mesh.n_cells > max_faces_per_tile:
+            # Unlike quadric decimation, this keeps the colors of the remaining points
+            tile_mesh = tile_mesh.decimate_pro(1 - max_faces_per_tile / tile_mesh.n_cells)
+
+        name = f'{level}/{x}_{y}.b3dm'
+        positions = np.asarray(tile_mesh.points, dtype=float)
+        faces = np.asarray(tile_mesh.faces).reshape(-1, 4)[:, 1:]
+        content = _b3dm(_glb(positions, faces, _colors(tile_mesh), positions.mean(axis=0)))
+        (output_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (output_dir / name).write_bytes(content)
+
+        children = []
+        if not leaf:
+            for child_x, child_y in ((0, 0), (1, 0), (0, 1), (1, 1)):
+                child = build(level + 1, 2 * x + child_x, 2 * y + child_y)
+                if child is not None:
+                    children.append(child)
+
+        tile = {
+            'boundingVolume': {'box': _box(bounds)},
+            # Half of the size of the tile is roughly the largest error of its decimation
+            'geometricError': 0.0 if leaf else diagonal / 2 ** (level + 1),
+            'content': {'uri': name},
+        }
+        if children:
+            tile['children'] = children
+        return tile
+
+    root = build(0, 0, 0)
+    root['refine'] = 'REPLACE'
+    if transform is not None:
+        root['transform'] = transform
+    tileset = {
+        'asset': {'version': '1.0'},
+        'geometricError': diagonal,
+        'root': root,
+    }
+    tileset_path = output_dir / 'tileset.json'
+    tileset_path.write_text(json.dumps(tileset))
+    return tileset_path
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import zipfile
+
+from django.conf import settings
+from filelock import FileLock
+import requests
+from rgd.utility import compute_hash
+
+from danesfield.core.utils.files import CHUNK_SIZE, link_or_copy
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class ModelStore:
+    """
+    A worker-local store of the model files needed by Danesfield.
+
+    Each version of the models is downloaded once, extracted next to its final location, and
+    renamed into place only once complete, along with a manifest of the checksums of its files.
+    Installed files are read-only, and are linked into each task's input directory. Installing and
+    linking a version hold a lock file beside it, shared by every worker on this machine, so that
+    an installation isn't replaced while it is being linked from.
+
+    If ``checksum`` is given, the downloaded archive must have that sha512 checksum, otherwise it
+    is rejected before being extracted.
+    """
+
+    def __init__(self, root: Path, url: str, version: str, checksum: Optional[str] = None):
+        self.root = Path(root)
+        self.url = url
+        self.version = version
+        self.checksum = checksum.lower() if checksum else None
+
+    @classmethod
+    def from_settings(cls) -> ModelStore:
+        return cls(
+            settings.DANESFIELD_MODELS_DIR,
+            settings.DANESFIELD_MODELS_URL,
+            settings.DANESFIELD_MODELS_VERSION,
+            settings.DANESFIELD_MODELS_CHECKSUM,
+        )
+
+    @property
+    def path(self) -> Path:
+        return self.root / self.version
+
+    @property
+    def lock_path(self) -> Path:
+        return self.root / f'{self.version}.lock'
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self.path / MANIFEST_NAME) as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return None
+
+    def is_installed(self) -> bool:
+        """Check that this version is installed, without computing the checksum of every file."""
+        manifest = self._read_manifest()
+        if manifest is None or manifest.get('version') != self.version:
+            return False
+        # An installation from an archive other than the expected one is replaced
+        if self.checksum is not None and manifest.get('archive_checksum') != self.checksum:
+            return False
+
+        for name, entry in manifest['files'].items():
+            path = self.path / name
+            if not path.is_file() or path.stat().st_size != entry['size']:
+                return False
+
+        return True
+
+    def verify(self) -> bool:
+        """Check that this version is installed, and that every file matches its checksum."""
+        if not self.is_installed():
+            return False
+
+        for name, entry in self._read_manifest()['files'].items():
+            with open(self.path / name, 'rb') as fd:
+                if compute_hash(fd) != entry['checksum']:
+                    return False
+
+        return True
+
+    def _download(self, archive: Path) -> None:
+        parsed = urlparse(self.url)
+        if parsed.scheme == 'file':
+            shutil.copyfile(url2pathname(parsed.path), archive)
+            return
+
+        with requests.get(self.url, stream=True) as r:
+            r.raise_for_status()
+            with open(archive, 'wb') as f:
+                shutil.copyfileobj(r.raw, f, CHUNK_SIZE)
+
+    def ensure(self) -> Path:
+        """Install this version of the models if needed, returning the directory it is in."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Concurrent workers wait here for the first one to finish installing
+        with FileLock(self.lock_path):
+            return self._install()
+
+    def _install(self) -> Path:
+        """Install this version of the models, unless it already is, while holding the lock."""
+        if self.is_installed():
+            return self.path
+
+        logger.info(f'Downloading model files ({self.version}). This may take a while...')
+        with tempfile.TemporaryDirectory(dir=self.root) as tmp_dir:
+            archive = Path(tmp_dir) / 'models.zip'
+            self._download(archive)
+            with open(archive, 'rb') as fd:
+                archive_checksum = compute_hash(fd)
+            if self.checksum is None:
+                logger.warning(
+                    'DANESFIELD_MODELS_CHECKSUM is not set, so the downloaded model archive '
+                    'is not verified.'
+                )
+            elif archive_checksum != self.checksum:
+                raise ValueError(
+                    f'The model archive downloaded from {self.url} has checksum '
+                    f'{archive_checksum}, not the expected {self.checksum}.'
+                )
+
+            extracted = Path(tmp_dir) / 'models'
+            with zipfile.ZipFile(archive) as z:
+                z.extractall(extracted)
+            archive.unlink()
+
+            files: Dict[str, dict] = {}
+            for path in sorted(p for p in extracted.rglob('*') if p.is_file()):
+                with open(path, 'rb') as fd:
+                    checksum = compute_hash(fd)
+                files[str(path.relative_to(extracted))] = {
+                    'checksum': checksum,
+                    'size': path.stat().st_size,
+                }
+                path.chmod(0o444)
+
+            # The manifest is written last, so its presence marks a complete installation
+            with open(extracted / MANIFEST_NAME, 'w') as fd:
+                json.dump(
+                    {
+                        'version': self.version,
+                        'archive_checksum': archive_checksum,
+                        'files': files,
+                    },
+                    fd,
+                    indent=2,
+                )
+
+            # Replace any partial or corrupt installation of this version
+            if self.path.exists():
+                shutil.rmtree(self.path)
+            os.rename(extracted, self.path)
+
+        return self.path
+
+    def link_into(self, directory: Path) -> None:
+        """Link the installed model files into a directory, keeping their relative paths."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        # The installation can't be replaced by another worker while it is linked from
+        with FileLock(self.lock_path):
+            path = self._install()
+            for name in self._read_manifest()['files']:
+                link_or_copy(path / name, Path(directory, name))
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# The extensions of point cloud files, uncompressed and compressed
+POINT_CLOUD_SUFFIXES = ('.las', '.laz')
+
+# Matches the names of point cloud files, in database lookups
+POINT_CLOUD_REGEX = r'\.la[sz]$'
+
+# How many points are read at once while processing a point cloud
+CHUNK_POINTS = 1_000_000
+
+Ring = Sequence[Tuple[float, float]]
+
+
+@dataclass
+class PointCloudStats:
+    input_points: int = 0
+    output_points: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+
+
+def is_point_cloud(path: Path) -> bool:
+    return path.suffix.lower() in POINT_CLOUD_SUFFIXES
+
+
+def point_cloud_wkt(path: Path) -> Optional[str]:
+    """Return the WKT of the coordinate system of a point cloud, if it records one."""
+    import laspy
+
+    with laspy.open(path) as reader:
+        crs = reader.header.parse_crs()
+    return crs.to_wkt() if crs is not None else None
+
+
+def points_in_polygon(x: np.ndarray, y: np.ndarray, rings: List[Ring]) -> np.ndarray:
+    """
+    Return a mask of the points within a polygon, given as its exterior and interior rings.
+
+    This uses the even-odd rule, so points within holes are excluded.
+    """
+    inside = np.zeros(len(x), dtype=bool)
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)
+        for (x1, y1), (x2, y2) in zip(ring, np.roll(ring, -1, axis=0)):
+            if y1 == y2:
+                continue
+            crosses = (y1 > y) != (y2 > y)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                intersect_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (x < intersect_x)
+    return inside
+
+
+class VoxelFilter:
+    """
+    Keep only the first point seen within each cubic voxel of a given size.
+
+    Points are passed in chunks, and the voxels occupied by earlier chunks are remembered, so
+    memory use grows with the output rather than the input.
+    """
+
+    def __init__(self, size: float, mins: Sequence[float], maxs: Sequence[float]):
+        self.size = size
+        self.origin = np.asarray(mins, dtype=float)
+        self.shape = (
+            np.floor((np.asarray(maxs, dtype=float) - self.origin) / size).astype(np.int64) + 1
+        )
+        self.occupied = np.empty(0, dtype=np.int64)
+
+    def __call__(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Return the indices of the points of a chunk to keep, in their original order."""
+        cells = np.floor((np.stack([x, y, z], axis=1) - self.origin) / self.size).astype(np.int64)
+        cells = np.clip(cells, 0, self.shape - 1)
+        keys = (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+
+        keys, first = np.unique(keys, return_index=True)
+        new = ~np.isin(keys, self.occupied, assume_unique=True)
+        self.occupied = np.union1d(self.occupied, keys[new])
+        return np.sort(first[new])
+
+
+def preprocess_point_cloud(
+    path: Path, output_path: Path, voxel_size: float, aoi: Optional[List[Ring]] = None
+) -> PointCloudStats:
+    """
+    Decimate a point cloud to one point per voxel, optionally cropping it to a polygon.
+
+    The point cloud is streamed in chunks, so it is never fully loaded into memory. The output
+    is compressed if ``output_path`` ends with ".laz". The ``aoi`` is in the coordinates of the
+    point cloud.
+    """
+    import laspy
+
+    stats = PointCloudStats(input_bytes=path.stat().st_size)
+    with laspy.open(path) as reader:
+        header = reader.header
+        voxel_filter = VoxelFilter(voxel_size, header.mins, header.maxs)
+        with laspy.open(
+            output_path,
+            mode='w',
+            header=copy.deepcopy(header),
+            do_compress=output_path.suffix.lower() == '.laz',
+        ) as writer:
+            for points in reader.chunk_iterator(CHUNK_POINTS):
+                stats.input_points += len(points)
+                x = np.asarray(points.x)
+                y = np.asarray(points.y)
+                z = np.asarray(points.z)
+                if aoi is not None:
+                    mask = points_in_polygon(x, y, aoi)
+                    points, x, y, z = points[mask], x[mask], y[mask], z[mask]
+
+                keep = voxel_filter(x, y, z)
+                if len(keep):
+                    writer.write_points(points[keep])
+                    stats.output_points += len(keep)
+
+    stats.output_bytes = output_path.stat().st_size
+    return stats
+
+
+def merge_point_clouds(paths: List[Path], output_path: Path) -> int:
+    """
+    Merge point clouds in the same coordinate system into one, returning its number of points.
+
+    The points are streamed in chunks, and converted into the point format of the first point
+    cloud. Dimensions which it doesn't have are dropped.
+    """
+    import laspy
+
+    headers = []
+    for path in paths:
+        with laspy.open(path) as reader:
+            headers.append(reader.header)
+    wkts = {str(header.parse_crs()) for header in headers}
+    if len(wkts) > 1:
+        raise ValueError('Point clouds in different coordinate systems cannot be merged.')
+
+    header = copy.deepcopy(headers[0])
+    header.scales = np.min([h.scales for h in headers], axis=0)
+    header.offsets = np.min([h.mins for h in headers], axis=0)
+    dimensions = set(header.point_format.dimension_names) - {'X', 'Y', 'Z'}
+
+    points = 0
+    with laspy.open(
+        output_path,
+        mode='w',
+        header=header,
+        do_compress=output_path.suffix.lower() == '.laz',
+    ) as writer:
+        for path in paths:
+            with laspy.open(path) as reader:
+                for chunk in reader.chunk_iterator(CHUNK_POINTS):
+                    record = laspy.ScaleAwarePointRecord.zeros(len(chunk), header=header)
+                    record.x, record.y, record.z = chunk.x, chunk.y, chunk.z
+                    for name in dimensions & set(chunk.point_format.dimension_names):
+                        record[name] = chunk[name]
+                    writer.write_points(record)
+                    points += len(chunk)
+
+    return points
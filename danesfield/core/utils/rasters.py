@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+# The extensions of rasters which are converted to Cloud Optimized GeoTIFFs
+GEOTIFF_SUFFIXES = ('.tif', '.tiff')
+
+# The size in pixels of the internal tiles of converted rasters
+COG_BLOCK_SIZE = 512
+
+
+def is_geotiff(name: str) -> bool:
+    return Path(name).suffix.lower() in GEOTIFF_SUFFIXES
+
+
+def is_cog(path: Path) -> bool:
+    """Return whether a raster is already a Cloud Optimized GeoTIFF."""
+    from osgeo import gdal
+
+    gdal.UseExceptions()
+    dataset = gdal.Open(str(path))
+    return dataset.GetMetadataItem('LAYOUT', 'IMAGE_STRUCTURE') == 'COG'
+
+
+def raster_wkt(path: Path) -> Optional[str]:
+    """Return the WKT of the coordinate system of a raster, if it has one."""
+    from osgeo import gdal
+
+    gdal.UseExceptions()
+    return gdal.Open(str(path)).GetProjection() or None
+
+
+def convert_to_cog(path: Path, output_path: Path) -> None:
+    """
+    Convert a raster into a Cloud Optimized GeoTIFF, with internal tiling and overviews.
+
+    Reading a region at any zoom level then only reads the tiles of the nearest overview, rather
+    than every full-resolution strip which covers the region.
+    """
+    from osgeo import gdal
+
+    gdal.UseExceptions()
+    gdal.Translate(
+        str(output_path),
+        str(path),
+        format='COG',
+        creationOptions=[
+            f'BLOCKSIZE={COG_BLOCK_SIZE}',
+            'COMPRESS=DEFLATE',
+            'PREDICTOR=YES',
+            'OVERVIEWS=IGNORE_EXISTING',
+            'RESAMPLING=AVERAGE',
+            'NUM_THREADS=ALL_CPUS',
+        ],
+    )
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+import json
+import logging
+import os
+from pathlib import Path
+import subprocess
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from filelock import FileLock
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GPUDevice:
+    index: int
+    # In MiB
+    memory: int
+
+
+class GPUInventory(ABC):
+    """The GPUs available on this worker."""
+
+    @abstractmethod
+    def devices(self) -> List[GPUDevice]:
+        pass
+
+
+class NvidiaSmiInventory(GPUInventory):
+    def devices(self) -> List[GPUDevice]:
+        output = subprocess.run(
+            ['nvidia-smi', '--query-gpu=index,memory.total', '--format=csv,noheader,nounits'],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        return [
+            GPUDevice(index=int(index), memory=int(memory))
+            for index, memory in (line.split(',') for line in output.splitlines() if line)
+        ]
+
+
+class FakeGPUInventory(GPUInventory):
+    """A fixed set of GPUs, for testing or running on a machine without any."""
+
+    def __init__(self, memory: List[int]):
+        self._devices = [GPUDevice(index=i, memory=m) for i, m in enumerate(memory)]
+
+    def devices(self) -> List[GPUDevice]:
+        return self._devices
+
+
+def inventory_from_settings() -> GPUInventory:
+    """
+    Return the GPU inventory configured by ``DANESFIELD_GPU_INVENTORY``.
+
+    This is either "nvidia-smi", or "fake:" followed by the comma-separated memory of each fake
+    GPU in MiB, e.g. "fake:16384,16384".
+    """
+    inventory: str = settings.DANESFIELD_GPU_INVENTORY
+    if inventory.startswith('fake:'):
+        return FakeGPUInventory([int(memory) for memory in inventory[5:].split(',') if memory])
+    return NvidiaSmiInventory()
+
+
+def estimate_gpu_memory(algorithm_name: str, input_size: int) -> int:
+    """Estimate the GPU memory, in MiB, needed by an algorithm for inputs of the given bytes."""
+    base, per_gib = settings.DANESFIELD_GPU_MEMORY_ESTIMATES.get(algorithm_name, (0, 0))
+    return int(base + per_gib * input_size / 1024**3)
+
+
+@dataclass
+class GPUJob:
+    id: str
+    # The estimated GPU memory needed, in MiB
+    memory: int
+    priority: int = 0
+    # Jobs of owners with fewer running jobs are admitted first
+    owner: str = ''
+
+
+class GPUScheduler:
+    """
+    Admission control for the GPU jobs of every worker process on this machine.
+
+    A job is admitted onto a GPU with a free slot and enough free memory for its estimate. Waiting
+    jobs are ranked by priority, then by how many jobs their owner is already running, then by
+    arrival. Capacity is reserved for higher ranked jobs, but a lower ranked job may run on
+    capacity that no higher ranked job fits into.
+
+    The state is shared between processes through a file, guarded by a lock file beside it, so
+    that every worker on this machine locks the same file.
+    """
+
+    def __init__(
+        self,
+        inventory: GPUInventory,
+        state_dir: Path,
+        slots_per_device: int = 1,
+        poll_interval: float = 5,
+    ):
+        self.inventory = inventory
+        self.state_path = Path(state_dir) / 'gpu_scheduler.json'
+        self.lock_path = self.state_path.with_suffix('.lock')
+        self.slots_per_device = slots_per_device
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def from_settings(cls) -> GPUScheduler:
+        return cls(
+            inventory_from_settings(),
+            settings.DANESFIELD_GPU_SCHEDULER_DIR,
+            settings.DANESFIELD_GPU_SLOTS_PER_DEVICE,
+        )
+
+    def _load(self) -> dict:
+        try:
+            with open(self.state_path) as fd:
+                state = json.load(fd)
+        except (OSError, ValueError):
+            state = {'sequence': 0, 'running': [], 'waiting': []}
+
+        # Forget the jobs of processes which have died without releasing them
+        for key in ('running', 'waiting'):
+            state[key] = [entry for entry in state[key] if _pid_alive(entry['pid'])]
+        return state
+
+    def _save(self, state: dict) -> None:
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as fd:
+            json.dump(state, fd)
+        tmp_path.replace(self.state_path)
+
+    def try_admit(self, job: GPUJob) -> Optional[int]:
+        """
+        Admit a job if it is its turn and resources are free, returning the index of its GPU.
+
+        Otherwise, the job is recorded as waiting, and None is returned.
+        """
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with FileLock(self.lock_path):
+            state = self._load()
+            for entry in state['running']:
+                if entry['id'] == job.id:
+                    return entry['device']
+
+            if not any(entry['id'] == job.id for entry in state['waiting']):
+                state['sequence'] += 1
+                state['waiting'].append(
+                    {**asdict(job), 'pid': os.getpid(), 'sequence': state['sequence']}
+                )
+
+            devices = self.inventory.devices()
+            if not devices:
+                raise RuntimeError('No GPUs are available on this worker.')
+            largest = max(device.memory for device in devices)
+            free_memory: Dict[int, int] = {device.index: device.memory for device in devices}
+            free_slots: Dict[int, int] = {device.index: self.slots_per_device for device in devices}
+            running_per_owner: Dict[str, int] = {}
+            for entry in state['running']:
+                free_memory[entry['device']] -= entry['memory']
+                free_slots[entry['device']] -= 1
+                running_per_owner[entry['owner']] = running_per_owner.get(entry['owner'], 0) + 1
+
+            ranked = sorted(
+                state['waiting'],
+                key=lambda entry: (
+                    -entry['priority'],
+                    running_per_owner.get(entry['owner'], 0),
+                    entry['sequence'],
+                ),
+            )
+            device_index = None
+            for entry in ranked:
+                # A job estimated to need more than any GPU has gets the largest one to itself
+                memory = min(entry['memory'], largest)
+                fits = [
+                    index
+                    for index in free_memory
+                    if free_slots[index] > 0 and free_memory[index] >= memory
+                ]
+                if not fits:
+                    continue
+
+                # Use the GPU with the least free memory that fits, leaving room for larger jobs
+                best = min(fits, key=lambda index: free_memory[index])
+                if entry['id'] == job.id:
+                    device_index = best
+                    break
+                # Reserve this capacity for the higher ranked job
+                free_memory[best] -= memory
+                free_slots[best] -= 1
+
+            if device_index is not None:
+                state['waiting'] = [entry for entry in state['waiting'] if entry['id'] != job.id]
+                state['running'].append(
+                    {
+                        **asdict(job),
+                        'memory': min(job.memory, largest),
+                        'pid': os.getpid(),
+                        'device': device_index,
+                    }
+                )
+            self._save(state)
+            return device_index
+
+    def release(self, job: GPUJob) -> None:
+        """Free the resources of a job, or stop it from waiting."""
+        with FileLock(self.lock_path):
+            state = self._load()
+            for key in ('running', 'waiting'):
+                state[key] = [entry for entry in state[key] if entry['id'] != job.id]
+            self._save(state)
+
+    @contextmanager
+    def admitted(self, job: GPUJob) -> Iterator[int]:
+        """Wait until a job is admitted, yielding the index of its GPU, then release it."""
+        try:
+            while True:
+                device_index = self.try_admit(job)
+                if device_index is not None:
+                    break
+                time.sleep(self.poll_interval)
+
+            logger.info(f'Admitted GPU job {job.id} ({job.memory} MiB) onto GPU {device_index}.')
+            yield device_index
+        finally:
+            self.release(job)
+
+
+# The GPU the containers created by the current thread, or task, are run on
+_container_device: ContextVar[Optional[int]] = ContextVar('container_device', default=None)
+_install_lock = threading.Lock()
+
+
+def _install_container_device_requests():
+    """
+    Make Docker containers request the GPU in ``_container_device``, if it is set.
+
+    rdoasis creates the container of an algorithm itself, requesting every GPU, and has no way to
+    pass it other options. So the creation of containers is wrapped, once, to request only the GPU
+    of the calling context instead. Containers without a device request are run by the NVIDIA
+    runtime, which is given the GPU by ``NVIDIA_VISIBLE_DEVICES``.
+    """
+    from docker.models.containers import ContainerCollection
+    from docker.types import DeviceRequest
+
+    with _install_lock:
+        create = ContainerCollection.create
+        if getattr(create, 'device_requests_installed', False):
+            return
+
+        def create_on_gpu(self, image, command=None, **kwargs):
+            device_index = _container_device.get()
+            if device_index is None:
+                return create(self, image, command, **kwargs)
+
+            if kwargs.get('device_requests'):
+                kwargs['device_requests'] = [
+                    DeviceRequest(device_ids=[str(device_index)], capabilities=[['gpu']])
+                ]
+            else:
+                environment = kwargs.get('environment') or {}
+                if isinstance(environment, dict):
+                    environment = {**environment, 'NVIDIA_VISIBLE_DEVICES': str(device_index)}
+                else:
+                    environment = [*environment, f'NVIDIA_VISIBLE_DEVICES={device_index}']
+                kwargs['environment'] = environment
+            return create(self, image, command, **kwargs)
+
+        create_on_gpu.device_requests_installed = True
+        ContainerCollection.create = create_on_gpu
+
+
+@contextmanager
+def containers_on_gpu(device_index: int) -> Iterator[None]:
+    """
+    Run the Docker containers created, while entered, by the current thread on a single GPU.
+
+    The container only sees that GPU, as its first device. Containers created by other threads,
+    such as those of other tasks run by a threaded pool, are unaffected.
+    """
+    _install_container_device_requests()
+    token = _container_device.set(device_index)
+    try:
+        yield
+    finally:
+        _container_device.reset(token)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
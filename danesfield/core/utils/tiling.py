@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# How many points are read at once while splitting a point cloud
+CHUNK_POINTS = 1_000_000
+
+# How many points are sampled to plan the tiles of a point cloud
+SAMPLE_POINTS = 1_000_000
+
+
+@dataclass
+class Tile:
+    # The area this tile is responsible for, as (min_x, min_y, max_x, max_y)
+    bounds: Tuple[float, float, float, float]
+    # The estimated number of points within the bounds
+    points: int
+
+    def buffered(self, overlap: float) -> Tuple[float, float, float, float]:
+        """Return the bounds grown by ``overlap`` on every side."""
+        min_x, min_y, max_x, max_y = self.bounds
+        return (min_x - overlap, min_y - overlap, max_x + overlap, max_y + overlap)
+
+
+def plan_tiles(
+    x: np.ndarray,
+    y: np.ndarray,
+    bounds: Tuple[float, float, float, float],
+    total_points: int,
+    target_points: int,
+) -> List[Tile]:
+    """
+    Split an area into tiles of roughly ``target_points`` points each.
+
+    ``x`` and ``y`` are a uniform sample of the ``total_points`` points of the area. The area is
+    recursively split across its longer side at the median point, so that dense areas are split
+    into smaller tiles than sparse ones, and every tile has a similar amount of work.
+    """
+    scale = total_points / max(len(x), 1)
+    tiles: List[Tile] = []
+
+    def split(indices: np.ndarray, tile_bounds: Tuple[float, float, float, float]):
+        points = int(len(indices) * scale)
+        min_x, min_y, max_x, max_y = tile_bounds
+        if points <= target_points or len(indices) < 2:
+            tiles.append(Tile(bounds=tile_bounds, points=points))
+            return
+
+        if max_x - min_x >= max_y - min_y:
+            values = x[indices]
+            median = float(np.median(values))
+            if not min_x < median < max_x:
+                median = (min_x + max_x) / 2
+            split(indices[values < median], (min_x, min_y, median, max_y))
+            split(indices[values >= median], (median, min_y, max_x, max_y))
+        else:
+            values = y[indices]
+            median = float(np.median(values))
+            if not min_y < median < max_y:
+                median = (min_y + max_y) / 2
+            split(indices[values < median], (min_x, min_y, max_x, median))
+            split(indices[values >= median], (min_x, median, max_x, max_y))
+
+    split(np.arange(len(x)), bounds)
+    return tiles
+
+
+def plan_point_cloud_tiles(path: Path, target_points: int) -> List[Tile]:
+    """Plan the tiles of a LAS/LAZ file, from a sample of its points."""
+    import laspy
+
+    with laspy.open(path) as reader:
+        header = reader.header
+        step = max(header.point_count // SAMPLE_POINTS, 1)
+        xs, ys = [], []
+        for points in reader.chunk_iterator(CHUNK_POINTS):
+            xs.append(np.asarray(points.x)[::step])
+            ys.append(np.asarray(points.y)[::step])
+
+    bounds = (header.mins[0], header.mins[1], header.maxs[0], header.maxs[1])
+    return plan_tiles(
+        np.concatenate(xs) if xs else np.empty(0),
+        np.concatenate(ys) if ys else np.empty(0),
+        tuple(float(value) for value in bounds),
+        header.point_count,
+        target_points,
+    )
+
+
+def split_point_cloud(
+    path: Path, output_dir: Path, tiles: List[Tile], overlap: float
+) -> List[Path]:
+    """
+    Write the points within the buffered bounds of each tile to a separate file.
+
+    The input is read in chunks, so it is never fully loaded into memory.
+    """
+    import laspy
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = [output_dir / f'tile_{i}{path.suffix}' for i in range(len(tiles))]
+    with laspy.open(path) as reader:
+        writers = [
+            laspy.open(tile_path, mode='w', header=copy.deepcopy(reader.header))
+            for tile_path in paths
+        ]
+        try:
+            for points in reader.chunk_iterator(CHUNK_POINTS):
+                x = np.asarray(points.x)
+                y = np.asarray(points.y)
+                for tile, writer in zip(tiles, writers):
+                    min_x, min_y, max_x, max_y = tile.buffered(overlap)
+                    mask = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+                    if mask.any():
+                        writer.write_points(points[mask])
+        finally:
+            for writer in writers:
+                writer.close()
+
+    return paths
+
+
+def _bounding_box(volume: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the axis-aligned (min, max) corners of a 3D Tiles box or sphere."""
+    if 'box' in volume:
+        center = np.array(volume['box'][:3])
+        half_axes = np.abs(np.array(volume['box'][3:]).reshape(3, 3)).sum(axis=0)
+        return center - half_axes, center + half_axes
+
+    center = np.array(volume['sphere'][:3])
+    radius = volume['sphere'][3]
+    return center - radius, center + radius
+
+
+def merge_bounding_volumes(volumes: List[dict]) -> dict:
+    """
+    Return a 3D Tiles bounding volume enclosing every given bounding volume.
+
+    Regions are merged into a region. Otherwise, boxes and spheres are merged into a box.
+    """
+    if all('region' in volume for volume in volumes):
+        regions = np.array([volume['region'] for volume in volumes])
+        return {
+            'region': [
+                float(regions[:, 0].min()),
+                float(regions[:, 1].min()),
+                float(regions[:, 2].max()),
+                float(regions[:, 3].max()),
+                float(regions[:, 4].min()),
+                float(regions[:, 5].max()),
+            ]
+        }
+
+    corners = [_bounding_box(volume) for volume in volumes if 'region' not in volume]
+    minimum = np.min([corner[0] for corner in corners], axis=0)
+    maximum = np.max([corner[1] for corner in corners], axis=0)
+    center = (minimum + maximum) / 2
+    half = (maximum - minimum) / 2
+    return {
+        'box': [
+            *center.tolist(),
+            float(half[0]),
+            0.0,
+            0.0,
+            0.0,
+            float(half[1]),
+            0.0,
+            0.0,
+            0.0,
+            float(half[2]),
+        ]
+    }
+
+
+def merge_tilesets(tilesets: Dict[str, dict]) -> dict:
+    """
+    Return a tileset.json referencing each of the given tilesets as an external tileset.
+
+    ``tilesets`` maps the URI of each tileset.json, relative to the merged one, to its contents.
+    """
+    children = [
+        {
+            'boundingVolume': tileset['root']['boundingVolume'],
+            'geometricError': tileset['geometricError'],
+            'content': {'uri': uri},
+        }
+        for uri, tileset in tilesets.items()
+    ]
+    geometric_error = max(child['geometricError'] for child in children)
+    return {
+        'asset': {'version': '1.0'},
+        'geometricError': geometric_error,
+        'root': {
+            'boundingVolume': merge_bounding_volumes(
+                [child['boundingVolume'] for child in children]
+            ),
+            'geometricError': geometric_error,
+            'refine': 'ADD',
+            'children': children,
+        },
+    }
+
+
+def tile_output_name(index: int, name: str, tileset_dirs: List[PurePosixPath]) -> str:
+    """
+    Return the name of a file output for a tile, within the merged output.
+
+    Files of a tileset are placed under "tiler/<index>/", so that the merged tileset.json at
+    "tiler/tileset.json" references them. Other files are placed under "tiles/<index>/".
+    """
+    path = PurePosixPath(name)
+    for tileset_dir in tileset_dirs:
+        if tileset_dir == PurePosixPath('.') or tileset_dir in path.parents:
+            return str(PurePosixPath('tiler', str(index), path.relative_to(tileset_dir)))
+    return str(PurePosixPath('tiles', str(index), path))
+
+
+def mosaic_rasters(paths: List[Path], output_path: Path) -> None:
+    """Mosaic georeferenced rasters into a single GeoTIFF."""
+    from osgeo import gdal
+
+    gdal.UseExceptions()
+    vrt = gdal.BuildVRT(str(output_path.with_suffix('.vrt')), [str(path) for path in paths])
+    gdal.Translate(str(output_path), vrt, format='GTiff', creationOptions=['COMPRESS=DEFLATE'])
+    vrt = None
+    output_path.with_suffix('.vrt').unlink()
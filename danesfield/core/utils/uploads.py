@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.db import transaction
+from rgd.models import ChecksumFile
+from rgd.models.file import FileSourceType
+from rgd.utility import compute_hash
+
+from danesfield.core.utils.archives import cache_archive_file_sizes
+
+
+@dataclass
+class UploadStats:
+    uploaded_files: int = 0
+    uploaded_bytes: int = 0
+    deduplicated_files: int = 0
+    deduplicated_bytes: int = 0
+    # In seconds
+    duration: float = 0
+
+    @property
+    def throughput(self) -> float:
+        """The uploaded bytes per second."""
+        return self.uploaded_bytes / self.duration if self.duration else 0
+
+
+def _hash_file(path: Path) -> str:
+    with open(path, 'rb') as fd:
+        return compute_hash(fd)
+
+
+def _store_file(path: Path, name: str) -> str:
+    """
+    Upload a file into the storage of ChecksumFile, returning its name in the storage.
+
+    Files larger than ``DANESFIELD_MULTIPART_THRESHOLD`` are uploaded in parts, if the storage
+    supports it.
+    """
+    field = ChecksumFile._meta.get_field('file')
+    storage = field.storage
+    key = storage.get_available_name(field.generate_filename(ChecksumFile(name=name), path.name))
+    if path.stat().st_size < settings.DANESFIELD_MULTIPART_THRESHOLD:
+        with open(path, 'rb') as fd:
+            return storage.save(key, File(fd))
+
+    part_size = settings.DANESFIELD_MULTIPART_CHUNK_SIZE
+    if hasattr(storage, 'bucket') and hasattr(storage, '_normalize_name'):
+        # S3, through django-storages
+        from boto3.s3.transfer import TransferConfig
+
+        storage.bucket.upload_file(
+            str(path),
+            storage._normalize_name(key),
+            Config=TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size),
+        )
+        return key
+    if hasattr(storage, 'client') and hasattr(storage, 'bucket_name'):
+        # MinIO, through django-minio-storage
+        storage.client.fput_object(storage.bucket_name, key, str(path), part_size=part_size)
+        return key
+
+    with open(path, 'rb') as fd:
+        return storage.save(key, File(fd))
+
+
+def upload_output_files(
+    output_dir: Path,
+    workers: int,
+    created_by: Optional[User] = None,
+    reusable: Iterable[ChecksumFile] = (),
+    batch_size: Optional[int] = None,
+    on_batch: Optional[Callable[[List[ChecksumFile], UploadStats], None]] = None,
+) -> Tuple[List[ChecksumFile], List[ChecksumFile], UploadStats]:
+    """
+    Upload every file under an output directory as a ChecksumFile, using a pool of threads.
+
+    A file with the same name and contents as an existing ChecksumFile of the same user, which
+    isn't part of a FileSet, is not uploaded again, and the existing ChecksumFile is reused in its
+    place. So are any of the ``reusable`` ChecksumFiles, such as those already in a Dataset being
+    added to. The reused and the newly created ChecksumFiles are returned separately. The size of
+    every file is cached, for archives of them.
+
+    The new ChecksumFiles are bulk created, so their post-save tasks are left to the caller. They
+    are created ``batch_size`` at a time, if given, each batch in its own transaction along with
+    ``on_batch``, which is called with the batch and the statistics so far. So an interrupted
+    upload keeps every batch completed before it.
+    """
+    start = time.monotonic()
+    paths = sorted(path for path in output_dir.rglob('*') if path.is_file())
+    names = [path.relative_to(output_dir).as_posix() for path in paths]
+    stats = UploadStats()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        checksums = list(executor.map(_hash_file, paths))
+        # Spare the storage from being asked the size of each file, when downloaded as archives
+        cache_archive_file_sizes(
+            {checksum: path.stat().st_size for path, checksum in zip(paths, checksums)}
+        )
+
+        existing: Dict[Tuple[str, str], ChecksumFile] = {
+            (checksum_file.name, checksum_file.checksum): checksum_file
+            for checksum_file in reusable
+        }
+        # Files of other users may not be visible to this one, so aren't reused. Nor are files of
+        # a 3D tileset, as a file belongs to at most one FileSet, which its tileset would lose.
+        for checksum_file in ChecksumFile.objects.filter(
+            type=FileSourceType.FILE_FIELD,
+            checksum__in=set(checksums),
+            name__in=set(names),
+            created_by=created_by,
+            file_set__isnull=True,
+        ).order_by('pk'):
+            existing.setdefault((checksum_file.name, checksum_file.checksum), checksum_file)
+
+        reused: List[ChecksumFile] = []
+        uploads: List[Tuple[Path, str, str]] = []
+        for path, name, checksum in zip(paths, names, checksums):
+            if (name, checksum) in existing:
+                reused.append(existing[(name, checksum)])
+                stats.deduplicated_files += 1
+                stats.deduplicated_bytes += path.stat().st_size
+            else:
+                uploads.append((path, name, checksum))
+
+        created: List[ChecksumFile] = []
+        batch_size = batch_size or max(len(uploads), 1)
+        for i in range(0, len(uploads), batch_size):
+            batch = uploads[i : i + batch_size]
+            # Only the uploads themselves are threaded, the database is only used from this thread
+            keys = executor.map(lambda upload: _store_file(upload[0], upload[1]), batch)
+            batch_files = [
+                ChecksumFile(name=name, checksum=checksum, file=key, created_by=created_by)
+                for (_, name, checksum), key in zip(batch, keys)
+            ]
+            stats.uploaded_files += len(batch)
+            stats.uploaded_bytes += sum(path.stat().st_size for path, _, _ in batch)
+            stats.duration = time.monotonic() - start
+            with transaction.atomic():
+                batch_files = ChecksumFile.objects.bulk_create(batch_files)
+                if on_batch is not None:
+                    on_batch(batch_files, stats)
+            created += batch_files
+
+    stats.duration = time.monotonic() - start
+    return reused, created, stats
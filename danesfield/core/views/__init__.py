@@ -1,19 +1,23 @@
 from drf_yasg.utils import swagger_auto_schema
 from rdoasis.algorithms.models import Dataset
-from rdoasis.algorithms.views.serializers import (
-    AlgorithmRunSerializer,
-    AlgorithmSerializer,
-    AlgorithmTaskSerializer,
-)
+from rdoasis.algorithms.views.serializers import AlgorithmSerializer
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
-from danesfield.core.tasks import run_danesfield, run_telesculptor
+from danesfield.core.tasks import start_pipeline, start_pipeline_batch
 from danesfield.core.utils import danesfield_algorithm
 
 from .dataset import DatasetViewSet
+from .pipeline import PipelineViewSet
+from .serializers import (
+    DanesfieldBatchRunSerializer,
+    DanesfieldRunSerializer,
+    PipelineBatchSerializer,
+    PipelineSerializer,
+)
+from .task import AlgorithmTaskViewSet
 
 
 class DanesfieldAlgorithmViewSet(ViewSet):
@@ -24,25 +28,64 @@ class DanesfieldAlgorithmViewSet(ViewSet):
         alg = danesfield_algorithm()
         return Response(AlgorithmSerializer(alg).data)
 
-    @swagger_auto_schema(method='POST', request_body=AlgorithmRunSerializer())
+    @swagger_auto_schema(method='POST', request_body=DanesfieldRunSerializer())
     @action(detail=False, methods=['POST'])
     def run(self, request):
-        """Run the algorithm, returning the task."""
-        serializer = AlgorithmRunSerializer(data=request.data)
+        """
+        Run the algorithm, returning the Pipeline of stages it runs in.
+
+        If the dataset contains a point cloud, Danesfield is run on it. Otherwise, it is assumed to
+        contain an FMV that is converted into a point cloud by the KWIVER/TeleSculptor pipeline
+        first. If an ``aoi`` is given, the point cloud is cropped to it. If ``keyframes`` are
+        given, features are only tracked in the frames of the FMV they select. The outputs of
+        identical runs are reused, unless ``force`` is set.
+        """
+        serializer = DanesfieldRunSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         input_dataset: Dataset = get_object_or_404(
             Dataset, pk=serializer.validated_data['input_dataset']
         )
 
-        # If the dataset contains a point cloud, run Danesfield on it
-        if input_dataset.files.filter(name__endswith='.las').exists():
-            task = run_danesfield(input_dataset.pk)
-        # Otherwise, assume it contains an FMV that needs to be converted first,
-        # and run the KWIVER/TeleSculptor pipeline
-        else:
-            task = run_telesculptor(input_dataset.pk)
-        return Response(AlgorithmTaskSerializer(task).data)
+        pipeline = start_pipeline(
+            input_dataset,
+            force=serializer.validated_data['force'],
+            aoi=serializer.validated_data.get('aoi'),
+            keyframes=serializer.validated_data.get('keyframes'),
+        )
+        return Response(PipelineSerializer(pipeline).data)
+
+    @swagger_auto_schema(method='POST', request_body=DanesfieldBatchRunSerializer())
+    @action(detail=False, methods=['POST'])
+    def run_batch(self, request):
+        """
+        Run the algorithm on many datasets, returning the batch of Pipelines.
+
+        The datasets are given either by ID, or by a name to match.
+        """
+        serializer = DanesfieldBatchRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        datasets = Dataset.objects.all()
+        if 'input_datasets' in data:
+            datasets = datasets.filter(pk__in=data['input_datasets'])
+        if 'name' in data:
+            datasets = datasets.filter(name__icontains=data['name'])
+
+        batch = start_pipeline_batch(
+            datasets,
+            force=data['force'],
+            concurrency=data.get('concurrency'),
+            priority=data.get('priority'),
+            keyframes=data.get('keyframes'),
+        )
+        return Response(PipelineBatchSerializer(batch).data)
 
 
-__all__ = ['DanesfieldAlgorithmViewSet', 'DatasetViewSet']
+__all__ = [
+    'AlgorithmTaskViewSet',
+    'DanesfieldAlgorithmViewSet',
+    'DatasetViewSet',
+    'PipelineViewSet',
+]
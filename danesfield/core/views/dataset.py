@@ -1,20 +1,126 @@
+from fnmatch import fnmatchcase
+import hashlib
 import json
+import re
+from typing import List, Optional, Tuple
+from urllib.parse import quote
 
-from django.contrib.gis.geos import MultiPoint, Point
+from django.contrib.gis.geos import Polygon
 from django.db.models import Exists, OuterRef
-from django.http import JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect
+from drf_yasg.utils import swagger_auto_schema
 from rdoasis.algorithms.models import AlgorithmTask, Dataset
 from rdoasis.algorithms.views.algorithms import DatasetViewSet as BaseDatasetViewSet
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rgd_3d.models import Mesh3D, Mesh3DSpatial, Tiles3DMeta
-from rgd_fmv.models import FMVMeta
-from rgd_imagery.models import RasterMeta
+from rest_framework.utils.urls import replace_query_param
+from rgd.models import ChecksumFile
+from rgd.models.file import FileSourceType
 
-from danesfield.core.views.serializers import DatasetListQueryParamsSerializer
+from danesfield.core.utils.archives import (
+    ArchiveEntry,
+    ZipArchive,
+    cache_archive_files,
+    get_cached_archive_files,
+)
+from danesfield.core.utils.datasets import (
+    DATASET_ENTITIES,
+    annotate_dataset_entities,
+    cache_dataset_detail,
+    get_cached_dataset_detail,
+)
+from danesfield.core.utils.footprints import SimplifyPreserveTopology
+from danesfield.core.views.serializers import (
+    DatasetArchiveQueryParamsSerializer,
+    DatasetFootprintsQueryParamsSerializer,
+    DatasetListQueryParamsSerializer,
+)
+
+# In the scope of an ASGI request for an archive, the view leaves the archive here, to be streamed
+# by a coroutine rather than on the event loop. See ``danesfield.core.downloads``.
+ARCHIVE_STREAM_SCOPE_KEY = 'danesfield.archive_stream'
+# The footprint of a Dataset without any spatial entries
+EMPTY_FOOTPRINT = json.dumps({'type': 'GeometryCollection', 'geometries': []})
+
+
+def _content_disposition(filename: str) -> str:
+    """Return a Content-Disposition header to download a file as the given name."""
+    if filename.isascii() and filename.isprintable():
+        escaped = filename.replace('\\', '\\\\').replace('"', '\\"')
+        return f'attachment; filename="{escaped}"'
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
+def _dataset_archive(files: List[ChecksumFile]) -> Tuple[ZipArchive, str]:
+    """
+    Lay out a ZIP archive of ChecksumFiles, returning it and its ETag.
+
+    The size and CRC-32 of each file are cached by checksum, so resuming a download doesn't need
+    to look up the size of every file, or read the files before the resumed range, again. Sizes
+    are cached as files are uploaded, and CRC-32s as soon as each file has been streamed.
+    """
+    cached = get_cached_archive_files(file.checksum for file in files if file.checksum)
+    entries = []
+    crcs = {}
+    looked_up = {}
+    for file in files:
+        key = str(file.checksum or f'pk:{file.pk}')
+        known = cached.get(file.checksum) if file.checksum else None
+        if known is None:
+            known = {'size': file.file.size, 'crc': None}
+            if file.checksum:
+                looked_up[file.checksum] = known
+        entry = ArchiveEntry(name=file.name, size=known['size'], modified=file.modified, key=key)
+        entries.append(entry)
+        if known['crc'] is not None:
+            crcs[key] = known['crc']
+    # Only look up the size of each file once
+    cache_archive_files(looked_up)
+
+    # Files with the same checksum have the same contents, so either may be opened
+    files_by_key = {entry.key: file for entry, file in zip(entries, files)}
+
+    def open_entry(entry: ArchiveEntry):
+        return files_by_key[entry.key].file.open('rb')
+
+    def on_crc(entry: ArchiveEntry, crc: int):
+        checksum = files_by_key[entry.key].checksum
+        if checksum:
+            cache_archive_files({checksum: {'size': entry.size, 'crc': crc}})
+
+    archive = ZipArchive(entries, open_entry, crcs, on_crc)
+    etag = hashlib.sha256(
+        json.dumps(
+            [(entry.name, entry.key, entry.size, entry.modified.isoformat()) for entry in entries]
+        ).encode()
+    ).hexdigest()
+    return archive, f'"{etag}"'
+
+
+def _byte_range(request: Request, size: int, etag: str) -> Optional[Tuple[int, int]]:
+    """
+    Return the single byte range requested, as (start, end) exclusive, if any.
+
+    Raises ValueError if the range can't be satisfied.
+    """
+    header = request.headers.get('Range')
+    if header is None or request.headers.get('If-Range', etag) != etag:
+        return None
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', header.strip())
+    if match is None or match[1] == match[2] == '':
+        raise ValueError(header)
+    if match[1] == '':
+        # The last bytes of the archive
+        start, end = max(0, size - int(match[2])), size
+    else:
+        start = int(match[1])
+        end = min(int(match[2]) + 1, size) if match[2] else size
+    if start >= end:
+        raise ValueError(header)
+    return start, end
 
 
 class DatasetViewSet(BaseDatasetViewSet):
@@ -42,34 +148,22 @@ class DatasetViewSet(BaseDatasetViewSet):
         return qs
 
     def retrieve(self, request, *args, **kwargs):
+        # Look the Dataset up first, so the queryset filtering and object permissions apply to
+        # cached responses too. The cached response itself doesn't depend on the user.
         instance = self.get_object()
+        resp = get_cached_dataset_detail(instance.pk)
+        if resp is not None:
+            return Response(resp)
+
+        # The ingested entities are all annotated in a single query
+        instance = annotate_dataset_entities(Dataset.objects.filter(pk=instance.pk)).get()
         serializer = self.get_serializer(instance)
 
-        rasters = [
-            raster['pk']
-            for raster in RasterMeta.objects.filter(
-                parent_raster__image_set__images__file__in=instance.files.all()
-            ).values('pk')
-        ]
-        meshes = [
-            mesh['pk'] for mesh in Mesh3D.objects.filter(file__in=instance.files.all()).values('pk')
-        ]
-        tiles3d = [
-            tiles['pk']
-            for tiles in Tiles3DMeta.objects.filter(
-                source__json_file__in=instance.files.all()
-            ).values('pk')
-        ]
-        fmvs = [
-            fmv['pk']
-            for fmv in FMVMeta.objects.filter(fmv_file__file__in=instance.files.all()).values('pk')
-        ]
+        resp = dict(serializer.data)
+        for name in DATASET_ENTITIES:
+            resp[name] = getattr(instance, name)
 
-        resp = serializer.data
-        resp['rasters'] = rasters
-        resp['meshes'] = meshes
-        resp['tiles3d'] = tiles3d
-        resp['fmvs'] = fmvs
+        cache_dataset_detail(instance.pk, resp)
 
         return Response(resp)
 
@@ -80,47 +174,89 @@ class DatasetViewSet(BaseDatasetViewSet):
         file = get_object_or_404(dataset.files.all(), name=name)
         return redirect(file.file.url, permanent=False)
 
+    @swagger_auto_schema(method='GET', query_serializer=DatasetArchiveQueryParamsSerializer())
+    @action(detail=True, methods=['GET'])
+    def archive(self, request: Request, pk: str):
+        """
+        Download the files of a Dataset as a ZIP archive, optionally only those matching a glob.
+
+        The archive is streamed as it is read from storage. Its files aren't compressed, so that
+        its size is known up front, and a download can be resumed with a Range request. Files
+        stored by URL, rather than in storage, aren't included.
+
+        Under ASGI, the archive is streamed by ``danesfield.core.downloads`` instead, as Django
+        would otherwise read every file of it on the event loop.
+        """
+        dataset = self.get_object()
+        query_serializer = DatasetArchiveQueryParamsSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        glob: Optional[str] = query_serializer.validated_data.get('glob')
+
+        files = [
+            file
+            for file in dataset.files.filter(type=FileSourceType.FILE_FIELD).order_by('name')
+            if glob is None or fnmatchcase(file.name, glob)
+        ]
+        archive, etag = _dataset_archive(files)
+        try:
+            byte_range = _byte_range(request, archive.size, etag)
+        except ValueError:
+            resp = HttpResponse(status=416)
+            resp['Content-Range'] = f'bytes */{archive.size}'
+            return resp
+        start, end = byte_range or (0, archive.size)
+
+        stream = archive.stream(start, end)
+        deferred: Optional[dict] = getattr(request, 'scope', {}).get(ARCHIVE_STREAM_SCOPE_KEY)
+        if deferred is not None:
+            deferred['stream'] = stream
+            stream = iter([])
+
+        resp = StreamingHttpResponse(stream, content_type='application/zip')
+        if byte_range is not None:
+            resp.status_code = 206
+            resp['Content-Range'] = f'bytes {start}-{end - 1}/{archive.size}'
+        resp['Content-Length'] = str(end - start)
+        resp['Accept-Ranges'] = 'bytes'
+        resp['ETag'] = etag
+        resp['Content-Disposition'] = _content_disposition(f'{dataset.name}.zip')
+        return resp
+
+    @swagger_auto_schema(method='GET', query_serializer=DatasetFootprintsQueryParamsSerializer())
     @action(detail=False, methods=['GET'])
     def footprints(self, request: Request):
-        resp = {}
-        for dataset in Dataset.objects.all():
-            # Collect footprints of every Raster/Mesh/3D Tiles in this Dataset
-            footprints = (
-                [
-                    json.loads(item['footprint'].json)
-                    for item in RasterMeta.objects.filter(
-                        parent_raster__image_set__images__file__in=dataset.files.all()
-                    ).values('footprint')
-                ]
-                + [
-                    json.loads(item['footprint'].json)
-                    for item in Tiles3DMeta.objects.filter(
-                        source__json_file__in=dataset.files.all()
-                    ).values('footprint')
-                ]
-                + [
-                    json.loads(item['footprint'].json)
-                    for item in Mesh3DSpatial.objects.filter(
-                        source__file__in=dataset.files.all()
-                    ).values('footprint')
-                ]
-                + [
-                    json.loads(item['footprint'].json)
-                    for item in FMVMeta.objects.filter(
-                        fmv_file__file__in=dataset.files.all()
-                    ).values('footprint')
-                ]
-            )
+        """Return the precomputed footprints of Datasets, one page at a time."""
+        query_serializer = DatasetFootprintsQueryParamsSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        bbox: Optional[Polygon] = query_serializer.validated_data.get('bbox')
+        simplify: Optional[float] = query_serializer.validated_data.get('simplify')
+        limit: int = query_serializer.validated_data['limit']
+        offset: int = query_serializer.validated_data['offset']
 
-            # Flatten list of polygons into list of points
-            points = [
-                Point(coord[0], coord[1])
-                for footprint in footprints
-                for coords in footprint['coordinates']
-                for coord in coords
-            ]
+        # Datasets without any spatial entries (or not yet footprinted) are returned as well, with
+        # an empty footprint, except when filtering by a bbox they can't intersect
+        footprints = Dataset.objects.order_by('pk')
+        if bbox is not None:
+            footprints = footprints.filter(footprint__footprint__intersects=bbox)
+        if simplify:
+            footprints = footprints.annotate(
+                footprint_simplified=SimplifyPreserveTopology('footprint__footprint', simplify)
+            )
+            footprints = footprints.values_list('pk', 'footprint_simplified')
+        else:
+            footprints = footprints.values_list('pk', 'footprint__footprint')
 
-            # Compute convex hull of this dataset
-            resp[dataset.pk] = json.loads(MultiPoint(points).convex_hull.json)
+        # Fetch one extra row, to determine whether there is a next page
+        page = list(footprints[offset : offset + limit + 1])
+        has_next = len(page) > limit
 
-        return JsonResponse(resp)
+        # Write the response by hand, to avoid round-tripping each geometry through Python
+        content = ', '.join(
+            f'"{dataset_pk}": {EMPTY_FOOTPRINT if footprint is None else footprint.json}'
+            for dataset_pk, footprint in page[:limit]
+        )
+        resp = HttpResponse(f'{{{content}}}', content_type='application/json')
+        if has_next:
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+            resp['Link'] = f'<{next_url}>; rel="next"'
+        return resp
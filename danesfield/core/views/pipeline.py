@@ -0,0 +1,42 @@
+from django.db.models import Prefetch
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from danesfield.core.models import Pipeline, PipelineStage, PipelineVideo
+from danesfield.core.views.serializers import (
+    PipelineListQueryParamsSerializer,
+    PipelineSerializer,
+)
+
+
+class PipelineViewSet(ReadOnlyModelViewSet):
+    """The state of each Pipeline, and of every stage in it."""
+
+    serializer_class = PipelineSerializer
+
+    def get_queryset(self):
+        qs = Pipeline.objects.all()
+        if self.action == 'list':
+            query_serializer = PipelineListQueryParamsSerializer(data=self.request.query_params)
+            query_serializer.is_valid(raise_exception=True)
+            if 'batch' in query_serializer.validated_data:
+                qs = qs.filter(batch=query_serializer.validated_data['batch'])
+
+        return qs.order_by('-created').prefetch_related(
+            Prefetch(
+                'stages',
+                queryset=PipelineStage.objects.select_related(
+                    'algorithm_task__keyframe_selection', 'point_cloud_reduction'
+                ).prefetch_related('algorithm_task__stages'),
+            ),
+            Prefetch(
+                'videos',
+                queryset=PipelineVideo.objects.select_related(
+                    'algorithm_task__keyframe_selection'
+                ).prefetch_related('algorithm_task__stages'),
+            ),
+        )
+
+    @swagger_auto_schema(query_serializer=PipelineListQueryParamsSerializer())
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
@@ -1,4 +1,25 @@
+import json
+from typing import Optional
+
+from django.contrib.gis.gdal import GDALException
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, Polygon
+from rdoasis.algorithms.views.serializers import AlgorithmRunSerializer
 from rest_framework import serializers
+from rgd.models.constants import DB_SRID
+from rgd.models.mixins import Status
+
+from danesfield.core.models import (
+    AlgorithmTaskMetrics,
+    AlgorithmTaskSpan,
+    AlgorithmTaskStage,
+    KeyframeSelection,
+    Pipeline,
+    PipelineBatch,
+    PipelineStage,
+    PipelineVideo,
+    PointCloudReduction,
+)
+from danesfield.core.utils.logs import MAX_LOG_READ
 
 
 class DatasetListQueryParamsSerializer(serializers.Serializer):
@@ -8,3 +29,290 @@ class DatasetListQueryParamsSerializer(serializers.Serializer):
     include_output_datasets = serializers.BooleanField(
         default=True, help_text='Whether or not to include output datasets in response.'
     )
+
+
+class KeyframesSerializer(serializers.Serializer):
+    mode = serializers.ChoiceField(
+        choices=KeyframeSelection.Mode.choices,
+        help_text=(
+            'Select every n-th frame ("stride"), a frame whenever the view has moved ("motion"), '
+            'or whenever the sensor has moved, per the KLV metadata ("metadata").'
+        ),
+    )
+    stride = serializers.IntegerField(
+        default=5, min_value=1, help_text='Select every n-th frame, in stride mode.'
+    )
+    motion_threshold = serializers.FloatField(
+        default=0.1,
+        min_value=0,
+        max_value=1,
+        help_text='Fraction of the frame width the view moves between keyframes.',
+    )
+    min_distance = serializers.FloatField(
+        default=10.0, min_value=0, help_text='Meters the sensor must move between keyframes.'
+    )
+
+
+class DanesfieldRunSerializer(AlgorithmRunSerializer):
+    force = serializers.BooleanField(
+        default=False,
+        help_text='Run even if the outputs of an identical run can be reused.',
+    )
+    aoi = serializers.JSONField(
+        required=False,
+        help_text='A GeoJSON Polygon, in WGS84, to crop the point cloud to.',
+    )
+    keyframes = KeyframesSerializer(
+        required=False, help_text='Only track features in these frames of an FMV.'
+    )
+
+    def validate_aoi(self, value) -> Polygon:
+        try:
+            aoi = GEOSGeometry(json.dumps(value))
+        except (TypeError, ValueError, GEOSException, GDALException):
+            raise serializers.ValidationError('Must be a GeoJSON geometry.')
+        if not isinstance(aoi, Polygon) or not aoi.valid:
+            raise serializers.ValidationError('Must be a valid Polygon.')
+
+        aoi.srid = DB_SRID
+        return aoi
+
+
+class DanesfieldBatchRunSerializer(serializers.Serializer):
+    input_datasets = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        help_text='The IDs of the datasets to run on.',
+    )
+    name = serializers.CharField(
+        required=False, help_text='Run on every dataset whose name contains this.'
+    )
+    force = serializers.BooleanField(
+        default=False,
+        help_text='Run even if the outputs of identical runs can be reused.',
+    )
+    concurrency = serializers.IntegerField(
+        required=False, min_value=1, help_text='How many datasets to run on at once.'
+    )
+    priority = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=9,
+        help_text='The Celery priority of every task of the batch.',
+    )
+    keyframes = KeyframesSerializer(
+        required=False, help_text='Only track features in these frames of each FMV.'
+    )
+
+    def validate(self, data):
+        if 'input_datasets' not in data and 'name' not in data:
+            raise serializers.ValidationError('Either input_datasets or name must be given.')
+        return data
+
+
+class PipelineListQueryParamsSerializer(serializers.Serializer):
+    batch = serializers.IntegerField(
+        required=False, help_text='Only include the Pipelines of this batch.'
+    )
+
+
+class PipelineBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PipelineBatch
+        fields = ['id', 'concurrency', 'priority', 'pipelines', 'created']
+
+    pipelines = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+
+class DatasetArchiveQueryParamsSerializer(serializers.Serializer):
+    glob = serializers.CharField(
+        required=False,
+        help_text='Only include files whose name matches this glob, e.g. "tiler/*".',
+    )
+
+
+class DatasetFootprintsQueryParamsSerializer(serializers.Serializer):
+    bbox = serializers.CharField(
+        required=False,
+        help_text='Only include footprints intersecting "min_lon,min_lat,max_lon,max_lat".',
+    )
+    simplify = serializers.FloatField(
+        required=False,
+        min_value=0,
+        help_text='Simplify footprints with this tolerance, in degrees.',
+    )
+    limit = serializers.IntegerField(
+        default=1000,
+        min_value=1,
+        max_value=10000,
+        help_text='Number of footprints to return. Follow the "next" Link header for the rest.',
+    )
+    offset = serializers.IntegerField(
+        default=0, min_value=0, help_text='Index of the first footprint to return.'
+    )
+
+    def validate_bbox(self, value: str) -> Polygon:
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(coord) for coord in value.split(','))
+        except ValueError:
+            raise serializers.ValidationError('Must be four comma-separated numbers.')
+        if min_lon > max_lon or min_lat > max_lat:
+            raise serializers.ValidationError('Minimum coordinates must not exceed maximums.')
+
+        bbox = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+        bbox.srid = DB_SRID
+        return bbox
+
+
+class AlgorithmTaskStageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlgorithmTaskStage
+        fields = ['name', 'duration', 'resumed']
+
+
+class AlgorithmTaskSpanSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlgorithmTaskSpan
+        fields = ['name', 'started', 'duration', 'bytes']
+
+
+class AlgorithmTaskMetricsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlgorithmTaskMetrics
+        fields = [
+            'input_cache_hits',
+            'input_cache_misses',
+            'input_cache_bytes_saved',
+            'input_bytes_downloaded',
+            'output_files_uploaded',
+            'output_bytes_uploaded',
+            'output_files_deduplicated',
+            'output_bytes_deduplicated',
+            'output_upload_duration',
+            'output_upload_throughput',
+            'container_peak_memory',
+        ]
+
+    output_upload_throughput = serializers.FloatField(read_only=True)
+
+
+class AlgorithmTaskTimingsSerializer(serializers.Serializer):
+    spans = AlgorithmTaskSpanSerializer(many=True, read_only=True)
+    metrics = AlgorithmTaskMetricsSerializer(read_only=True, allow_null=True)
+
+
+class AlgorithmTaskLogQueryParamsSerializer(serializers.Serializer):
+    offset = serializers.IntegerField(
+        default=0, min_value=0, help_text='The offset, in characters, to read the log from.'
+    )
+    limit = serializers.IntegerField(
+        default=MAX_LOG_READ,
+        min_value=1,
+        max_value=MAX_LOG_READ,
+        help_text='The most characters to return.',
+    )
+
+
+class AlgorithmTaskLogSerializer(serializers.Serializer):
+    offset = serializers.IntegerField()
+    content = serializers.CharField()
+    next_offset = serializers.IntegerField(help_text='The offset to read any further log from.')
+    finished = serializers.BooleanField(help_text='Whether the task has finished running.')
+
+
+class PointCloudReductionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PointCloudReduction
+        fields = ['input_points', 'output_points', 'input_bytes', 'output_bytes']
+
+
+class KeyframeSelectionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = KeyframeSelection
+        fields = ['mode', 'input_frames', 'selected_frames']
+
+
+class PipelineStageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PipelineStage
+        fields = [
+            'id',
+            'name',
+            'index',
+            'queue',
+            'status',
+            'algorithm_task',
+            'output_dataset',
+            'started',
+            'finished',
+            'algorithm_task_stages',
+            'point_cloud_reduction',
+            'keyframe_selection',
+        ]
+
+    point_cloud_reduction = PointCloudReductionSerializer(read_only=True)
+    keyframe_selection = KeyframeSelectionSerializer(
+        source='algorithm_task.keyframe_selection', default=None, read_only=True
+    )
+    # The stages completed within the AlgorithmTask of this stage, if any
+    algorithm_task_stages = serializers.SerializerMethodField()
+
+    def get_algorithm_task_stages(self, stage: PipelineStage) -> list:
+        if stage.algorithm_task is None:
+            return []
+        return AlgorithmTaskStageSerializer(stage.algorithm_task.stages.all(), many=True).data
+
+
+class PipelineVideoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PipelineVideo
+        fields = [
+            'index',
+            'name',
+            'input_dataset',
+            'algorithm_task',
+            'status',
+            'stages',
+            'keyframe_selection',
+        ]
+
+    status = serializers.CharField(source='algorithm_task.status', default=None, read_only=True)
+    keyframe_selection = KeyframeSelectionSerializer(
+        source='algorithm_task.keyframe_selection', default=None, read_only=True
+    )
+    # The TeleSculptor stages completed for this FMV, with their durations
+    stages = serializers.SerializerMethodField()
+
+    def get_stages(self, video: PipelineVideo) -> list:
+        if video.algorithm_task is None:
+            return []
+        return AlgorithmTaskStageSerializer(video.algorithm_task.stages.all(), many=True).data
+
+
+class PipelineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Pipeline
+        fields = [
+            'id',
+            'input_dataset',
+            'status',
+            'force',
+            'keyframes',
+            'current_stage',
+            'stages',
+            'videos',
+            'created',
+            'modified',
+        ]
+
+    stages = PipelineStageSerializer(many=True, read_only=True)
+    # If the input has many FMVs, the progress of each of them
+    videos = PipelineVideoSerializer(many=True, read_only=True)
+    current_stage = serializers.SerializerMethodField()
+
+    def get_current_stage(self, pipeline: Pipeline) -> Optional[str]:
+        """Return the name of the first stage which hasn't succeeded, if any."""
+        for stage in pipeline.stages.all():
+            if stage.status != Status.SUCCEEDED:
+                return stage.name
+        return None
@@ -0,0 +1,55 @@
+from drf_yasg.utils import swagger_auto_schema
+from rdoasis.algorithms.views.algorithms import AlgorithmTaskViewSet as BaseAlgorithmTaskViewSet
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from danesfield.core.models import AlgorithmTaskMetrics
+from danesfield.core.utils.logs import read_log, task_finished
+from danesfield.core.views.serializers import (
+    AlgorithmTaskLogQueryParamsSerializer,
+    AlgorithmTaskLogSerializer,
+    AlgorithmTaskTimingsSerializer,
+)
+
+
+class AlgorithmTaskViewSet(BaseAlgorithmTaskViewSet):
+    @swagger_auto_schema(method='GET', responses={200: AlgorithmTaskTimingsSerializer()})
+    @action(detail=True, methods=['GET'])
+    def timings(self, request, pk=None):
+        """
+        Return how long each step of the task took, and the bytes and memory it used.
+
+        Spans may nest, e.g. the "run" span includes the "upload" span.
+        """
+        task = self.get_object()
+        data = {
+            'spans': task.spans.all(),
+            'metrics': AlgorithmTaskMetrics.objects.filter(algorithm_task=task).first(),
+        }
+        return Response(AlgorithmTaskTimingsSerializer(data).data)
+
+    @swagger_auto_schema(
+        method='GET',
+        query_serializer=AlgorithmTaskLogQueryParamsSerializer(),
+        responses={200: AlgorithmTaskLogSerializer()},
+    )
+    @action(detail=True, methods=['GET'])
+    def logs(self, request, pk=None):
+        """
+        Return the log of the task from an offset, to follow it without reading all of it again.
+
+        Pass the returned ``next_offset`` as the ``offset`` of the next request. New log lines
+        and progress can also be followed as server-sent events, from ``events/``.
+        """
+        task = self.get_object()
+        query_serializer = AlgorithmTaskLogQueryParamsSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+
+        log = read_log(task, **query_serializer.validated_data)
+        data = {
+            'offset': log.offset,
+            'content': log.content,
+            'next_offset': log.next_offset,
+            'finished': task_finished(task),
+        }
+        return Response(AlgorithmTaskLogSerializer(data).data)
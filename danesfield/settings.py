@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+import tempfile
 
 from composed_configuration import (
     ComposedConfiguration,
@@ -19,6 +20,104 @@ class DanesfieldMixin(ResonantGeoDataBaseMixin):
 
     BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
+    # Let the client follow the pages of paginated responses from another origin
+    CORS_EXPOSE_HEADERS = ['Link']
+
+    # How long, in seconds, a Dataset detail response may be served from the cache
+    DANESFIELD_DATASET_DETAIL_CACHE_TIMEOUT = 60
+    # How long, in seconds, the size and CRC-32 of files downloaded in Dataset archives are cached
+    DANESFIELD_ARCHIVE_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+    # Worker-local cache of algorithm input files, and its maximum size in bytes
+    DANESFIELD_INPUT_CACHE_DIR = values.PathValue(
+        str(Path(tempfile.gettempdir()) / 'danesfield_input_cache'),
+        environ_prefix='DJANGO',
+        check_exists=False,
+    )
+    DANESFIELD_INPUT_CACHE_SIZE = values.IntegerValue(50 * 1024**3, environ_prefix='DJANGO')
+
+    # Worker-local store of the model files needed by Danesfield, and where to download them.
+    # Changing the version causes the models to be downloaded again.
+    DANESFIELD_MODELS_DIR = values.PathValue(
+        str(Path(tempfile.gettempdir()) / 'danesfield_models'),
+        environ_prefix='DJANGO',
+        check_exists=False,
+    )
+    DANESFIELD_MODELS_URL = values.Value(
+        'https://data.kitware.com/api/v1/folder/5fa1b6c850a41e3d192de93b/download',
+        environ_prefix='DJANGO',
+    )
+    DANESFIELD_MODELS_VERSION = values.Value('5fa1b6c850a41e3d192de93b', environ_prefix='DJANGO')
+    # The sha512 checksum of the model archive. Deployments should set this, so that a corrupt or
+    # unexpected archive is rejected, rather than installed.
+    DANESFIELD_MODELS_CHECKSUM = values.Value(None, environ_prefix='DJANGO')
+
+    # Whether TeleSculptor resumes from the results of a failed, otherwise identical, run
+    DANESFIELD_TELESCULPTOR_RESUME = values.BooleanValue(True, environ_prefix='DJANGO')
+
+    # The Celery queue each Pipeline stage runs on. The GPU-bound algorithms themselves always
+    # run on the "danesfield" and "kwiver" queues, so these stages only need a CPU worker.
+    DANESFIELD_PIPELINE_QUEUES = {
+        'ingest-input': 'celery',
+        'split-videos': 'celery',
+        'telesculptor': 'celery',
+        'merge-point-clouds': 'celery',
+        'preprocess': 'celery',
+        'tile': 'celery',
+        'danesfield': 'celery',
+        'merge-tiles': 'celery',
+        'cog': 'celery',
+        'mesh-tiles': 'celery',
+        'ingest-output': 'celery',
+    }
+
+    # The GPUs of each worker, either "nvidia-smi" to detect them, or "fake:" followed by the
+    # comma-separated memory of each GPU in MiB, e.g. "fake:16384,16384"
+    DANESFIELD_GPU_INVENTORY = values.Value('nvidia-smi', environ_prefix='DJANGO')
+    # How many jobs may share one GPU, if they fit in its memory
+    DANESFIELD_GPU_SLOTS_PER_DEVICE = values.IntegerValue(1, environ_prefix='DJANGO')
+    DANESFIELD_GPU_SCHEDULER_DIR = values.PathValue(
+        str(Path(tempfile.gettempdir()) / 'danesfield_gpu_scheduler'),
+        environ_prefix='DJANGO',
+        check_exists=False,
+    )
+    # The estimated GPU memory of each algorithm, in MiB, as a base amount plus an amount per GiB
+    # of input files
+    DANESFIELD_GPU_MEMORY_ESTIMATES = {
+        'Danesfield': (6144, 1024),
+        'TeleSculptor': (4096, 512),
+    }
+
+    # How many output files a worker uploads at once, and the size in bytes above which a file is
+    # uploaded in parts of the given size
+    DANESFIELD_UPLOAD_WORKERS = values.IntegerValue(8, environ_prefix='DJANGO')
+    DANESFIELD_MULTIPART_THRESHOLD = values.IntegerValue(64 * 1024**2, environ_prefix='DJANGO')
+    DANESFIELD_MULTIPART_CHUNK_SIZE = values.IntegerValue(16 * 1024**2, environ_prefix='DJANGO')
+
+    # Decimate point clouds to the resolution Danesfield needs, and compress them, before running
+    # it. Point clouds are always pre-processed when a Pipeline is given an AOI to crop them to.
+    DANESFIELD_PREPROCESS_POINT_CLOUDS = values.BooleanValue(False, environ_prefix='DJANGO')
+
+    # Convert output GeoTIFFs to Cloud Optimized GeoTIFFs before ingesting them, optionally keeping
+    # each original alongside, with ".original" appended to its name
+    DANESFIELD_COG_RASTERS = values.BooleanValue(True, environ_prefix='DJANGO')
+    DANESFIELD_KEEP_ORIGINAL_RASTERS = values.BooleanValue(False, environ_prefix='DJANGO')
+
+    # Convert output meshes of at least this many bytes into 3D tilesets, if set, with this many
+    # levels of detail, and at most this many faces in each tile of the coarser levels
+    DANESFIELD_MESH_TILES_MIN_SIZE = values.IntegerValue(64 * 1024**2, environ_prefix='DJANGO')
+    DANESFIELD_MESH_TILES_LEVELS = values.IntegerValue(4, environ_prefix='DJANGO')
+    DANESFIELD_MESH_TILES_MAX_FACES = values.IntegerValue(100_000, environ_prefix='DJANGO')
+
+    # If set, point clouds are split into tiles of about this many points, which Danesfield
+    # processes in parallel, and the overlap in point cloud units added around each tile
+    DANESFIELD_TILE_POINTS = values.IntegerValue(None, environ_prefix='DJANGO')
+    DANESFIELD_TILE_OVERLAP = values.FloatValue(50.0, environ_prefix='DJANGO')
+
+    # If set, the port each worker serves Prometheus metrics of its tasks on. With more than one
+    # worker process, PROMETHEUS_MULTIPROC_DIR must be set to a directory they all share.
+    DANESFIELD_WORKER_METRICS_PORT = values.IntegerValue(None, environ_prefix='DJANGO')
+
     @staticmethod
     def mutate_configuration(configuration: ComposedConfiguration) -> None:
         # Install local apps first, to ensure any overridden resources are found first
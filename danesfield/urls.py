@@ -3,11 +3,15 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
-from rdoasis.algorithms.views.algorithms import AlgorithmTaskViewSet
 from rest_framework import permissions
 from rest_framework_extensions.routers import ExtendedSimpleRouter
 
-from danesfield.core.views import DanesfieldAlgorithmViewSet, DatasetViewSet
+from danesfield.core.views import (
+    AlgorithmTaskViewSet,
+    DanesfieldAlgorithmViewSet,
+    DatasetViewSet,
+    PipelineViewSet,
+)
 
 # OpenAPI generation
 schema_view = get_schema_view(
@@ -20,6 +24,7 @@ oasis_router = ExtendedSimpleRouter()
 oasis_router.register('datasets', DatasetViewSet, basename='dataset')
 oasis_router.register('tasks', AlgorithmTaskViewSet, basename='task')
 oasis_router.register('danesfield', DanesfieldAlgorithmViewSet, basename='danesfield')
+oasis_router.register('pipelines', PipelineViewSet, basename='pipeline')
 
 urlpatterns = [
     path('accounts/', include('allauth.urls')),
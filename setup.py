@@ -51,10 +51,13 @@ setup(
         'djangorestframework',
         'drf-extensions',
         'drf-yasg',
+        'filelock',
+        'prometheus-client',
         # Production-only
         'django-composed-configuration[prod]>=0.21.0',
         'django-s3-file-field[boto3]',
         'gunicorn',
+        'uvicorn',
         # Install with git
         'RD-OASIS @ git+https://github.com/ResonantGeoData/RD-OASIS@a90f8e969f828932a4ae207693a3c9a09aef34a8',  # noqa
     ],
@@ -8,22 +8,63 @@ source /kwiver/build/setup_KWIVER.sh
 Xvfb :1 -screen 0 1024x768x16 -nolisten tcp &
 export DISPLAY=:1.0
 
+# Write results straight into the output directory, so that the results of completed stages
+# survive a failure, and can be restored by the worker to resume from the first incomplete stage
+mkdir -p output/results/.checkpoints
+ln -sfn output/results results
+
 # Assume the only other file in this directory besides this shell
-# script and color-mesh.conf is the FMV file we want to run the pipeline on
-fmv_file=$(find . -type f ! -name "*.sh" ! -name "*.conf")
+# script and color-mesh.conf is the FMV file we want to run the pipeline on.
+# Datasets of many FMVs are split by the worker into one run per FMV.
+fmv_file=$(find . -type f ! -name "*.sh" ! -name "*.conf" ! -path "./output/*" ! -path "*/keyframes/*")
+if [ -z "$fmv_file" ] || [ "$(echo "$fmv_file" | wc -l)" -ne 1 ]; then
+    echo "Expected exactly one FMV file, found: $fmv_file" >&2
+    exit 1
+fi
 echo "$fmv_file"
 
-echo "track-features"
-kwiver track-features "$fmv_file"
-echo "init-cameras-landmarks"
-kwiver init-cameras-landmarks --video "$fmv_file" --tracks results/tracks.txt --camera results/krtd --landmarks results/landmarks.ply
-echo "estimate-depth"
-kwiver estimate-depth --input-landmarks-file results/landmarks.ply "$fmv_file" results/krtd results/depth
-echo "fuse-depth"
-kwiver fuse-depth --input-geo-origin-file results/geo_origin.txt --output-mesh-file results/mesh.vtp results/krtd results/depth
-echo "color-mesh"
-kwiver color-mesh --config input/color-mesh.conf --input-geo-origin-file results/geo_origin.txt results/mesh.vtp "$fmv_file" results/krtd results/pc.las
-
-mkdir -p output/
-mv results/ output/
+# Run a stage, unless it has already been completed. Each completed stage records its duration
+# in seconds, and the list of result files it created.
+run_stage() {
+    stage=$1
+    shift
+    checkpoint="results/.checkpoints/$stage"
+    if [ -f "$checkpoint.done" ]; then
+        echo "$stage (already completed)"
+        return
+    fi
+
+    echo "$stage"
+    touch "$checkpoint.started"
+    start=$(date +%s.%N)
+    "$@" || exit 1
+    end=$(date +%s.%N)
+
+    (cd output && find results -type f -newer "results/.checkpoints/$stage.started" ! -path "results/.checkpoints/*") > "$checkpoint.files"
+    awk "BEGIN { print $end - $start }" > "$checkpoint.done"
+}
+
+# If the worker selected keyframes of the FMV, only track features in those. The tracks then use
+# the frame numbers of the FMV, which the other stages read the cameras' metadata from.
+keyframes_dir=$(find . -type d -name keyframes ! -path "./output/*")
+track_keyframes() {
+    sed "s|^|$keyframes_dir/|" "$keyframes_dir/frames.txt" > "$keyframes_dir/images.txt"
+    kwiver track-features "$keyframes_dir/images.txt" || return 1
+    # Each track state is "track_id frame_id ...", with frames numbered from 1 in the list
+    awk 'NR == FNR { frame[FNR] = $1; next } /^#/ { print; next } { $2 = frame[$2]; print }' \
+        "$keyframes_dir/keyframes.txt" results/tracks.txt > results/tracks.txt.tmp &&
+        mv results/tracks.txt.tmp results/tracks.txt
+}
+
+if [ -n "$keyframes_dir" ]; then
+    run_stage track-features track_keyframes
+else
+    run_stage track-features kwiver track-features "$fmv_file"
+fi
+run_stage init-cameras-landmarks kwiver init-cameras-landmarks --video "$fmv_file" --tracks results/tracks.txt --camera results/krtd --landmarks results/landmarks.ply
+run_stage estimate-depth kwiver estimate-depth --input-landmarks-file results/landmarks.ply "$fmv_file" results/krtd results/depth
+run_stage fuse-depth kwiver fuse-depth --input-geo-origin-file results/geo_origin.txt --output-mesh-file results/mesh.vtp results/krtd results/depth
+run_stage color-mesh kwiver color-mesh --config input/color-mesh.conf --input-geo-origin-file results/geo_origin.txt results/mesh.vtp "$fmv_file" results/krtd results/pc.las
+
+rm results
 mv $fmv_file output/